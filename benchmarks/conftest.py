@@ -0,0 +1,346 @@
+"""
+Benchmarks des vues les plus sollicitées (pytest-django, SQLite).
+
+Un catalogue synthétique (biblio/fake_catalog.py, taille DATASET) est
+généré une fois par session dans la base de test. Chaque vue est appelée
+à froid (caches vidés) pour la latence et les requêtes SQL, une seconde
+fois à froid sous tracemalloc pour le pic mémoire, puis plusieurs fois à
+chaud pour les percentiles de latence. Les mesures sont comparées à budgets.json et écrites dans un
+rapport JSON que l'on peut comparer d'une exécution à l'autre :
+
+    pytest benchmarks -m benchmark
+    pytest benchmarks --bench-report /tmp/avant.json
+    pytest benchmarks --bench-compare /tmp/avant.json
+    pytest benchmarks --bench-update-budgets
+
+Les budgets ne valent que pour le jeu de données avec lequel ils ont été
+mesurés : avec --bench-scale, les mesures sont rapportées sans être
+comparées.
+"""
+
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import django
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+
+from biblio import export_cache
+from biblio.fake_catalog import DEFAULT_SIZES, FAKE_USERNAME_PREFIX, generate_catalog
+from biblio.models_user import UserProfile
+
+
+BUDGETS_PATH = Path(__file__).with_name('budgets.json')
+
+# Jeu de données des budgets (à l'échelle 1)
+DATASET = {
+    'books': 3_000,
+    'authors': 1_000,
+    'publishers': 100,
+    'categories': 40,
+    'users': 300,
+    'loans': 5_000,
+    'favorites': 5_000,
+}
+SEED = 0
+
+BENCH_ADMIN = 'bench_admin'
+
+# Marge appliquée par --bench-update-budgets ; en dessous du plancher, le
+# bruit de mesure l'emporte
+TIME_HEADROOM = 2.0
+MIN_TIME_BUDGET_MS = 50
+MEMORY_HEADROOM = 1.5
+
+# Mesures et ordre d'affichage dans le résumé
+TIME_METRICS = ('cold_ms', 'p95_ms')
+COUNT_METRICS = ('queries', 'warm_queries', 'peak_memory_kb')
+
+RESULTS = pytest.StashKey[dict]()
+
+
+def pytest_configure(config):
+    config.stash[RESULTS] = {}
+
+
+def _dataset(config):
+    scale = config.getoption('--bench-scale')
+    return {table: max(1, round(count * scale)) for table, count in DATASET.items()}
+
+
+# ============================================
+# JEU DE DONNÉES
+# ============================================
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker, request):
+    with django_db_blocker.unblock():
+        generate_catalog(sizes={**DEFAULT_SIZES, **_dataset(request.config)}, seed=SEED)
+        admin = User.objects.create_user(BENCH_ADMIN, f'{BENCH_ADMIN}@example.org')
+        UserProfile.objects.filter(user=admin).update(role='admin')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def bench_storage(tmp_path_factory):
+    """Cache des exports et médias dans un répertoire temporaire"""
+    from django.conf import settings
+
+    directory = tmp_path_factory.mktemp('biblio-bench')
+    overrides = override_settings(
+        MEDIA_ROOT=str(directory / 'media'),
+        BIBLIO_EXPORT_CACHE={**getattr(settings, 'BIBLIO_EXPORT_CACHE', {}), 'DIR': str(directory / 'exports')},
+    )
+    overrides.enable()
+    yield directory
+    overrides.disable()
+
+
+@pytest.fixture
+def bench_clients(db):
+    """Clients connectés : 'admin' et 'reader' (l'usager qui a le plus de favoris)"""
+    reader = (
+        User.objects.filter(username__startswith=FAKE_USERNAME_PREFIX)
+        .annotate(favorite_count=Count('favorites'))
+        .order_by('-favorite_count', 'pk')
+        .first()
+    )
+    clients = {}
+    for role, user in (('admin', User.objects.get(username=BENCH_ADMIN)), ('reader', reader)):
+        clients[role] = Client()
+        clients[role].force_login(user)
+    return clients
+
+
+# ============================================
+# MESURE
+# ============================================
+def _consume(response):
+    """Lit toute la réponse (les exports sont diffusés) ; retourne sa taille"""
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    response.close()
+    return size
+
+
+class QueryCounter:
+    """
+    Compte les requêtes SQL et leur durée (connection.execute_wrapper).
+
+    Contrairement à CaptureQueriesContext, ne dépend pas du journal
+    connection.queries, vidé à chaque début de requête HTTP et limité à
+    9000 entrées.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+class ViewBenchmark:
+    def __init__(self, config, clients):
+        self.config = config
+        self.clients = clients
+
+    def measure(self, name, url, role, rounds=None):
+        """
+        Mesure une vue et enregistre le résultat pour le rapport.
+
+        Returns:
+            dict des mesures (temps en ms, mémoire en Ko)
+        """
+        client = self.clients[role]
+        rounds = rounds or self.config.getoption('--bench-rounds')
+
+        # À froid (caches partagés et cache des exports vidés) : latence et requêtes
+        cache.clear()
+        export_cache.clear()
+        cold_queries = QueryCounter()
+        with connection.execute_wrapper(cold_queries):
+            started = time.perf_counter()
+            response = client.get(url)
+            size = _consume(response)
+            cold_ms = (time.perf_counter() - started) * 1000
+
+        # Pic mémoire sur un second appel à froid : tracemalloc ralentit l'appel mesuré
+        cache.clear()
+        export_cache.clear()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        _consume(client.get(url))
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        if not tracing:
+            tracemalloc.stop()
+
+        # À chaud : un premier appel pour les requêtes, puis les appels chronométrés
+        warm_queries = QueryCounter()
+        with connection.execute_wrapper(warm_queries):
+            _consume(client.get(url))
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            _consume(client.get(url))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        result = {
+            'url': url,
+            'role': role,
+            'status': response.status_code,
+            'bytes': size,
+            'rounds': rounds,
+            'cold_ms': round(cold_ms, 2),
+            'p50_ms': round(_percentile(timings, 50), 2),
+            'p90_ms': round(_percentile(timings, 90), 2),
+            'p95_ms': round(_percentile(timings, 95), 2),
+            'p99_ms': round(_percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'queries': cold_queries.count,
+            'query_ms': round(cold_queries.seconds * 1000, 2),
+            'warm_queries': warm_queries.count,
+            'peak_memory_kb': math.ceil(peak_kb),
+        }
+        self.config.stash[RESULTS][name] = result
+        return result
+
+    def check_budget(self, name, result):
+        """Échoue si une mesure dépasse le budget de la vue"""
+        if self.config.getoption('--bench-update-budgets'):
+            return
+        budgets = json.loads(BUDGETS_PATH.read_text(encoding='utf-8'))
+        if budgets.get('dataset') != {**_dataset(self.config), 'seed': SEED}:
+            result['budget'] = None
+            return
+        budget = budgets['views'].get(name)
+        if budget is None:
+            pytest.fail(f'Pas de budget pour {name} dans {BUDGETS_PATH.name} (--bench-update-budgets)')
+
+        tolerance = self.config.getoption('--bench-tolerance')
+        limits = {metric: budget[metric] * tolerance for metric in TIME_METRICS if metric in budget}
+        limits.update((metric, budget[metric]) for metric in COUNT_METRICS if metric in budget)
+        exceeded = [
+            f'{metric} = {result[metric]} > {limit:g}'
+            for metric, limit in limits.items()
+            if result[metric] > limit
+        ]
+        result['budget'] = budget
+        result['exceeded'] = exceeded
+        if exceeded:
+            pytest.fail(f'{name} dépasse son budget : ' + ', '.join(exceeded), pytrace=False)
+
+
+@pytest.fixture
+def bench(request, bench_clients):
+    return ViewBenchmark(request.config, bench_clients)
+
+
+# ============================================
+# RAPPORT
+# ============================================
+def _git_commit(root):
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _report_path(config):
+    path = config.getoption('--bench-report')
+    return Path(path) if path else Path(__file__).with_name('report.json')
+
+
+def _updated_budgets(config, results):
+    budgets = json.loads(BUDGETS_PATH.read_text(encoding='utf-8')) if BUDGETS_PATH.exists() else {}
+    views = budgets.get('views', {}) if budgets.get('dataset') == {**_dataset(config), 'seed': SEED} else {}
+    for name, result in results.items():
+        views[name] = {
+            **{
+                metric: max(MIN_TIME_BUDGET_MS, math.ceil(result[metric] * TIME_HEADROOM / 10) * 10)
+                for metric in TIME_METRICS
+            },
+            'queries': result['queries'],
+            'warm_queries': result['warm_queries'],
+            'peak_memory_kb': math.ceil(result['peak_memory_kb'] * MEMORY_HEADROOM / 100) * 100,
+        }
+    return {'dataset': {**_dataset(config), 'seed': SEED}, 'views': dict(sorted(views.items()))}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    results = config.stash.get(RESULTS, {})
+    if not results:
+        return
+
+    database = connection.vendor
+    if database == 'sqlite':
+        database += f' {connection.Database.sqlite_version}'
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(config.rootpath),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': database,
+        'dataset': {**_dataset(config), 'seed': SEED},
+        'views': dict(sorted(results.items())),
+    }
+    _report_path(config).write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+    if config.getoption('--bench-update-budgets'):
+        budgets = _updated_budgets(config, results)
+        BUDGETS_PATH.write_text(json.dumps(budgets, indent=2) + '\n', encoding='utf-8')
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash.get(RESULTS, {})
+    if not results:
+        return
+
+    previous = {}
+    compare = config.getoption('--bench-compare')
+    if compare:
+        previous = json.loads(Path(compare).read_text(encoding='utf-8')).get('views', {})
+
+    def cell(name, metric):
+        value = results[name][metric]
+        before = previous.get(name, {}).get(metric)
+        if not before:
+            return f'{value:g}'
+        return f'{value:g} ({(value - before) / before:+.0%})'
+
+    metrics = ('p50_ms', 'p95_ms', 'cold_ms', 'queries', 'warm_queries', 'peak_memory_kb')
+    rows = [('vue', *metrics)] + [(name, *(cell(name, metric) for metric in metrics)) for name in sorted(results)]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    terminalreporter.section('benchmarks biblio')
+    for row in rows:
+        terminalreporter.write_line('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+    terminalreporter.write_line(f'Rapport : {_report_path(config)}')
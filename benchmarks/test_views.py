@@ -0,0 +1,35 @@
+"""
+Budgets des vues les plus sollicitées : voir conftest.py et budgets.json.
+"""
+
+from urllib.parse import urlencode
+
+import pytest
+from django.urls import reverse
+
+
+# nom -> (nom d'URL, paramètres GET, client, appels à chaud ou None pour --bench-rounds)
+VIEWS = {
+    'index': ('index', {}, 'reader', None),
+    'index_search': ('index', {'search': 'jardin'}, 'reader', None),
+    'api_books': ('api_books', {}, 'reader', None),
+    'api_books_search_facets': ('api_books', {'search': 'nuit', 'facets': 'category,language,format'}, 'reader', None),
+    'book_list': ('book_list', {}, 'admin', None),
+    'book_list_page': ('book_list', {'page': 50}, 'admin', None),
+    'favorites_list': ('favorites_list', {}, 'reader', None),
+    'loan_list': ('loan_list', {}, 'admin', 3),
+    'export_csv': ('export_books_csv', {}, 'admin', 3),
+    'export_excel': ('export_books_excel', {}, 'admin', 3),
+    'export_pdf': ('export_books_pdf', {}, 'admin', 3),
+    'export_word': ('export_books_word', {}, 'admin', 3),
+}
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('name', VIEWS)
+def test_view_within_budget(bench, name):
+    url_name, params, role, rounds = VIEWS[name]
+    url = reverse(url_name) + (f'?{urlencode(params)}' if params else '')
+    result = bench.measure(name, url, role, rounds)
+    assert result['status'] == 200, f'{url} : HTTP {result["status"]}'
+    bench.check_budget(name, result)
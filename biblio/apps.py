@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BiblioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'biblio'
+
+    def ready(self):
+        # Enregistrement des signaux d'invalidation du cache de recherche
+        # et de mise à jour de l'index d'autocomplétion, mise en file de
+        # l'analyse des fichiers numériques, version des rôles en session
+        from . import search_cache, suggest, ingestion, roles  # noqa: F401
@@ -0,0 +1,483 @@
+"""
+Import en masse du catalogue (livres, auteurs, éditeurs, catégories).
+
+Les notices arrivent une à une (fichier CSV ou Excel ici, MARCXML ou ONIX
+ailleurs) sous forme de BookRecord et sont confiées à CatalogWriter, qui :
+
+- résout auteurs, éditeurs et catégories par leur nom normalisé
+  (suggest.fold) dans des tables en mémoire chargées une seule fois ;
+- écarte les livres dont l'ISBN normalisé est déjà au catalogue ou déjà
+  vu dans le fichier ;
+- écrit par lots de BATCH_SIZE, chaque lot dans sa propre transaction :
+  bulk_create des nouveaux auteurs, éditeurs et catégories, puis des
+  livres, puis des lignes BookAuthor et BookCategory.
+
+Un lot coûte une dizaine de requêtes quel que soit le nombre de livres.
+bulk_create n'envoie pas post_save : les caches de recherche et l'index
+d'autocomplétion sont invalidés une fois, à la fin de l'import.
+"""
+
+import re
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+
+from .models import Author, Book, BookAuthor, BookCategory, Category, Publisher
+from .search_cache import bump_catalog_generation
+from .suggest import fold, invalidate_suggestions
+from .tabular import header_key, read_table
+
+
+DEFAULT_SETTINGS = {
+    'BATCH_SIZE': 1000,
+}
+
+# Colonne -> en-têtes acceptés (normalisés par tabular.header_key). Les
+# en-têtes des exports Excel/CSV de la liste des livres sont reconnus.
+COLUMNS = {
+    'title': ('title', 'titre'),
+    'isbn': ('isbn',),
+    'authors': ('authors', 'author', 'auteurs', 'auteur'),
+    'publisher': ('publisher', 'editeur', 'maisondedition'),
+    'categories': ('categories', 'category', 'categorie', 'genres'),
+    'publication_year': ('year', 'publicationyear', 'annee', 'anneedepublication'),
+    'pages': ('pages', 'nombredepages'),
+    'language': ('language', 'langue'),
+    'summary': ('summary', 'resume'),
+    'total_copies': ('copies', 'totalcopies', 'total', 'exemplaires'),
+    'available_copies': ('availablecopies', 'disponibles'),
+    'location': ('location', 'emplacement'),
+    'status': ('status', 'statut'),
+}
+REQUIRED_COLUMNS = ('title',)
+
+# Valeurs de remplissage des exports
+EMPTY_VALUES = {'', 'na', 'aucunauteur', 'aucunecategorie'}
+
+STATUS_VALUES = {
+    **{header_key(code): code for code, _ in Book.STATUS_CHOICES},
+    **{header_key(label): code for code, label in Book.STATUS_CHOICES},
+}
+
+_LIST_SEPARATORS = re.compile(r'\s*[;|]\s*')
+_COMMA = re.compile(r'\s*,\s*')
+_ISBN_CHARACTERS = re.compile(r'[^0-9X]')
+
+# Les mêmes noms d'auteurs, d'éditeurs et de catégories reviennent sans cesse
+_name_key = lru_cache(maxsize=65536)(fold)
+
+
+class BookRecord(NamedTuple):
+    title: str
+    isbn: str = ''
+    authors: tuple = ()
+    publisher: str = ''
+    categories: tuple = ()
+    publication_year: Optional[int] = None
+    pages: Optional[int] = None
+    language: str = ''
+    summary: str = ''
+    total_copies: int = 1
+    available_copies: Optional[int] = None
+    location: str = ''
+    status: str = 'available'
+
+
+class CatalogImportResult(NamedTuple):
+    records: int
+    created: int
+    # Livres écartés : ISBN déjà au catalogue ou en double dans le fichier
+    duplicates: int
+    # [(numéro de ligne ou de notice, message)]
+    errors: list
+    new_authors: int
+    new_publishers: int
+    new_categories: int
+    elapsed: float
+
+    @property
+    def rate(self):
+        """Notices traitées par seconde"""
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+
+def get_catalog_import_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_CATALOG_IMPORT', {})}
+
+
+# ============================================
+# ISBN
+# ============================================
+def clean_isbn(value):
+    """ISBN sans tirets ni espaces : '978-2-07-036822-8' -> '9782070368228'"""
+    return _ISBN_CHARACTERS.sub('', str(value or '').upper())
+
+
+def normalize_isbn(value):
+    """
+    Clé de dédoublonnage d'un ISBN : l'ISBN-13 correspondant (un ISBN-10 et
+    son ISBN-13 désignent le même livre), ou l'ISBN nettoyé s'il n'est pas
+    convertible.
+    """
+    isbn = clean_isbn(value)
+    if len(isbn) == 10 and isbn[:9].isdigit():
+        body = '978' + isbn[:9]
+        check = (10 - sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(body)) % 10) % 10
+        return body + str(check)
+    return isbn
+
+
+# ============================================
+# VALIDATION
+# ============================================
+def _max_length(model, field):
+    return model._meta.get_field(field).max_length
+
+
+def record_errors(record):
+    """Messages d'erreur d'une notice (liste vide si elle est valide)"""
+    errors = []
+    if len(record.title) < 2:
+        errors.append('Titre manquant ou trop court.')
+    elif len(record.title) > _max_length(Book, 'title'):
+        errors.append('Titre trop long.')
+    if record.isbn and (len(record.isbn) not in (10, 13) or not record.isbn[:-1].isdigit()):
+        errors.append(f'ISBN invalide : {record.isbn}')
+    if record.publication_year is not None and not 0 < record.publication_year <= date.today().year:
+        errors.append(f'Année de publication invalide : {record.publication_year}')
+    if record.pages is not None and record.pages <= 0:
+        errors.append(f'Nombre de pages invalide : {record.pages}')
+    if record.total_copies < 0:
+        errors.append("Nombre d'exemplaires invalide.")
+    if record.available_copies is not None and not 0 <= record.available_copies <= record.total_copies:
+        errors.append("Nombre d'exemplaires disponibles invalide.")
+    if any(len(name) > _max_length(Author, 'name') for name in record.authors):
+        errors.append("Nom d'auteur trop long.")
+    if len(record.publisher) > _max_length(Publisher, 'publisher_name'):
+        errors.append("Nom d'éditeur trop long.")
+    if any(len(name) > _max_length(Category, 'category_name') for name in record.categories):
+        errors.append('Nom de catégorie trop long.')
+    if len(record.language) > _max_length(Book, 'language'):
+        errors.append('Langue trop longue.')
+    if len(record.location) > _max_length(Book, 'location'):
+        errors.append('Emplacement trop long.')
+    if record.status not in STATUS_VALUES.values():
+        errors.append(f'Statut inconnu : {record.status}')
+    return errors
+
+
+# ============================================
+# ÉCRITURE PAR LOTS
+# ============================================
+CATALOG_MODELS = (Author, Publisher, Category, Book, BookAuthor, BookCategory)
+
+
+@contextmanager
+def _batch_transaction():
+    """
+    Transaction d'un lot.
+
+    Sans clés renvoyées par l'INSERT (MySQL), les tables du catalogue sont
+    verrouillées en écriture jusqu'au commit : aucune ligne ne peut alors
+    s'intercaler entre la plus grande clé relevée par _bulk_insert et les
+    lignes du lot. Les autres écritures du catalogue (formulaires, ingestion)
+    attendent la fin du lot.
+    """
+    # LOCK TABLES validerait la transaction en cours : dans une transaction
+    # déjà ouverte (TestCase), le lot n'est pas verrouillé
+    if connection.features.can_return_rows_from_bulk_insert or connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+
+    # Juste après le SET autocommit=0 d'atomic(), comme le demande MySQL
+    tables = ', '.join(f'{connection.ops.quote_name(model._meta.db_table)} WRITE' for model in CATALOG_MODELS)
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLES {tables}')
+            yield
+    finally:
+        # Après le commit (ou l'annulation) : UNLOCK TABLES validerait la transaction
+        with connection.cursor() as cursor:
+            cursor.execute('UNLOCK TABLES')
+
+
+def _bulk_insert(model, objects, fields):
+    """
+    bulk_create qui renseigne la clé primaire des objets créés.
+
+    MySQL ne renvoie pas les clés d'un INSERT multiple : les lignes créées
+    sont relues (clé supérieure à la plus grande clé d'avant l'insertion) et
+    rapprochées des objets par les champs fields. Les tables sont alors
+    verrouillées par _batch_transaction : seul le lot a pu y insérer.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objects)
+        return
+    floor = model.objects.aggregate(top=Max('pk'))['top'] or 0
+    model.objects.bulk_create(objects)
+    pending = defaultdict(deque)
+    for obj in objects:
+        pending[tuple(getattr(obj, field) for field in fields)].append(obj)
+    for pk, *values in model.objects.filter(pk__gt=floor).order_by('pk').values_list('pk', *fields).iterator():
+        waiting = pending.get(tuple(values))
+        if waiting:
+            waiting.popleft().pk = pk
+
+
+class CatalogWriter:
+    """
+    Ajoute des notices au catalogue, par lots.
+
+    Args:
+        batch_size: Livres par lot (et par transaction)
+        dry_run: Tout valider et compter sans rien écrire
+    """
+
+    def __init__(self, batch_size=None, dry_run=False):
+        self.batch_size = batch_size or get_catalog_import_settings()['BATCH_SIZE']
+        self.dry_run = dry_run
+        self.records = 0
+        self.created = 0
+        self.duplicates = 0
+        self.errors = []
+        self.new_counts = {'authors': 0, 'publishers': 0, 'categories': 0}
+        self._pending = []
+        self._started = time.perf_counter()
+
+        # Nom normalisé -> clé primaire (None pour un nom créé en mode dry_run)
+        self.authors, self.publishers, self.categories = {}, {}, {}
+        for pk, name in Author.objects.order_by('pk').values_list('pk', 'name').iterator():
+            self.authors.setdefault(_name_key(name), pk)
+        for pk, name in Publisher.objects.order_by('pk').values_list('pk', 'publisher_name').iterator():
+            self.publishers.setdefault(_name_key(name), pk)
+        for pk, name in Category.objects.order_by('pk').values_list('pk', 'category_name').iterator():
+            self.categories.setdefault(_name_key(name), pk)
+        # ISBN normalisé -> clé primaire du livre
+        self.isbns = {
+            normalize_isbn(isbn): pk
+            for isbn, pk in Book.objects.exclude(isbn__isnull=True).exclude(isbn='').values_list('isbn', 'pk').iterator()
+        }
+
+    def add(self, record, line, errors=()):
+        """
+        Valide une notice et la met dans le lot courant.
+
+        Args:
+            record: BookRecord
+            line: Numéro de ligne ou de notice, pour les erreurs
+            errors: Erreurs déjà relevées en lisant la notice
+        """
+        self.records += 1
+        errors = [*errors, *record_errors(record)]
+        if errors:
+            self.errors.extend((line, message) for message in errors)
+            return
+        if record.isbn:
+            key = normalize_isbn(record.isbn)
+            if key in self.isbns:
+                self.duplicates += 1
+                return
+            self.isbns[key] = None
+        self._pending.append((line, record))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _new_names(self, lookup, kind, names):
+        """Noms absents de la table : chacun une fois, dans sa première graphie"""
+        new = {}
+        for name in names:
+            key = _name_key(name)
+            if name and key not in lookup and key not in new:
+                new[key] = name
+        self.new_counts[kind] += len(new)
+        return new
+
+    def _create_named(self, model, field, lookup, new):
+        objects = [model(**{field: name}) for name in new.values()]
+        if not self.dry_run and objects:
+            _bulk_insert(model, objects, (field,))
+        for key, obj in zip(new, objects):
+            lookup[key] = obj.pk
+
+    def flush(self):
+        """Écrit le lot courant dans une transaction"""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        records = [record for _, record in batch]
+        new_authors = self._new_names(self.authors, 'authors', (name for record in records for name in record.authors))
+        new_publishers = self._new_names(self.publishers, 'publishers', (record.publisher for record in records))
+        new_categories = self._new_names(self.categories, 'categories', (name for record in records for name in record.categories))
+
+        if self.dry_run:
+            for lookup, new in ((self.authors, new_authors), (self.publishers, new_publishers), (self.categories, new_categories)):
+                lookup.update(dict.fromkeys(new))
+            self.created += len(records)
+            return
+
+        try:
+            with _batch_transaction():
+                self._create_named(Author, 'name', self.authors, new_authors)
+                self._create_named(Publisher, 'publisher_name', self.publishers, new_publishers)
+                self._create_named(Category, 'category_name', self.categories, new_categories)
+
+                books = [
+                    Book(
+                        title=record.title,
+                        isbn=record.isbn or None,
+                        publisher_id=self.publishers.get(_name_key(record.publisher)) if record.publisher else None,
+                        publication_year=record.publication_year,
+                        pages=record.pages,
+                        language=record.language or Book._meta.get_field('language').default,
+                        summary=record.summary or None,
+                        total_copies=record.total_copies,
+                        available_copies=record.total_copies if record.available_copies is None else record.available_copies,
+                        location=record.location or None,
+                        status=record.status,
+                    )
+                    for record in records
+                ]
+                _bulk_insert(Book, books, ('title', 'isbn'))
+
+                book_authors, book_categories = [], []
+                for book, record in zip(books, records):
+                    author_ids = list(dict.fromkeys(self.authors[_name_key(name)] for name in record.authors))
+                    book_authors.extend(
+                        BookAuthor(book_id=book.pk, author_id=author_id, contribution_order=order)
+                        for order, author_id in enumerate(author_ids, start=1)
+                    )
+                    category_ids = list(dict.fromkeys(self.categories[_name_key(name)] for name in record.categories))
+                    book_categories.extend(
+                        BookCategory(book_id=book.pk, category_id=category_id, is_primary=order == 0)
+                        for order, category_id in enumerate(category_ids)
+                    )
+                BookAuthor.objects.bulk_create(book_authors, batch_size=self.batch_size)
+                BookCategory.objects.bulk_create(book_categories, batch_size=self.batch_size)
+        except DatabaseError as error:
+            # Lot entier annulé (ISBN ajouté entre-temps par quelqu'un d'autre…)
+            self.errors.append((batch[0][0], f'Lot de {len(batch)} livre(s) non importé : {error}'))
+            self._forget(new_authors, new_publishers, new_categories, records)
+            return
+
+        for book, record in zip(books, records):
+            if record.isbn:
+                self.isbns[normalize_isbn(record.isbn)] = book.pk
+        self.created += len(books)
+
+    def _forget(self, new_authors, new_publishers, new_categories, records):
+        """Retire des tables en mémoire les noms et ISBN d'un lot annulé"""
+        for lookup, kind, new in (
+            (self.authors, 'authors', new_authors),
+            (self.publishers, 'publishers', new_publishers),
+            (self.categories, 'categories', new_categories),
+        ):
+            for key in new:
+                lookup.pop(key, None)
+            self.new_counts[kind] -= len(new)
+        for record in records:
+            if record.isbn:
+                self.isbns.pop(normalize_isbn(record.isbn), None)
+
+    def finish(self):
+        """
+        Écrit le dernier lot et invalide les caches du catalogue.
+
+        Returns:
+            CatalogImportResult
+        """
+        self.flush()
+        if self.created and not self.dry_run:
+            bump_catalog_generation()
+            invalidate_suggestions()
+        return CatalogImportResult(
+            records=self.records,
+            created=self.created,
+            duplicates=self.duplicates,
+            errors=self.errors,
+            new_authors=self.new_counts['authors'],
+            new_publishers=self.new_counts['publishers'],
+            new_categories=self.new_counts['categories'],
+            elapsed=time.perf_counter() - self._started,
+        )
+
+
+# ============================================
+# FICHIERS CSV / EXCEL
+# ============================================
+def _names(value):
+    """Liste de noms d'une cellule : séparés par ';' ou '|', sinon par ','"""
+    if header_key(value) in EMPTY_VALUES:
+        return ()
+    separator = _LIST_SEPARATORS if _LIST_SEPARATORS.search(value) else _COMMA
+    return tuple(name for name in separator.split(value) if name)
+
+
+def _optional_text(value):
+    return '' if header_key(value) in EMPTY_VALUES else value
+
+
+def _optional_int(values, column, label, errors):
+    value = _optional_text(values.get(column, ''))
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        errors.append(f'{label} invalide : {value}')
+        return None
+
+
+def record_from_row(values):
+    """
+    Notice d'une ligne de fichier.
+
+    Returns:
+        (BookRecord, erreurs de conversion)
+    """
+    errors = []
+    total_copies = _optional_int(values, 'total_copies', "Nombre d'exemplaires", errors)
+    status = _optional_text(values.get('status', ''))
+    record = BookRecord(
+        title=values.get('title', ''),
+        isbn=clean_isbn(_optional_text(values.get('isbn', ''))),
+        authors=_names(values.get('authors', '')),
+        publisher=_optional_text(values.get('publisher', '')),
+        categories=_names(values.get('categories', '')),
+        publication_year=_optional_int(values, 'publication_year', 'Année de publication', errors),
+        pages=_optional_int(values, 'pages', 'Nombre de pages', errors),
+        language=_optional_text(values.get('language', '')),
+        summary=values.get('summary', ''),
+        total_copies=1 if total_copies is None else total_copies,
+        available_copies=_optional_int(values, 'available_copies', "Nombre d'exemplaires disponibles", errors),
+        location=_optional_text(values.get('location', '')),
+        status=STATUS_VALUES.get(header_key(status), status) if status else 'available',
+    )
+    return record, errors
+
+
+def import_books(fileobj, filename, dry_run=False, batch_size=None):
+    """
+    Importe les livres d'un fichier CSV ou Excel.
+
+    Les lignes en erreur sont écartées et signalées, les autres importées.
+
+    Returns:
+        CatalogImportResult
+
+    Raises:
+        ValueError: Fichier illisible ou colonne title absente
+    """
+    writer = CatalogWriter(batch_size=batch_size, dry_run=dry_run)
+    for line, values in read_table(fileobj, filename, COLUMNS, REQUIRED_COLUMNS):
+        record, errors = record_from_row(values)
+        writer.add(record, line, errors)
+    return writer.finish()
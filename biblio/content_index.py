@@ -0,0 +1,388 @@
+"""
+Recherche plein texte dans le contenu des livres numériques.
+
+Le texte des fichiers EPUB (pages XHTML, via lxml) et PDF (couche texte) est
+extrait hors ligne par la commande index_book_contents, dans un pool de
+processus. Il est découpé en morceaux (ContentChunk) et chaque morceau est
+tokenisé dans un index inversé (ContentTerm : terme normalisé, fréquence,
+première position). Un livre n'est réindexé que si son fichier a changé.
+
+Les termes sont normalisés comme l'autocomplétion (sans accents ni casse) :
+« economie » trouve « Économie ». Une recherche n'ouvre jamais de fichier :
+elle interroge l'index puis découpe les extraits dans les morceaux stockés.
+
+Les fichiers MOBI (texte compressé) ne sont pas indexés.
+"""
+
+import functools
+import logging
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import unquote
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .ingestion import FORMATS, read_epub_package
+from .models import Book, ContentChunk, ContentTerm
+from .storage import get_book_storage
+from .suggest import fold
+
+logger = logging.getLogger(__name__)
+
+
+# Taille visée d'un morceau de texte (caractères)
+CHUNK_SIZE = 4000
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 40
+MAX_QUERY_TERMS = 8
+
+SNIPPET_LENGTH = 240
+MAX_SNIPPETS = 3
+
+BULK_BATCH_SIZE = 2000
+
+# Mots trop fréquents pour être utiles (forme normalisée)
+STOP_WORDS = frozenset('''
+    au aux avec ce ces cet cette dans de des du elle elles en est et il ils je la le les
+    leur leurs lui mais me ne nous on ou par pas pour qu que qui sa se ses son sont sur
+    te tu un une vous
+    an and are as at be by for from in is it of or that the this to was with
+'''.split())
+
+_WORD = re.compile(r'[^\W_]+')
+_SPACES = re.compile(r'[^\S\n]+')
+_BLANK_LINES = re.compile(r'\s*\n\s*')
+
+
+# ============================================
+# TOKENISATION
+# ============================================
+@functools.lru_cache(maxsize=65536)
+def normalize_term(word):
+    """Forme indexée d'un mot, ou None s'il n'est pas indexé"""
+    term = fold(word).replace(' ', '')
+    if len(term) < MIN_TERM_LENGTH or len(term) > MAX_TERM_LENGTH or term in STOP_WORDS:
+        return None
+    return term
+
+
+def tokenize(text):
+    """Génère (terme, position) pour chaque mot indexable du texte"""
+    for match in _WORD.finditer(text):
+        term = normalize_term(match.group())
+        if term:
+            yield term, match.start()
+
+
+def parse_query(query):
+    """Termes distincts d'une recherche, dans l'ordre de saisie"""
+    terms = []
+    for term, _ in tokenize(query or ''):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def split_chunks(text):
+    """Découpe le texte en morceaux d'environ CHUNK_SIZE caractères, entre deux mots"""
+    start = 0
+    while start < len(text):
+        end = start + CHUNK_SIZE
+        if end < len(text):
+            space = text.rfind(' ', start + CHUNK_SIZE // 2, end)
+            newline = text.rfind('\n', start + CHUNK_SIZE // 2, end)
+            end = max(space, newline) + 1 or end
+        yield start, text[start:end]
+        start = end
+
+
+def analyse_text(text):
+    """
+    Morceaux et index inversé d'un texte.
+
+    Returns:
+        list de (position, start_offset, texte, {terme: [fréquence, première position]})
+    """
+    text = _BLANK_LINES.sub('\n', _SPACES.sub(' ', text)).strip()
+    chunks = []
+    for position, (start_offset, chunk) in enumerate(split_chunks(text)):
+        terms = {}
+        for term, offset in tokenize(chunk):
+            if term in terms:
+                terms[term][0] += 1
+            else:
+                terms[term] = [1, offset]
+        chunks.append((position, start_offset, chunk, terms))
+    return chunks
+
+
+# ============================================
+# EXTRACTION DU TEXTE
+# ============================================
+# Éléments dont la fin marque un changement de ligne
+HTML_BLOCK_TAGS = (
+    'p', 'div', 'br', 'li', 'tr', 'td', 'th', 'blockquote', 'section', 'article',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'dt', 'dd',
+)
+
+
+def html_text(data):
+    from lxml import etree, html
+
+    try:
+        document = html.document_fromstring(data)
+    except (etree.ParserError, ValueError):
+        return ''
+    for element in document.xpath('//head|//script|//style'):
+        element.drop_tree()
+    for element in document.iter(*HTML_BLOCK_TAGS):
+        element.tail = '\n' + (element.tail or '')
+    return document.text_content()
+
+
+def epub_text(path):
+    """Texte des pages XHTML d'un EPUB, dans l'ordre de lecture (spine)"""
+    with zipfile.ZipFile(path) as archive:
+        opf_path, opf = read_epub_package(archive)
+        if opf is None:
+            return ''
+        base = posixpath.dirname(opf_path)
+        manifest = {item.get('id'): item for item in opf.iterfind('.//{*}manifest/{*}item')}
+        parts = []
+        for itemref in opf.iterfind('.//{*}spine/{*}itemref'):
+            item = manifest.get(itemref.get('idref'))
+            if item is None or 'html' not in (item.get('media-type') or ''):
+                continue
+            name = posixpath.normpath(posixpath.join(base, unquote(item.get('href') or '')))
+            try:
+                parts.append(html_text(archive.read(name)))
+            except KeyError:
+                continue
+    return '\n'.join(parts)
+
+
+def pdf_text(path):
+    """Couche texte de chaque page (pypdf : encodages des polices et tables ToUnicode)"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+TEXT_EXTRACTORS = {
+    'PDF': pdf_text,
+    'EPUB': epub_text,
+}
+
+
+def analyse_file(path):
+    """Extraction et tokenisation d'un fichier (exécutée dans un processus du pool)"""
+    extractor = TEXT_EXTRACTORS.get(FORMATS.get(os.path.splitext(path)[1].lower()))
+    if extractor is None:
+        return []
+    return analyse_text(extractor(path))
+
+
+# ============================================
+# INDEXATION
+# ============================================
+def store_book_index(book_id, file_name, chunks):
+    """
+    Remplace l'index d'un livre.
+
+    Returns:
+        bool: False si le livre a changé de fichier pendant l'extraction
+    """
+    with transaction.atomic():
+        book = Book.objects.select_for_update().filter(pk=book_id).only('pk', 'file').first()
+        if book is None or (book.file.name or '') != file_name:
+            return False
+
+        ContentTerm.objects.filter(book_id=book_id).delete()
+        ContentChunk.objects.filter(book_id=book_id).delete()
+        ContentChunk.objects.bulk_create(
+            [
+                ContentChunk(book_id=book_id, position=position, start_offset=start_offset, text=text)
+                for position, start_offset, text, _ in chunks
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        batch = []
+        for position, _, _, terms in chunks:
+            for term, (frequency, first_offset) in terms.items():
+                batch.append(ContentTerm(
+                    book_id=book_id, chunk_position=position, term=term,
+                    frequency=frequency, first_offset=first_offset,
+                ))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    ContentTerm.objects.bulk_create(batch)
+                    batch = []
+        if batch:
+            ContentTerm.objects.bulk_create(batch)
+
+        # update() : pas de signal, l'index du catalogue n'est pas concerné
+        Book.objects.filter(pk=book_id).update(content_indexed_file=file_name)
+    return True
+
+
+def remove_stale_indexes():
+    """Efface l'index des livres dont le fichier a été retiré"""
+    stale = list(
+        Book.objects.filter(Q(file='') | Q(file__isnull=True)).exclude(content_indexed_file='')
+        .values_list('pk', flat=True)
+    )
+    if stale:
+        with transaction.atomic():
+            ContentTerm.objects.filter(book_id__in=stale).delete()
+            ContentChunk.objects.filter(book_id__in=stale).delete()
+            Book.objects.filter(pk__in=stale).update(content_indexed_file='')
+    return len(stale)
+
+
+def _init_worker():
+    # Priorité basse : l'indexation ne doit pas ralentir les workers web
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    import django
+    django.setup()
+
+
+def index_books(book_ids=None, rebuild=False, workers=None):
+    """
+    Indexe les livres dont le fichier n'est pas encore dans l'index.
+
+    Args:
+        book_ids: Limite l'indexation à ces livres
+        rebuild: Réindexe même les livres à jour
+        workers: Nombre de processus d'extraction
+
+    Returns:
+        int: Nombre de livres indexés
+    """
+    remove_stale_indexes()
+    books = Book.objects.exclude(file='').exclude(file__isnull=True)
+    if book_ids:
+        books = books.filter(pk__in=book_ids)
+    if not rebuild:
+        books = books.exclude(content_indexed_file=F('file'))
+    pending = list(books.values_list('pk', 'file'))
+    if not pending:
+        return 0
+
+    storage = get_book_storage()
+    # Les processus du pool ne doivent pas hériter des connexions ouvertes
+    connections.close_all()
+    indexed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(analyse_file, storage.path(name)): (book_id, name)
+            for book_id, name in pending
+        }
+        for future in as_completed(futures):
+            book_id, name = futures[future]
+            try:
+                chunks = future.result()
+            except Exception as error:
+                # Fichier illisible : index vide, il ne sera repris que s'il est remplacé
+                logger.warning("Échec de l'extraction du texte de %s (livre %s) : %s", name, book_id, error)
+                chunks = []
+            if store_book_index(book_id, name, chunks):
+                indexed += 1
+    return indexed
+
+
+# ============================================
+# RECHERCHE
+# ============================================
+def matching_books(terms):
+    """
+    Livres dont le texte contient tous les termes, les plus pertinents en premier.
+
+    Returns:
+        QuerySet de dictionnaires {'book_id', 'score'}
+    """
+    return ContentTerm.objects.filter(term__in=terms).values('book_id').annotate(
+        matched=Count('term', distinct=True),
+        score=Sum('frequency'),
+    ).filter(matched=len(terms)).values('book_id', 'score').order_by('-score', 'book_id')
+
+
+def make_snippet(chunk, offsets, terms):
+    """Extrait autour de la première occurrence, avec les positions des termes trouvés"""
+    text = chunk.text
+    first = min(offsets)
+    start = max(0, first - SNIPPET_LENGTH // 4)
+    if start:
+        space = text.find(' ', start, first)
+        if space != -1:
+            start = space + 1
+    end = min(len(text), start + SNIPPET_LENGTH)
+    if end < len(text):
+        space = text.rfind(' ', first, end)
+        if space > first:
+            end = space
+    snippet = text[start:end]
+    return {
+        # Position de l'extrait dans le texte complet du livre
+        'offset': chunk.start_offset + start,
+        'text': snippet,
+        # Positions [début, fin[ des termes dans l'extrait
+        'highlights': [
+            [match.start(), match.end()]
+            for match in _WORD.finditer(snippet)
+            if normalize_term(match.group()) in terms
+        ],
+    }
+
+
+def book_snippets(book_ids, terms):
+    """
+    Meilleurs extraits de chaque livre : les morceaux qui contiennent le plus
+    de termes différents.
+
+    Returns:
+        dict {book_id: [extrait, ...]}
+    """
+    hits = {}
+    rows = ContentTerm.objects.filter(book_id__in=book_ids, term__in=terms).values_list(
+        'book_id', 'chunk_position', 'frequency', 'first_offset'
+    )
+    for book_id, position, frequency, first_offset in rows:
+        hit = hits.setdefault((book_id, position), [0, 0, []])
+        hit[0] += 1
+        hit[1] += frequency
+        hit[2].append(first_offset)
+
+    selected = {}
+    for (book_id, position), (distinct, frequency, offsets) in sorted(
+        hits.items(), key=lambda item: (-item[1][0], -item[1][1], item[0][1])
+    ):
+        positions = selected.setdefault(book_id, {})
+        if len(positions) < MAX_SNIPPETS:
+            positions[position] = offsets
+    if not selected:
+        return {}
+
+    condition = Q()
+    for book_id, positions in selected.items():
+        condition |= Q(book_id=book_id, position__in=list(positions))
+    chunks = {
+        (chunk.book_id, chunk.position): chunk
+        for chunk in ContentChunk.objects.filter(condition)
+    }
+
+    snippets = {}
+    for book_id, positions in selected.items():
+        snippets[book_id] = [
+            make_snippet(chunks[(book_id, position)], offsets, terms)
+            for position, offsets in positions.items()
+            if (book_id, position) in chunks
+        ]
+    return snippets
@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import HttpResponseForbidden, JsonResponse
 
+from .roles import get_user_role
+
 
 def admin_required(view_func):
     """
@@ -14,7 +16,7 @@ def admin_required(view_func):
             messages.error(request, 'Vous devez être connecté pour accéder à cette page.')
             return redirect('login')
         
-        if not hasattr(request.user, 'profile') or not request.user.profile.is_admin:
+        if not get_user_role(request).is_admin:
             messages.error(request, 'Accès refusé. Seuls les administrateurs peuvent accéder à cette page.')
             return redirect('index')
         
@@ -45,32 +47,30 @@ def ajax_admin_required(view_func):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Non authentifié'}, status=401)
         
-        if not hasattr(request.user, 'profile') or not request.user.profile.is_admin:
+        if not get_user_role(request).is_admin:
             return JsonResponse({'error': 'Accès refusé. Droits administrateur requis.'}, status=403)
         
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
-def check_permission(user, action):
+def check_permission(request, action):
     """
     Fonction utilitaire pour vérifier les permissions
     
     Args:
-        user: L'utilisateur à vérifier
+        request: La requête de l'utilisateur à vérifier
         action: L'action à effectuer ('view', 'create', 'edit', 'delete')
     
     Returns:
         bool: True si l'utilisateur a la permission, False sinon
     """
-    if not user.is_authenticated:
-        return False
-    
-    if not hasattr(user, 'profile'):
+    role = get_user_role(request)
+    if not role.is_authenticated or role.role is None:
         return False
     
     # Les admins ont tous les droits
-    if user.profile.is_admin:
+    if role.is_admin:
         return True
     
     # Les utilisateurs réguliers peuvent seulement voir
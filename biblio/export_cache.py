@@ -0,0 +1,169 @@
+"""
+Cache disque des fichiers d'export (Excel, PDF, Word).
+
+Un export est entièrement déterminé par son format, la spécification de
+filtres normalisée, le drapeau include_pdf et l'état du catalogue. Le fichier
+généré est gardé dans BIBLIO_EXPORT_CACHE['DIR'] sous une clé dérivée de ces
+éléments : un export identique (le rapport d'inventaire mensuel, par exemple)
+est alors servi directement depuis le disque.
+
+La version des données est la génération du catalogue (voir search_cache),
+changée à chaque modification des livres, auteurs, éditeurs, catégories et
+de leurs liens : la clé se calcule sans requête SQL. Les imports en masse,
+qui ne passent pas par les signaux, changent la génération eux-mêmes.
+
+Le cache est borné en taille et en nombre de fichiers ; les fichiers les
+moins récemment servis sont supprimés en premier (LRU sur la date de
+modification, mise à jour à chaque lecture). Les fichiers sont écrits sous un
+nom temporaire puis renommés : plusieurs workers peuvent partager le dossier.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from .search_cache import get_catalog_generation
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SETTINGS = {
+    'DIR': os.path.join(settings.BASE_DIR, 'export_cache'),
+    'MAX_SIZE': 200 * 1024 * 1024,  # Taille totale maximale (octets)
+    'MAX_FILES': 100,               # Nombre maximum de fichiers gardés
+}
+
+
+def get_cache_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_EXPORT_CACHE', {})}
+
+
+# ============================================
+# CLÉ DE CACHE
+# ============================================
+def export_key(export_format, spec, include_pdf):
+    """
+    Clé d'un fichier d'export.
+
+    Args:
+        export_format: 'excel', 'pdf' ou 'word'
+        spec: BookFilterSpec des livres exportés
+        include_pdf: Drapeau include_pdf de la requête
+    """
+    payload = json.dumps(
+        [export_format, spec.fingerprint, bool(include_pdf), get_catalog_generation()]
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# ============================================
+# LECTURE / ÉCRITURE
+# ============================================
+def _path_for(key, suffix):
+    return os.path.join(get_cache_settings()['DIR'], f'{key}{suffix}')
+
+
+def open_export(key, suffix):
+    """
+    Ouvre un export en cache.
+
+    Returns:
+        Fichier ouvert en lecture binaire, ou None si absent
+    """
+    path = _path_for(key, suffix)
+    try:
+        handle = open(path, 'rb')
+    except OSError:
+        return None
+    try:
+        # Marque le fichier comme récemment utilisé
+        os.utime(path)
+    except OSError:
+        pass
+    return handle
+
+
+def store_export(key, suffix, build):
+    """
+    Génère un export et le garde en cache.
+
+    Args:
+        build: Fonction qui écrit l'export dans le fichier qu'on lui passe
+
+    Returns:
+        Fichier ouvert en lecture binaire, positionné au début
+    """
+    directory = get_cache_settings()['DIR']
+    try:
+        os.makedirs(directory, exist_ok=True)
+        output = tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False)
+    except OSError:
+        logger.warning("Dossier de cache des exports inaccessible : %s", directory)
+        output = tempfile.TemporaryFile()
+        build(output)
+        output.seek(0)
+        return output
+
+    try:
+        with output:
+            build(output)
+        handle = open(output.name, 'rb')
+        # Le fichier reste lisible par ce handle même s'il est évincé ensuite
+        os.replace(output.name, _path_for(key, suffix))
+    except BaseException:
+        try:
+            os.remove(output.name)
+        except OSError:
+            pass
+        raise
+
+    evict()
+    return handle
+
+
+def evict():
+    """Supprime les exports les moins récemment utilisés au-delà des plafonds"""
+    config = get_cache_settings()
+    directory = config['DIR']
+    entries = []
+    try:
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                if entry.name.endswith('.tmp') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return
+
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    while entries and (total_size > config['MAX_SIZE'] or len(entries) > config['MAX_FILES']):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_size -= size
+
+
+def clear():
+    """Vide le cache des exports"""
+    directory = get_cache_settings()['DIR']
+    try:
+        with os.scandir(directory) as scanner:
+            paths = [entry.path for entry in scanner if entry.is_file()]
+    except OSError:
+        return
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,85 @@
+"""
+Exports de la liste des livres (Excel, PDF, Word).
+
+openpyxl, reportlab et python-docx sont longs à importer et gourmands en
+mémoire : chaque format vit dans son propre module, importé seulement à la
+première demande d'export de ce format. Les workers démarrent donc sans
+charger ces bibliothèques.
+
+Un format est décrit dans le registre par ses métadonnées (extension, type
+MIME, bibliothèque requise) et le chemin de son module. Le module fournit :
+
+    book_row(book)       -> ligne d'export d'un livre
+    build(output, rows)  -> écrit le fichier et retourne le nombre de livres
+
+Un nouveau format s'ajoute avec register(), sans toucher aux vues.
+"""
+
+import importlib
+from typing import NamedTuple
+
+
+STATUS_LABELS = {
+    'available': 'Disponible',
+    'borrowed': 'Emprunté',
+    'reserved': 'Réservé',
+    'maintenance': 'Maintenance'
+}
+
+
+class ExportFormat(NamedTuple):
+    name: str
+    module: str
+    extension: str
+    content_type: str
+    # Bibliothèque requise (pour le message d'erreur si elle manque)
+    library: str
+
+
+EXPORTERS = {}
+
+
+def register(name, module, extension, content_type, library):
+    """Déclare un format d'export ; son module n'est pas importé ici"""
+    EXPORTERS[name] = ExportFormat(name, module, extension, content_type, library)
+
+
+def get_format(name):
+    """
+    Returns:
+        ExportFormat
+
+    Raises:
+        KeyError: Format inconnu
+    """
+    return EXPORTERS[name]
+
+
+def load_exporter(name):
+    """
+    Importe le module d'un format d'export.
+
+    Returns:
+        module ou None si la bibliothèque du format n'est pas installée
+    """
+    try:
+        return importlib.import_module(get_format(name).module)
+    except ImportError:
+        return None
+
+
+register(
+    'excel', 'biblio.exports.excel', '.xlsx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'openpyxl',
+)
+register(
+    'pdf', 'biblio.exports.pdf', '.pdf',
+    'application/pdf',
+    'reportlab',
+)
+register(
+    'word', 'biblio.exports.word', '.docx',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'python-docx',
+)
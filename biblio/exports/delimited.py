@@ -0,0 +1,105 @@
+"""
+Export CSV / TSV de la liste des livres, diffusé en continu.
+
+Contrairement aux formats bureautiques, aucun fichier n'est construit : les
+lignes sont écrites au fil du parcours du QuerySet, par blocs, et envoyées
+aussitôt. Le premier octet part avant même l'exécution de la requête et la
+mémoire utilisée ne dépend pas de la taille du catalogue.
+"""
+
+import csv
+import re
+import zlib
+
+from . import STATUS_LABELS
+
+
+HEADERS = ['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Éditeur', 'Année', 'Statut', 'Total', 'Disponibles', 'Langue']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'tsv': 'text/tab-separated-values; charset=utf-8',
+}
+
+_TSV_UNSAFE = re.compile(r'[\t\r\n]')
+
+# Nombre de lignes regroupées dans un même bloc envoyé au client
+ROWS_PER_BLOCK = 500
+
+
+def book_row(book):
+    """Ligne à plat pour un livre (auteurs et catégories séparés par des virgules)"""
+    return [
+        book.title,
+        book.isbn or '',
+        ', '.join([a.name for a in book.authors.all()]),
+        ', '.join([c.category_name for c in book.categories.all()]),
+        book.publisher.publisher_name if book.publisher else '',
+        book.publication_year or '',
+        STATUS_LABELS.get(book.status, book.status),
+        book.total_copies,
+        book.available_copies,
+        book.language or '',
+    ]
+
+
+class _Buffer:
+    """Pseudo-fichier qui accumule les lignes écrites par csv.writer"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def pop(self):
+        data = ''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream(rows, export_format='csv', compress=False):
+    """
+    Génère le fichier par blocs d'octets.
+
+    Args:
+        rows: Itérable de lignes (voir book_row), consommé une seule fois
+        export_format: 'csv' ou 'tsv'
+        compress: Compresse la sortie en gzip
+
+    Yields:
+        bytes
+    """
+    buffer = _Buffer()
+    if export_format == 'tsv':
+        # TSV « brut » : pas de guillemets, tabulations et sauts de ligne remplacés par des espaces
+        writer = csv.writer(buffer, delimiter='\t', quoting=csv.QUOTE_NONE, quotechar=None, lineterminator='\n')
+    else:
+        writer = csv.writer(buffer, lineterminator='\r\n')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text, flush=True):
+        data = text.encode('utf-8')
+        if compressor:
+            data = compressor.compress(data) + (compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b'')
+        return data
+
+    # En-tête envoyé tout de suite, avant l'exécution de la requête
+    writer.writerow(HEADERS)
+    yield encode(buffer.pop())
+
+    pending = 0
+    for row in rows:
+        if export_format == 'tsv':
+            row = [_TSV_UNSAFE.sub(' ', str(value)) for value in row]
+        writer.writerow(row)
+        pending += 1
+        if pending == ROWS_PER_BLOCK:
+            yield encode(buffer.pop())
+            pending = 0
+
+    data = encode(buffer.pop(), flush=False)
+    if compressor:
+        data += compressor.flush()
+    if data:
+        yield data
@@ -0,0 +1,110 @@
+"""
+Export Excel (.xlsx) de la liste des livres, avec openpyxl.
+"""
+
+import openpyxl
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+
+from . import STATUS_LABELS
+
+
+EXCEL_HEADERS = ['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Éditeur', 'Année', 'Statut', 'Total', 'Disponibles', 'Langue']
+
+
+def book_row(book):
+    """Ligne de la feuille Excel pour un livre"""
+    # Récupérer les auteurs
+    authors = ', '.join([f"{a.name}" for a in book.authors.all()])
+    if not authors:
+        authors = "Aucun auteur"
+    
+    # Récupérer les catégories
+    categories = ', '.join([c.category_name for c in book.categories.all()])
+    if not categories:
+        categories = "Aucune catégorie"
+    
+    return [
+        book.title,
+        book.isbn or 'N/A',
+        authors,
+        categories,
+        book.publisher.publisher_name if book.publisher else 'N/A',
+        book.publication_year or 'N/A',
+        STATUS_LABELS.get(book.status, book.status),
+        book.total_copies,
+        book.available_copies,
+        book.language or 'N/A'
+    ]
+
+
+def build(output, rows):
+    """
+    Génère le classeur Excel de la liste des livres.
+
+    Args:
+        output: Fichier (ou objet fichier) où écrire le .xlsx
+        rows: Itérable de lignes (voir book_row), consommé une seule fois
+
+    Returns:
+        int: Nombre de livres exportés
+    """
+    # Créer un classeur Excel
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Liste des Livres"
+    
+    # Styles
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    
+    # En-têtes
+    ws.append(EXCEL_HEADERS)
+    
+    # Appliquer le style aux en-têtes
+    for col_num, header in enumerate(EXCEL_HEADERS, 1):
+        cell = ws.cell(row=1, column=col_num)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = border
+    
+    # Données
+    exported = 0
+    for row in rows:
+        ws.append(row)
+        exported += 1
+    
+    # Ajuster la largeur des colonnes
+    for col_num in range(1, len(EXCEL_HEADERS) + 1):
+        column_letter = get_column_letter(col_num)
+        max_length = 0
+        for cell in ws[column_letter]:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = min(max_length + 2, 50)
+        ws.column_dimensions[column_letter].width = adjusted_width
+    
+    # Appliquer les bordures à toutes les cellules
+    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=len(EXCEL_HEADERS)):
+        for cell in row:
+            cell.border = border
+            cell.alignment = Alignment(vertical='center', wrap_text=True)
+    
+    # Ajouter une ligne de résumé
+    ws.append([])
+    summary_row = ws.max_row + 1
+    ws[f'A{summary_row}'] = f'Total: {exported} livres'
+    ws[f'A{summary_row}'].font = Font(bold=True, size=11)
+    
+    wb.save(output)
+    return exported
@@ -0,0 +1,172 @@
+"""
+Export PDF de la liste des livres, avec reportlab.
+
+Les lignes sont mises en page par tableaux de PDF_TABLE_CHUNK_ROWS lignes,
+produits à la demande : le temps de génération reste linéaire et seuls les
+tableaux en cours de mise en page sont gardés en mémoire.
+"""
+
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+
+from . import STATUS_LABELS
+
+
+PDF_HEADERS = ['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Statut', 'Total', 'Dispo.']
+
+# Nombre de lignes par tableau : chaque LongTable est découpé en pages
+# indépendamment, ce qui garde un temps de mise en page linéaire
+PDF_TABLE_CHUNK_ROWS = 250
+
+
+def book_row(book):
+    """Ligne du tableau PDF pour un livre"""
+    # Auteurs
+    authors = ', '.join([f"{a.name}" for a in book.authors.all()])[:50]
+    if not authors:
+        authors = "Aucun"
+    
+    # Catégories
+    categories = ', '.join([c.category_name for c in book.categories.all()])[:40]
+    if not categories:
+        categories = "Aucune"
+    
+    return [
+        book.title[:40],
+        book.isbn or 'N/A',
+        authors,
+        categories,
+        STATUS_LABELS.get(book.status, book.status),
+        str(book.total_copies),
+        str(book.available_copies)
+    ]
+
+
+class LazyStory(list):
+    """
+    Liste de flowables complétée à la demande.
+
+    reportlab consomme la liste par le début ; on ne garde donc en mémoire
+    que les quelques flowables en cours de mise en page, les suivants étant
+    produits par le générateur au fur et à mesure.
+    """
+    
+    def __init__(self, flowables):
+        super().__init__()
+        self._flowables = iter(flowables)
+        self._fill()
+    
+    def _fill(self):
+        while self._flowables is not None and super().__len__() < 2:
+            try:
+                self.append(next(self._flowables))
+            except StopIteration:
+                self._flowables = None
+    
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._fill()
+
+
+def pdf_table_style():
+    return TableStyle([
+        # En-tête
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TOPPADDING', (0, 0), (-1, 0), 12),
+        
+        # Corps du tableau
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+        
+        # Grille
+        ('GRID', (0, 0), (-1, -1), 1, colors.white),
+        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#4472C4')),
+        
+        # Alternance de couleurs
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
+        
+        # Alignement des nombres
+        ('ALIGN', (5, 1), (-1, -1), 'CENTER'),
+    ])
+
+
+def build(output, rows):
+    """
+    Génère le PDF de la liste des livres.
+
+    Args:
+        output: Fichier (ou objet fichier) où écrire le PDF
+        rows: Itérable de lignes (voir book_row), consommé une seule fois
+
+    Returns:
+        int: Nombre de livres exportés
+    """
+    doc = SimpleDocTemplate(output, pagesize=landscape(A4), topMargin=0.5*inch, bottomMargin=0.5*inch)
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1e40af'),
+        spaceAfter=30,
+        alignment=1  # Centre
+    )
+    date_style = ParagraphStyle(
+        'DateStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.grey,
+        alignment=1
+    )
+    summary_style = ParagraphStyle(
+        'Summary',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#1e40af'),
+    )
+    col_widths = [2.5*inch, 1*inch, 1.5*inch, 1.3*inch, 1*inch, 0.6*inch, 0.6*inch]
+    table_style = pdf_table_style()
+    exported = [0]
+    
+    def story():
+        # Titre
+        yield Paragraph("Liste des Livres - Bibliothèque", title_style)
+        
+        # Date de l'état du catalogue : le fichier est resservi tant que le catalogue ne change pas
+        yield Paragraph(f"État du catalogue au {datetime.now().strftime('%d/%m/%Y à %H:%M')}", date_style)
+        yield Spacer(1, 20)
+        
+        # Tableaux de PDF_TABLE_CHUNK_ROWS lignes, en-tête répété à chaque page
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            exported[0] += 1
+            if len(chunk) == PDF_TABLE_CHUNK_ROWS:
+                yield LongTable([PDF_HEADERS] + chunk, colWidths=col_widths, style=table_style, repeatRows=1)
+                chunk = []
+        if chunk or not exported[0]:
+            yield LongTable([PDF_HEADERS] + chunk, colWidths=col_widths, style=table_style, repeatRows=1)
+        
+        # Résumé
+        yield Spacer(1, 20)
+        yield Paragraph(f"<b>Total: {exported[0]} livres</b>", summary_style)
+    
+    doc.build(LazyStory(story()))
+    return exported[0]
@@ -0,0 +1,142 @@
+"""
+Export Word (.docx) de la liste des livres, avec python-docx.
+
+Les lignes du tableau sont générées en XML par lots puis analysées par lxml,
+plutôt qu'ajoutées une à une avec add_row() qui relit tout le tableau.
+"""
+
+import re
+from datetime import datetime
+from xml.sax.saxutils import escape as xml_escape
+
+from docx import Document
+from docx.shared import Inches, Pt, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from . import STATUS_LABELS
+
+
+WORD_HEADERS = ['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Statut', 'Total', 'Disponibles']
+
+# Nombre de lignes du tableau Word analysées en un seul fragment XML
+WORD_XML_CHUNK_ROWS = 500
+
+# Caractères interdits en XML 1.0 (hors tabulation et retours à la ligne)
+_XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def book_row(book):
+    """Ligne du tableau Word pour un livre"""
+    authors = ', '.join([f"{a.name}" for a in book.authors.all()])
+    categories = ', '.join([c.category_name for c in book.categories.all()])
+    return [
+        book.title,
+        book.isbn or 'N/A',
+        authors if authors else "Aucun auteur",
+        categories if categories else "Aucune catégorie",
+        STATUS_LABELS.get(book.status, book.status),
+        str(book.total_copies),
+        str(book.available_copies)
+    ]
+
+
+def _word_cell_xml(text, width, centered):
+    """XML d'une cellule : largeur fixe, texte échappé, centrage éventuel"""
+    text = xml_escape(_XML_INVALID_CHARS.sub('', str(text)))
+    paragraph_properties = '<w:pPr><w:jc w:val="center"/></w:pPr>' if centered else ''
+    return (
+        f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+        f'<w:p>{paragraph_properties}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>'
+    )
+
+
+def _word_rows_xml(rows, widths):
+    """
+    Analyse un lot de lignes en une seule fois.
+
+    python-docx relit tout le tableau à chaque add_row() : on génère plutôt
+    le XML des lignes (w:tr) en bloc, que lxml analyse en un seul appel.
+    """
+    centered = (False, False, False, False, False, True, True)
+    fragment = ''.join(
+        '<w:tr>' + ''.join(
+            _word_cell_xml(text, width, center)
+            for text, width, center in zip(row, widths, centered)
+        ) + '</w:tr>'
+        for row in rows
+    )
+    return parse_xml(f'<w:tbl {nsdecls("w")}>{fragment}</w:tbl>')
+
+
+def build(output, rows):
+    """
+    Génère le document Word de la liste des livres.
+
+    Args:
+        output: Fichier (ou objet fichier) où écrire le .docx
+        rows: Itérable de lignes (voir book_row), consommé une seule fois
+
+    Returns:
+        int: Nombre de livres exportés
+    """
+    # Créer un document Word
+    doc = Document()
+    
+    # Titre
+    title = doc.add_heading('Liste des Livres - Bibliothèque', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    # Date de l'état du catalogue : le fichier est resservi tant que le catalogue ne change pas
+    date_para = doc.add_paragraph(f"État du catalogue au {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
+    date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    date_para.runs[0].font.size = Pt(10)
+    date_para.runs[0].font.color.rgb = RGBColor(128, 128, 128)
+    
+    doc.add_paragraph()  # Espace
+    
+    # Créer le tableau (style et largeurs appliqués une seule fois)
+    table = doc.add_table(rows=1, cols=len(WORD_HEADERS))
+    table.style = 'Light Grid Accent 1'
+    widths = [Inches(2.5), Inches(1.2), Inches(1.5), Inches(1.3), Inches(1), Inches(0.7), Inches(0.8)]
+    for column, width in zip(table.columns, widths):
+        column.width = width
+    
+    # En-têtes
+    header_cells = table.rows[0].cells
+    for i, header in enumerate(WORD_HEADERS):
+        header_cells[i].text = header
+        header_cells[i].width = widths[i]
+        # Style de l'en-tête
+        for paragraph in header_cells[i].paragraphs:
+            for run in paragraph.runs:
+                run.font.bold = True
+                run.font.size = Pt(11)
+                run.font.color.rgb = RGBColor(31, 78, 121)
+        header_cells[i].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    # Données, par lots de WORD_XML_CHUNK_ROWS lignes
+    twips = [width.twips for width in widths]
+    tbl = table._tbl
+    exported = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == WORD_XML_CHUNK_ROWS:
+            tbl.extend(list(_word_rows_xml(chunk, twips)))
+            exported += len(chunk)
+            chunk = []
+    if chunk:
+        tbl.extend(list(_word_rows_xml(chunk, twips)))
+        exported += len(chunk)
+    
+    # Résumé
+    doc.add_paragraph()
+    summary = doc.add_paragraph(f'Total: {exported} livres')
+    summary.runs[0].font.bold = True
+    summary.runs[0].font.size = Pt(12)
+    summary.runs[0].font.color.rgb = RGBColor(31, 78, 121)
+    
+    doc.save(output)
+    return exported
@@ -0,0 +1,152 @@
+"""
+Facettes de recherche du catalogue.
+
+Chaque facette est comptée sur la recherche privée de son propre filtre
+(facettes disjonctives) : avec une catégorie sélectionnée, les autres
+catégories gardent le nombre de livres qu'elles ajouteraient. Les agrégats
+groupés sont réunis par UNION ALL : une seule requête SQL, quel que soit le
+nombre de facettes.
+"""
+
+from django.db.models import Q, F, Count, Value, Case, When, CharField
+from django.db.models.functions import Cast
+
+from .models import Book, BookCategory
+
+
+AVAILABLE_FACETS = ('category', 'status', 'language', 'format', 'year')
+
+# Champs de BookFilterSpec vidés pour compter une facette
+FACET_FILTERS = {
+    'category': {'categories': ()},
+    'status': {'statuses': ()},
+    'language': {'languages': ()},
+    'format': {'book_format': ''},
+    'year': {'min_year': None, 'max_year': None},
+}
+
+FORMAT_LABELS = {
+    'pdf': 'PDF',
+    'epub': 'EPUB',
+    'mobi': 'MOBI',
+    'physical': 'Physique',
+    'other': 'Autre',
+}
+
+
+def parse_facets(value):
+    """
+    Extrait la liste des facettes demandées (?facets=category,status,...)
+
+    Les noms inconnus sont ignorés et l'ordre de la requête est conservé.
+    """
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip().lower()
+        if name in AVAILABLE_FACETS and name not in names:
+            names.append(name)
+    return names
+
+
+def _format_expression():
+    """Expression SQL qui classe un livre par format de fichier"""
+    return Case(
+        When(Q(file='') | Q(file__isnull=True), then=Value('physical')),
+        When(file__iendswith='.pdf', then=Value('pdf')),
+        When(file__iendswith='.epub', then=Value('epub')),
+        When(file__iendswith='.mobi', then=Value('mobi')),
+        default=Value('other'),
+        output_field=CharField(),
+    )
+
+
+def _facet_queryset(name, base):
+    """
+    Construit la requête groupée d'une facette.
+
+    Chaque requête retourne les mêmes colonnes (facet_name, facet_key,
+    facet_label, facet_count) pour pouvoir être réunie aux autres.
+    """
+    if name == 'category':
+        queryset = BookCategory.objects.filter(book__in=base).annotate(
+            facet_name=Value(name, output_field=CharField()),
+            facet_key=Cast('category_id', CharField()),
+            facet_label=F('category__category_name'),
+        )
+        count = Count('book_id', distinct=True)
+    else:
+        expressions = {
+            'status': F('status'),
+            'language': F('language'),
+            'format': _format_expression(),
+            'year': Cast('publication_year', CharField()),
+        }
+        queryset = Book.objects.filter(pk__in=base).annotate(
+            facet_name=Value(name, output_field=CharField()),
+            facet_key=expressions[name],
+            facet_label=Value('', output_field=CharField()),
+        )
+        count = Count('pk')
+
+    return queryset.values('facet_name', 'facet_key', 'facet_label').annotate(
+        facet_count=count
+    ).order_by()
+
+
+def _label_for(name, key, label):
+    if name == 'status':
+        return dict(Book.STATUS_CHOICES).get(key, key)
+    if name == 'format':
+        return FORMAT_LABELS.get(key, key)
+    if name == 'year':
+        return key or 'Non renseignée'
+    if name == 'language':
+        return key or 'Non renseignée'
+    return label
+
+
+def _typed_key(name, key):
+    if name in ('category', 'year') and key is not None:
+        try:
+            return int(key)
+        except (TypeError, ValueError):
+            return key
+    return key
+
+
+def facet_base(spec, name):
+    """Livres sur lesquels compter une facette : la recherche sans le filtre de cette facette"""
+    return spec.replace(**FACET_FILTERS[name]).filter_queryset().order_by().values('pk')
+
+
+def compute_facets(spec, names):
+    """
+    Calcule les comptages de plusieurs facettes en une seule requête.
+
+    Args:
+        spec: BookFilterSpec de la recherche
+        names: Liste des facettes à calculer
+
+    Returns:
+        dict: {facette: [{'value', 'label', 'count'}, ...]} trié par
+        nombre de livres décroissant
+    """
+    if not names:
+        return {}
+
+    querysets = [_facet_queryset(name, facet_base(spec, name)) for name in names]
+    combined = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+
+    facets = {name: [] for name in names}
+    for row in combined:
+        name = row['facet_name']
+        key = row['facet_key']
+        facets[name].append({
+            'value': _typed_key(name, key),
+            'label': _label_for(name, key, row['facet_label']),
+            'count': row['facet_count'],
+        })
+
+    for values in facets.values():
+        values.sort(key=lambda item: (-item['count'], str(item['label'])))
+    return facets
@@ -0,0 +1,559 @@
+"""
+Jeu de données synthétique pour les tests de charge et les benchmarks.
+
+insert.sql ne contient que quelques dizaines de lignes ; la production
+compte plus de 100 000 livres, prêts et favoris. generate_catalog produit
+un catalogue de taille choisie, reproductible (même graine, même base de
+départ : mêmes données), avec des distributions proches du réel :
+
+- popularité des livres en loi de Zipf : quelques titres concentrent la
+  plupart des prêts et des favoris ; de même pour l'activité des usagers,
+  la production des auteurs, le poids des éditeurs et des catégories ;
+- 1 à 4 auteurs et 1 à 3 catégories par livre ;
+- mélange de livres physiques (1 à 6 exemplaires) et numériques (PDF,
+  EPUB, MOBI) ; seuls les exemplaires physiques sont prêtés, jamais plus
+  qu'il n'y en a : available_copies et status sont tenus à jour ;
+- prêts rendus, en cours, en retard, en attente ou refusés, datés par
+  rapport au jour de génération.
+
+Tout est écrit par bulk_create, par lots d'une transaction chacun : un
+million de lignes se charge en quelques minutes. Les clés primaires des
+livres, auteurs, éditeurs et usagers sont attribuées ici (à la suite des
+lignes existantes), ce qui évite de relire les lignes créées sous MySQL.
+
+Les livres générés ont un ISBN préfixé par FAKE_ISBN_PREFIX (979-9, non
+attribué) et les usagers un nom préfixé par FAKE_USERNAME_PREFIX ; les
+fichiers des livres numériques n'existent pas sur le stockage.
+"""
+
+import random
+import time
+from datetime import date, datetime, time as datetime_time, timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Author, Book, BookAuthor, BookCategory, Category, Favorite, Loan, Publisher
+from .models_user import UserProfile
+from .search_cache import bump_catalog_generation
+from .suggest import invalidate_suggestions
+
+
+DEFAULT_SIZES = {
+    'books': 100_000,
+    'authors': 20_000,
+    'publishers': 1_000,
+    'categories': 40,
+    'users': 5_000,
+    'loans': 300_000,
+    'favorites': 200_000,
+}
+
+FAKE_ISBN_PREFIX = '9799'
+FAKE_USERNAME_PREFIX = 'fake_'
+
+# Mot de passe inutilisable (comme set_unusable_password, sans aléa)
+FAKE_PASSWORD = f'{UNUSABLE_PASSWORD_PREFIX}fake'
+
+# Nombre d'auteurs / de catégories par livre et leur probabilité
+AUTHORS_PER_BOOK = ((1, 2, 3, 4), (75, 18, 5, 2))
+CATEGORIES_PER_BOOK = ((1, 2, 3), (55, 35, 10))
+
+LANGUAGES = (('français', 'créole haïtien', 'anglais', 'espagnol'), (70, 12, 12, 6))
+DIGITAL_FORMATS = (('pdf', 'epub', 'mobi'), (60, 35, 5))
+
+# Statut d'un prêt tiré au hasard ; ACTIVE et OVERDUE immobilisent un exemplaire
+LOAN_STATUSES = (('RETURNED', 'ACTIVE', 'OVERDUE', 'PENDING', 'REJECTED'), (72, 12, 5, 7, 4))
+LOAN_DAYS = 14
+
+# Exposants de Zipf (celui de la popularité des livres est un paramètre)
+USER_ACTIVITY_EXPONENT = 0.8
+AUTHOR_EXPONENT = 0.6
+CATEGORY_EXPONENT = 0.9
+
+CATEGORY_NAMES = (
+    'Roman', 'Policier', 'Science-Fiction', 'Fantastique', 'Historique', 'Biographie', 'Essai',
+    'Poésie', 'Théâtre', 'Littérature haïtienne', 'Littérature jeunesse', 'Bande dessinée',
+    'Philosophie', 'Histoire', "Histoire d'Haïti", 'Sociologie', 'Anthropologie', 'Économie',
+    'Droit', 'Sciences politiques', 'Religion', 'Éducation', 'Psychologie', 'Médecine',
+    'Agriculture', 'Informatique', 'Mathématiques', 'Physique', 'Chimie', 'Biologie',
+    'Environnement', 'Géographie', 'Voyages', 'Arts', 'Musique', 'Cuisine', 'Sport',
+    'Langues', 'Dictionnaires', 'Contes et légendes',
+)
+
+FIRST_NAMES = (
+    'Jean', 'Marie', 'Pierre', 'Anne', 'Jacques', 'Claire', 'Louis', 'Sophie', 'Michel', 'Nadine',
+    'Paul', 'Edwidge', 'René', 'Kettly', 'Lyonel', 'Yanick', 'Gary', 'Évelyne', 'Dany', 'Marie-Célie',
+    'Frantz', 'Jacqueline', 'Georges', 'Roselyne', 'Émile', 'Margaret', 'Alice', 'Michael', 'David',
+    'Carol', 'Anthony', 'Makenzy', 'Lucien', 'Odile', 'Jean-Claude', 'Mireille', 'Wilson', 'Farah',
+    'Stéphane', 'Guerda', 'Patrick', 'Nathalie', 'Junior', 'Fabienne', 'Ronald', 'Chantal', 'Alain',
+    'Josiane', 'Ernst', 'Myriam',
+)
+
+LAST_NAMES = (
+    'Pierre', 'Joseph', 'Jean-Baptiste', 'Louis', 'Charles', 'Étienne', 'Desroches', 'Alexis',
+    'Laferrière', 'Trouillot', 'Victor', 'Lahens', 'Ollivier', 'Phelps', 'Depestre', 'Roumain',
+    'Chauvet', 'Saint-Éloi', 'Orcel', 'Dorsinville', 'Métellus', 'Célestin', 'Dominique', 'Michel',
+    'Moïse', 'Augustin', 'Bellegarde', 'Marcelin', 'Fignolé', 'Castera', 'Morisseau', 'Philoctète',
+    'Dupré', 'Laroche', 'Durand', 'Martin', 'Bernard', 'Dubois', 'Moreau', 'Lefebvre', 'Fontaine',
+    'Chevalier', 'Garnier', 'Rousseau', 'Blanc', 'Guérin', 'Muller', 'Henry', 'Roussel', 'Nicolas',
+    'Perrin', 'Morin', 'Mathieu', 'Clément', 'Gauthier', 'Smith', 'Brown', 'Wilson', 'Taylor',
+    'Campbell', 'Tremblay', 'Gagnon', 'Roy', 'Côté', 'Bouchard', 'Gauthier', 'Lavoie', 'Fortin',
+    'Gómez', 'Rodríguez',
+)
+
+NATIONALITIES = (('Haïtienne', 'Française', 'Canadienne', 'Américaine', 'Dominicaine', 'Belge'), (55, 20, 10, 8, 4, 3))
+
+PUBLISHER_FORMS = ('Éditions {0}', '{0} & {1}', 'Presses de {2}', 'Librairie {0}', '{0} Éditeur', 'Éditions du {3}')
+PUBLISHER_PLACES = ('Port-au-Prince', 'Cap-Haïtien', 'Jacmel', 'Gonaïves', 'Paris', 'Montréal', 'Québec', 'Miami')
+PUBLISHER_THEMES = ('Soleil', 'Marron', 'Flamboyant', 'Lambi', 'Morne', 'Caraïbe', 'Lakou', 'Vieux Port', 'Rocher')
+
+TITLE_FORMS = (
+    '{noun} {adjective}', 'Les {plural} de {place}', '{noun} et {noun2}', 'Mémoires {of_place}',
+    'Le Dernier {masculine}', 'Chroniques {of_place}', '{noun} {adjective} : {subtitle}',
+    'Histoire {of_place}', 'Sous le ciel {of_place}', 'Introduction à {topic}',
+)
+TITLE_NOUNS = (
+    'Le Jardin', 'La Nuit', 'Le Cri', 'La Mer', 'Le Silence', "L'Exil", 'La Mémoire', 'Le Pays',
+    'La Colline', 'Le Vent', 'La Saison', "L'Orage", 'Le Chemin', 'La Terre', 'Le Retour', 'La Maison',
+)
+TITLE_ADJECTIVES = ('oublié', 'rouge', 'infini', 'perdu', 'sauvage', 'brûlant', 'secret', 'amer', 'nouveau', 'lointain')
+TITLE_PLURALS = ('Gouverneurs', 'Enfants', 'Fantômes', 'Voix', 'Rêves', 'Routes', 'Saisons', 'Marchés')
+TITLE_MASCULINES = ('Voyage', 'Hiver', 'Refuge', 'Témoin', 'Carnaval', 'Printemps')
+TITLE_SUBTITLES = ('roman', 'récit', 'nouvelles', 'essai', 'poèmes', 'témoignages', 'chronique')
+TITLE_TOPICS = (
+    "l'économie haïtienne", 'la sociologie', "l'anthropologie", 'la philosophie', 'la botanique',
+    "l'informatique", 'la linguistique créole', 'la géologie', 'la musique racine',
+)
+
+SUMMARY_SENTENCES = (
+    "Un récit qui traverse trois générations d'une même famille.",
+    "L'auteur revient sur les années de l'exil et du retour au pays.",
+    'Une enquête menée entre la capitale et les mornes.',
+    'Un ouvrage de référence, régulièrement réédité.',
+    'Les textes réunis ici ont paru dans plusieurs revues.',
+    'Une lecture accessible, illustrée de nombreux exemples.',
+    'Le livre a reçu plusieurs prix à sa parution.',
+    'Un portrait sensible de la vie quotidienne dans le lakou.',
+)
+
+
+def _zipf_cum_weights(count, exponent):
+    """Poids cumulés de random.choices pour des rangs en loi de Zipf"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def _ranked(rng, count):
+    """Ordre de popularité aléatoire : rang -> indice"""
+    order = list(range(count))
+    rng.shuffle(order)
+    return order
+
+
+def _isbn13(number):
+    body = f'{FAKE_ISBN_PREFIX}{number:08d}'
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(body))
+    return f'{body}{(10 - total % 10) % 10}'
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class CatalogGenerator:
+    """
+    Génère et écrit le jeu de données.
+
+    Args:
+        sizes: {table: nombre de lignes}, complété par DEFAULT_SIZES
+        seed: Graine ; chaque table a son propre générateur aléatoire, si
+            bien que changer le nombre de prêts ne change pas les livres
+        digital_ratio: Part des livres numériques
+        exponent: Exposant de Zipf de la popularité des livres
+        batch_size: Lignes par bulk_create et par transaction
+        progress: Appelé après chaque table avec (table, lignes, secondes)
+    """
+
+    def __init__(self, sizes=None, seed=0, digital_ratio=0.25, exponent=1.0, batch_size=5000, progress=None):
+        self.sizes = {**DEFAULT_SIZES, **{table: count for table, count in (sizes or {}).items() if count is not None}}
+        self.seed = seed
+        self.digital_ratio = digital_ratio
+        self.exponent = exponent
+        self.batch_size = batch_size
+        self.progress = progress
+        self.today = timezone.localdate()
+        self.counts = {}
+
+    def _rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def _write(self, table, model, objects):
+        started = time.perf_counter()
+        written = 0
+        for batch in _batches(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            written += len(batch)
+        self.counts[table] = self.counts.get(table, 0) + written
+        if self.progress:
+            self.progress(table, written, time.perf_counter() - started)
+
+    def _aware(self, day, rng):
+        moment = datetime.combine(day, datetime_time(rng.randrange(8, 20), rng.randrange(60)))
+        return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+    # ============================================
+    # RÉFÉRENTIELS
+    # ============================================
+    def categories(self):
+        """Catégories (les existantes du même nom sont réutilisées) ; retourne leurs clés"""
+        count = self.sizes['categories']
+        names = [
+            CATEGORY_NAMES[index] if index < len(CATEGORY_NAMES) else f'Catégorie {index + 1}'
+            for index in range(count)
+        ]
+        existing = dict(Category.objects.filter(category_name__in=names).values_list('category_name', 'pk'))
+        first = _next_pk(Category)
+        missing = [name for name in names if name not in existing]
+        self._write('categories', Category, (
+            Category(pk=first + offset, category_name=name) for offset, name in enumerate(missing)
+        ))
+        existing.update((name, first + offset) for offset, name in enumerate(missing))
+        return [existing[name] for name in names]
+
+    def authors(self):
+        rng = self._rng('authors')
+        first = _next_pk(Author)
+        count = self.sizes['authors']
+
+        def rows():
+            for offset in range(count):
+                name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+                if offset >= len(FIRST_NAMES) * len(LAST_NAMES) // 2:
+                    name = f'{rng.choice(FIRST_NAMES)} {chr(65 + rng.randrange(26))}. {rng.choice(LAST_NAMES)}'
+                born = date(rng.randrange(1850, 2000), rng.randrange(1, 13), rng.randrange(1, 29))
+                yield Author(
+                    pk=first + offset,
+                    name=name,
+                    nationality=rng.choices(*NATIONALITIES)[0],
+                    birth_date=born if rng.random() < 0.4 else None,
+                    biography=rng.choice(SUMMARY_SENTENCES) if rng.random() < 0.2 else None,
+                )
+
+        self._write('authors', Author, rows())
+        return list(range(first, first + count))
+
+    def publishers(self):
+        rng = self._rng('publishers')
+        first = _next_pk(Publisher)
+        count = self.sizes['publishers']
+
+        def rows():
+            for offset in range(count):
+                form = rng.choice(PUBLISHER_FORMS)
+                name = form.format(
+                    rng.choice(LAST_NAMES), rng.choice(LAST_NAMES),
+                    rng.choice(PUBLISHER_PLACES), rng.choice(PUBLISHER_THEMES),
+                )
+                yield Publisher(
+                    pk=first + offset,
+                    publisher_name=name if offset < count // 2 else f'{name} {offset}',
+                    address=f'{rng.randrange(1, 200)}, rue {rng.choice(LAST_NAMES)}, {rng.choice(PUBLISHER_PLACES)}',
+                    email=f'contact{first + offset}@example.org' if rng.random() < 0.5 else None,
+                )
+
+        self._write('publishers', Publisher, rows())
+        return list(range(first, first + count))
+
+    # ============================================
+    # LIVRES
+    # ============================================
+    def _title(self, rng):
+        place = rng.choice(PUBLISHER_PLACES)
+        title = rng.choice(TITLE_FORMS).format(
+            noun=rng.choice(TITLE_NOUNS),
+            noun2=rng.choice(TITLE_NOUNS).lower(),
+            adjective=rng.choice(TITLE_ADJECTIVES),
+            plural=rng.choice(TITLE_PLURALS),
+            place=place,
+            of_place=f'de {place}',
+            masculine=rng.choice(TITLE_MASCULINES),
+            subtitle=rng.choice(TITLE_SUBTITLES),
+            topic=rng.choice(TITLE_TOPICS),
+        )
+        if rng.random() < 0.05:
+            title = f'{title}, tome {rng.randrange(2, 6)}'
+        return title
+
+    def books(self, author_ids, publisher_ids, category_ids):
+        """
+        Livres et leurs liens auteurs / catégories.
+
+        Returns:
+            (clés des livres, exemplaires prêtables par livre : 0 pour un
+            livre numérique ou en maintenance)
+        """
+        rng = self._rng('books')
+        first = _next_pk(Book)
+        count = self.sizes['books']
+        author_ranks = _ranked(rng, len(author_ids))
+        author_weights = _zipf_cum_weights(len(author_ids), AUTHOR_EXPONENT)
+        publisher_ranks = _ranked(rng, len(publisher_ids))
+        publisher_weights = _zipf_cum_weights(len(publisher_ids), self.exponent)
+        category_weights = _zipf_cum_weights(len(category_ids), CATEGORY_EXPONENT)
+        lendable = bytearray(count)
+        book_authors = []
+        book_categories = []
+
+        def rows():
+            for offset in range(count):
+                book_id = first + offset
+                digital = rng.random() < self.digital_ratio
+                fields = {}
+                if digital:
+                    extension = rng.choices(*DIGITAL_FORMATS)[0]
+                    name = f'books/fake/{book_id}.{extension}'
+                    fields.update(
+                        file=name, file_format=extension.upper(), ingested_file=name,
+                        file_size=int(rng.lognormvariate(14.5, 1.0)),
+                        total_copies=1, available_copies=1, location=None, status='available',
+                    )
+                else:
+                    copies = min(6, 1 + int(rng.expovariate(0.9)))
+                    maintenance = rng.random() < 0.01
+                    lendable[offset] = 0 if maintenance else copies
+                    fields.update(
+                        total_copies=copies,
+                        available_copies=0 if maintenance else copies,
+                        location=f'Rayon {chr(65 + rng.randrange(12))}-{rng.randrange(1, 40)}',
+                        status='maintenance' if maintenance else 'available',
+                    )
+
+                authors = {
+                    author_ids[author_ranks[rank]]
+                    for rank in rng.choices(range(len(author_ids)), cum_weights=author_weights,
+                                            k=rng.choices(*AUTHORS_PER_BOOK)[0])
+                }
+                book_authors.extend(
+                    BookAuthor(book_id=book_id, author_id=author_id, contribution_order=order)
+                    for order, author_id in enumerate(authors, start=1)
+                )
+                categories = dict.fromkeys(
+                    category_ids[rank]
+                    for rank in rng.choices(range(len(category_ids)), cum_weights=category_weights,
+                                            k=rng.choices(*CATEGORIES_PER_BOOK)[0])
+                )
+                book_categories.extend(
+                    BookCategory(book_id=book_id, category_id=category_id, is_primary=position == 0)
+                    for position, category_id in enumerate(categories)
+                )
+
+                yield Book(
+                    pk=book_id,
+                    title=self._title(rng),
+                    isbn=_isbn13(offset),
+                    publisher_id=(
+                        publisher_ids[publisher_ranks[rng.choices(range(len(publisher_ids)), cum_weights=publisher_weights)[0]]]
+                        if publisher_ids and rng.random() < 0.95 else None
+                    ),
+                    publication_year=min(self.today.year, int(rng.triangular(1850, self.today.year + 1, 2015))),
+                    pages=max(24, min(1500, int(rng.lognormvariate(5.4, 0.5)))),
+                    language=rng.choices(*LANGUAGES)[0],
+                    summary=' '.join(rng.sample(SUMMARY_SENTENCES, rng.randrange(1, 4))) if rng.random() < 0.6 else None,
+                    **fields,
+                )
+
+        # Les liens sont écrits après chaque lot de livres (clés étrangères)
+        started = time.perf_counter()
+        for batch in _batches(rows(), self.batch_size):
+            with transaction.atomic():
+                Book.objects.bulk_create(batch)
+                BookAuthor.objects.bulk_create(book_authors)
+                BookCategory.objects.bulk_create(book_categories)
+            self.counts['books'] = self.counts.get('books', 0) + len(batch)
+            self.counts['book_authors'] = self.counts.get('book_authors', 0) + len(book_authors)
+            self.counts['book_categories'] = self.counts.get('book_categories', 0) + len(book_categories)
+            book_authors.clear()
+            book_categories.clear()
+        if self.progress:
+            links = self.counts.get('book_authors', 0) + self.counts.get('book_categories', 0)
+            self.progress('books (+ liens auteurs et catégories)', count + links, time.perf_counter() - started)
+        return list(range(first, first + count)), lendable
+
+    # ============================================
+    # USAGERS, PRÊTS, FAVORIS
+    # ============================================
+    def users(self):
+        rng = self._rng('users')
+        first = _next_pk(User)
+        count = self.sizes['users']
+        joined_span = 5 * 365
+
+        def rows():
+            for offset in range(count):
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+                joined = self.today - timedelta(days=rng.randrange(joined_span))
+                yield User(
+                    pk=first + offset,
+                    username=f'{FAKE_USERNAME_PREFIX}{offset:06d}',
+                    email=f'{FAKE_USERNAME_PREFIX}{offset:06d}@example.org',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=FAKE_PASSWORD,
+                    date_joined=self._aware(joined, rng),
+                    last_login=self._aware(joined + timedelta(days=rng.randrange((self.today - joined).days + 1)), rng)
+                    if rng.random() < 0.7 else None,
+                )
+
+        self._write('users', User, rows())
+        user_ids = list(range(first, first + count))
+        # Un administrateur pour deux cents usagers
+        self._write('profiles', UserProfile, (
+            UserProfile(user_id=user_id, role='admin' if rng.random() < 0.005 else 'user')
+            for user_id in user_ids
+        ))
+        return user_ids
+
+    def loans(self, book_ids, lendable, user_ids):
+        """Prêts ; met à jour available_copies et status des livres empruntés"""
+        rng = self._rng('loans')
+        # Seuls les livres physiques sont prêtés ; rangs de popularité communs avec les favoris
+        popular = [index for index in _ranked(self._rng('popularity'), len(book_ids)) if lendable[index]]
+        book_weights = _zipf_cum_weights(len(popular), self.exponent)
+        user_ranks = _ranked(self._rng('activity'), len(user_ids))
+        user_weights = _zipf_cum_weights(len(user_ids), USER_ACTIVITY_EXPONENT)
+        borrowed = {}
+
+        def rows():
+            if not popular or not user_ids:
+                return
+            for _ in range(self.sizes['loans']):
+                index = popular[rng.choices(range(len(popular)), cum_weights=book_weights)[0]]
+                status = rng.choices(*LOAN_STATUSES)[0]
+                if status in ('ACTIVE', 'OVERDUE'):
+                    if borrowed.get(index, 0) >= lendable[index]:
+                        status = 'RETURNED'
+                    else:
+                        borrowed[index] = borrowed.get(index, 0) + 1
+
+                loan_date = due_date = return_date = None
+                if status == 'ACTIVE':
+                    loan_date = self.today - timedelta(days=rng.randrange(LOAN_DAYS))
+                elif status == 'OVERDUE':
+                    loan_date = self.today - timedelta(days=rng.randrange(LOAN_DAYS + 1, 120))
+                elif status == 'RETURNED':
+                    loan_date = self.today - timedelta(days=rng.randrange(LOAN_DAYS, 3 * 365))
+                    return_date = loan_date + timedelta(days=rng.randrange(1, 30))
+                if loan_date:
+                    due_date = loan_date + timedelta(days=LOAN_DAYS)
+
+                yield Loan(
+                    book_id=book_ids[index],
+                    user_id=user_ids[user_ranks[rng.choices(range(len(user_ids)), cum_weights=user_weights)[0]]],
+                    loan_date=loan_date,
+                    due_date=due_date,
+                    return_date=return_date,
+                    status=status,
+                )
+
+        self._write('loans', Loan, rows())
+
+        # Une requête par nombre d'exemplaires sortis
+        by_count = {}
+        for index, out in borrowed.items():
+            by_count.setdefault(out, []).append(book_ids[index])
+        with transaction.atomic():
+            for out, ids in by_count.items():
+                for batch in _batches(ids, self.batch_size):
+                    Book.objects.filter(pk__in=batch).update(
+                        available_copies=F('total_copies') - out, status='borrowed'
+                    )
+
+    def favorites(self, book_ids, user_ids):
+        rng = self._rng('favorites')
+        ranks = _ranked(self._rng('popularity'), len(book_ids))
+        book_weights = _zipf_cum_weights(len(book_ids), self.exponent)
+        user_ranks = _ranked(self._rng('activity'), len(user_ids))
+        user_weights = _zipf_cum_weights(len(user_ids), USER_ACTIVITY_EXPONENT)
+        # Pas plus de favoris que de couples (usager, livre) possibles
+        wanted = min(self.sizes['favorites'], len(book_ids) * len(user_ids) // 2)
+        seen = set()
+
+        def rows():
+            attempts = 0
+            while len(seen) < wanted and attempts < wanted * 20:
+                attempts += 1
+                user = user_ranks[rng.choices(range(len(user_ids)), cum_weights=user_weights)[0]]
+                book = ranks[rng.choices(range(len(book_ids)), cum_weights=book_weights)[0]]
+                pair = user * len(book_ids) + book
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield Favorite(user_id=user_ids[user], book_id=book_ids[book])
+
+        self._write('favorites', Favorite, rows())
+
+    # ============================================
+    # ENSEMBLE
+    # ============================================
+    def run(self):
+        """
+        Écrit tout le jeu de données.
+
+        Returns:
+            {table: lignes créées}
+        """
+        category_ids = self.categories()
+        author_ids = self.authors()
+        publisher_ids = self.publishers()
+        book_ids, lendable = self.books(author_ids, publisher_ids, category_ids)
+        user_ids = self.users()
+        self.loans(book_ids, lendable, user_ids)
+        self.favorites(book_ids, user_ids)
+
+        # Clés attribuées ici : les séquences (PostgreSQL) doivent suivre
+        with connection.cursor() as cursor:
+            for statement in connection.ops.sequence_reset_sql(no_style(), [Category, Author, Publisher, Book, User]):
+                cursor.execute(statement)
+
+        # bulk_create n'envoie pas post_save
+        bump_catalog_generation()
+        invalidate_suggestions()
+        return self.counts
+
+
+def fake_catalog_exists():
+    """True si un jeu de données synthétique est déjà en base"""
+    return (
+        Book.objects.filter(isbn__startswith=FAKE_ISBN_PREFIX).exists()
+        or User.objects.filter(username__startswith=FAKE_USERNAME_PREFIX).exists()
+    )
+
+
+def generate_catalog(sizes=None, seed=0, **options):
+    """
+    Génère le jeu de données (voir CatalogGenerator).
+
+    Raises:
+        ValueError: Un jeu synthétique est déjà en base (ISBN et noms
+            d'utilisateur entreraient en collision)
+    """
+    if fake_catalog_exists():
+        raise ValueError(
+            'Un jeu de données synthétique est déjà en base : '
+            'repartez d\'une base vide (manage.py flush) pour en générer un autre.'
+        )
+    return CatalogGenerator(sizes=sizes, seed=seed, **options).run()
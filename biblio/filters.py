@@ -0,0 +1,308 @@
+"""
+Moteur de filtrage unique du catalogue.
+
+Toutes les vues qui listent des livres (index, API, liste, favoris, exports)
+passent par ici : les paramètres de la requête sont validés et normalisés en
+une spécification immuable (BookFilterSpec), puis compilés en un seul
+QuerySet. La recherche sur les auteurs et le filtre de catégorie utilisent
+des sous-requêtes EXISTS plutôt que des jointures, ce qui évite les lignes
+dupliquées et donc le DISTINCT.
+
+L'empreinte de la spécification (fingerprint) sert de clé aux différents
+caches de résultats.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, Count, Exists, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+from .models import Book, BookAuthor, BookCategory, Loan
+
+
+MAX_SEARCH_LENGTH = 200
+
+FORMATS = ('digital', 'physical')
+AVAILABILITIES = ('available', 'unavailable')
+STATUSES = tuple(value for value, _ in Book.STATUS_CHOICES)
+
+# Clé de tri -> (champ ou annotation, sens par défaut)
+SORTS = {
+    'title': ('title', 'asc'),
+    'author': ('author_name', 'asc'),
+    'created_at': ('created_at', 'desc'),
+    'year': ('publication_year', 'desc'),
+    'popularity': ('borrow_count', 'desc'),
+}
+SORT_ALIASES = {
+    'publication_year': 'year',
+}
+DEFAULT_SORT = '-created_at'
+
+
+def _clean_text(value):
+    return ' '.join(str(value).split())[:MAX_SEARCH_LENGTH]
+
+
+def _clean_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _getlist(params, key):
+    if hasattr(params, 'getlist'):
+        return params.getlist(key)
+    value = params.get(key, [])
+    return value if isinstance(value, (list, tuple)) else [value]
+
+
+def _parse_sort(sort, order):
+    """
+    Normalise le tri en '<clé>' (croissant) ou '-<clé>' (décroissant).
+
+    Un préfixe '-' dans le paramètre sort l'emporte sur le paramètre order ;
+    sans l'un ni l'autre, le sens par défaut de la clé s'applique.
+    """
+    sort = (sort or '').strip()
+    descending = None
+    if sort.startswith('-'):
+        sort = sort[1:]
+        descending = True
+    sort = SORT_ALIASES.get(sort, sort)
+    if sort not in SORTS:
+        return DEFAULT_SORT
+
+    if descending is None:
+        order = (order or '').strip().lower()
+        if order in ('asc', 'desc'):
+            descending = order == 'desc'
+        else:
+            descending = SORTS[sort][1] == 'desc'
+    return f'-{sort}' if descending else sort
+
+
+@dataclass(frozen=True)
+class BookFilterSpec:
+    """Spécification validée et hashable d'une recherche dans le catalogue"""
+
+    search: str = ''
+    categories: tuple = ()
+    statuses: tuple = ()
+    book_format: str = ''
+    languages: tuple = ()
+    availability: str = ''
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    sort: str = DEFAULT_SORT
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Construit une spécification à partir de request.GET (ou d'un dict).
+
+        Les valeurs invalides sont ignorées ; les listes sont dédoublonnées
+        et triées pour que l'ordre des paramètres n'ait pas d'effet.
+        """
+        categories = {_clean_int(value) for value in _getlist(params, 'category')}
+        statuses = {value.strip() for value in _getlist(params, 'status')}
+        languages = {_clean_text(value) for value in _getlist(params, 'language')}
+        book_format = (params.get('format') or '').strip()
+        availability = (params.get('availability') or '').strip()
+
+        return cls(
+            search=_clean_text(params.get('search') or ''),
+            categories=tuple(sorted(value for value in categories if value is not None)),
+            statuses=tuple(sorted(value for value in statuses if value in STATUSES)),
+            book_format=book_format if book_format in FORMATS else '',
+            languages=tuple(sorted(value for value in languages if value)),
+            availability=availability if availability in AVAILABILITIES else '',
+            min_year=_clean_int(params.get('min_year')),
+            max_year=_clean_int(params.get('max_year')),
+            sort=_parse_sort(params.get('sort'), params.get('order')),
+        )
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+    @property
+    def fingerprint(self):
+        """Empreinte stable de la spécification (la casse de la recherche est ignorée)"""
+        payload = json.dumps([
+            self.search.lower(), self.categories, self.statuses, self.book_format,
+            self.languages, self.availability, self.min_year, self.max_year, self.sort,
+        ], ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @property
+    def filters_applied(self):
+        return {
+            'search': bool(self.search),
+            'category': bool(self.categories),
+            'status': bool(self.statuses),
+            'format': bool(self.book_format),
+            'languages': bool(self.languages),
+            'year_range': self.min_year is not None or self.max_year is not None,
+        }
+
+    @property
+    def is_filtered(self):
+        return any(self.filters_applied.values()) or bool(self.availability)
+
+    # ============================================
+    # COMPILATION EN QUERYSET
+    # ============================================
+    def filter_queryset(self, queryset=None):
+        """Applique les filtres (sans tri) ; aucune jointure multi-valuée"""
+        books = Book.objects.all() if queryset is None else queryset
+        conditions = Q()
+
+        if self.search:
+            authors_match = BookAuthor.objects.filter(
+                book=OuterRef('pk'), author__name__icontains=self.search
+            )
+            conditions &= (
+                Q(title__icontains=self.search) |
+                Q(summary__icontains=self.search) |
+                Q(isbn__icontains=self.search) |
+                Q(publisher__publisher_name__icontains=self.search) |
+                Q(Exists(authors_match))
+            )
+
+        if self.categories:
+            conditions &= Q(Exists(BookCategory.objects.filter(
+                book=OuterRef('pk'), category_id__in=self.categories
+            )))
+
+        if self.statuses:
+            conditions &= Q(status__in=self.statuses)
+
+        if self.book_format == 'digital':
+            conditions &= ~Q(file='') & Q(file__isnull=False)
+        elif self.book_format == 'physical':
+            conditions &= Q(file='') | Q(file__isnull=True)
+
+        if self.languages:
+            conditions &= Q(language__in=self.languages)
+
+        if self.availability == 'available':
+            conditions &= Q(available_copies__gt=0)
+        elif self.availability == 'unavailable':
+            conditions &= Q(available_copies=0)
+
+        if self.min_year is not None:
+            conditions &= Q(publication_year__gte=self.min_year)
+        if self.max_year is not None:
+            conditions &= Q(publication_year__lte=self.max_year)
+
+        return books.filter(conditions)
+
+    def order_queryset(self, queryset):
+        """Applique le tri, avec la clé primaire pour départager les ex æquo"""
+        key = self.sort.lstrip('-')
+        descending = self.sort.startswith('-')
+        field = SORTS[key][0]
+
+        if key == 'author':
+            first_author = BookAuthor.objects.filter(book=OuterRef('pk')).order_by(
+                'contribution_order', 'author__name'
+            ).values('author__name')[:1]
+            queryset = queryset.annotate(author_name=Subquery(first_author))
+        elif key == 'popularity':
+            loans_count = Loan.objects.filter(book=OuterRef('pk')).order_by().values(
+                'book'
+            ).annotate(total=Count('pk')).values('total')
+            queryset = queryset.annotate(
+                borrow_count=Coalesce(Subquery(loans_count, output_field=IntegerField()), 0)
+            )
+
+        if descending:
+            return queryset.order_by(f'-{field}', '-pk')
+        return queryset.order_by(field, 'pk')
+
+    def compile(self, queryset=None):
+        """Retourne le QuerySet filtré et trié correspondant à la spécification"""
+        return self.order_queryset(self.filter_queryset(queryset))
+
+    # ============================================
+    # COMPTAGES
+    # ============================================
+    def approximate_counts(self):
+        """
+        Compteurs estimés d'après les statistiques de la table.
+
+        Uniquement pour une recherche sans filtre sur un catalogue dépassant
+        BIBLIO_APPROXIMATE_COUNT_THRESHOLD ; retourne None sinon.
+        """
+        threshold = getattr(settings, 'BIBLIO_APPROXIMATE_COUNT_THRESHOLD', None)
+        if threshold is None or self.is_filtered:
+            return None
+        estimate = estimate_row_count(Book)
+        if estimate is None or estimate < threshold:
+            return None
+        return {'total': estimate, 'available': None, 'approximate': True}
+
+    def counts(self, available=Q(available_copies__gt=0)):
+        """
+        Total et nombre de livres disponibles en une seule requête agrégée.
+
+        Args:
+            available: Condition qui définit un livre disponible
+        """
+        counts = self.approximate_counts()
+        if counts is None:
+            counts = self.filter_queryset().aggregate(
+                total=Count('pk'),
+                available=Count('pk', filter=available),
+            )
+            counts['approximate'] = False
+        return counts
+
+
+def estimate_row_count(model):
+    """
+    Nombre de lignes d'une table d'après les statistiques du moteur.
+
+    Returns:
+        int ou None si le moteur ne fournit pas d'estimation (SQLite)
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def parse_book_filters(params):
+    """Raccourci : BookFilterSpec.from_params(params)"""
+    return BookFilterSpec.from_params(params)
+
+
+def export_filters(params):
+    """
+    Spécification utilisée par les exports.
+
+    Par défaut, seuls les livres physiques sont exportés, sauf si un filtre
+    de format est déjà appliqué ou si include_pdf est présent.
+    """
+    spec = BookFilterSpec.from_params(params)
+    if not spec.book_format and not params.get('include_pdf'):
+        spec = spec.replace(book_format='physical')
+    return spec
@@ -426,3 +426,19 @@ class PublisherForm(forms.ModelForm):
         email = cleaned_data.get('email')
         
         return cleaned_data
+
+
+class BookImportForm(forms.Form):
+    """Formulaire d'import en masse du catalogue (admin uniquement)"""
+    file = forms.FileField(
+        label=_('Fichier CSV ou Excel'),
+        widget=forms.FileInput(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-300 rounded focus:outline-none focus:ring-2 focus:ring-primary/80 focus:border-transparent',
+            'accept': '.csv,.txt,.xlsx,.xlsm'
+        })
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label=_('Valider seulement (aucun livre créé)')
+    )
@@ -177,3 +177,24 @@ class UserRoleForm(forms.ModelForm):
                 'class': 'w-full px-4 py-2 border border-gray-300 rounded-md focus:ring-2 focus:ring-primary focus:border-transparent'
             })
         }
+
+
+class PatronImportForm(forms.Form):
+    """
+    Formulaire d'import en masse des usagers (admin uniquement)
+    """
+    file = forms.FileField(
+        label='Fichier CSV ou Excel',
+        widget=forms.FileInput(attrs={
+            'class': 'w-full px-4 py-2 border border-gray-300 rounded-md focus:ring-2 focus:ring-primary focus:border-transparent',
+            'accept': '.csv,.txt,.xlsx,.xlsm'
+        })
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Valider seulement (aucun compte créé)'
+    )
+    skip_invalid = forms.BooleanField(
+        required=False,
+        label='Créer les lignes valides malgré les erreurs'
+    )
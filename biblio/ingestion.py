@@ -0,0 +1,323 @@
+"""
+Ingestion des fichiers numériques (PDF, EPUB, MOBI).
+
+Quand un fichier est rattaché à un livre, une tâche IngestionJob est mise en
+file après le commit. La commande process_ingestion_jobs la traite hors des
+requêtes web : taille, empreinte SHA-256, format, nombre de pages et
+métadonnées du fichier sont enregistrés sur le livre. Les champs saisis à la
+main (pages, résumé, année, langue, titre) ne sont complétés que s'ils sont
+vides.
+
+Extraction :
+- PDF : nombre de pages et dictionnaire Info (pypdf) ;
+- EPUB : métadonnées Dublin Core du fichier OPF (zipfile + lxml) ;
+- MOBI : en-têtes PalmDB / MOBI / EXTH.
+"""
+
+import logging
+import os
+import re
+import struct
+import zipfile
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Book, IngestionJob
+from .storage import blob_hash, hash_file
+
+logger = logging.getLogger(__name__)
+
+
+# Une tâche « en cours » depuis plus longtemps est considérée comme abandonnée
+STALE_AFTER = timedelta(minutes=30)
+MAX_ATTEMPTS = 3
+
+FORMATS = {
+    '.pdf': 'PDF',
+    '.epub': 'EPUB',
+    '.mobi': 'MOBI',
+}
+
+# Codes de langue des métadonnées -> libellés utilisés dans le catalogue
+LANGUAGE_NAMES = {
+    'fr': 'français',
+    'en': 'anglais',
+    'es': 'espagnol',
+    'ht': 'créole',
+    'de': 'allemand',
+    'pt': 'portugais',
+}
+
+
+# ============================================
+# MISE EN FILE
+# ============================================
+def enqueue(book_id, file_name):
+    """Ajoute une tâche pour ce fichier, sauf si une tâche identique attend déjà"""
+    pending = IngestionJob.objects.filter(
+        book_id=book_id, file_name=file_name, status__in=('pending', 'running')
+    )
+    if not pending.exists():
+        IngestionJob.objects.create(book_id=book_id, file_name=file_name)
+
+
+def clear_file_details(book_id):
+    Book.objects.filter(pk=book_id).update(
+        file_format='', file_size=None, file_sha256='', file_metadata={}, ingested_file=''
+    )
+
+
+@receiver(post_save, sender=Book)
+def schedule_ingestion(sender, instance, raw=False, **kwargs):
+    """Met le fichier en file d'analyse s'il a changé depuis la dernière ingestion"""
+    if raw:
+        return
+    book_id = instance.pk
+    name = instance.file.name if instance.file else ''
+    if name and name != instance.ingested_file:
+        transaction.on_commit(lambda: enqueue(book_id, name))
+    elif not name and instance.ingested_file:
+        transaction.on_commit(lambda: clear_file_details(book_id))
+
+
+# ============================================
+# EXTRACTION
+# ============================================
+def extract_pdf(path):
+    from pypdf import PdfReader
+
+    # La date de création du PDF n'est pas celle de publication : non reprise
+    reader = PdfReader(path)
+    info = reader.metadata or {}
+    metadata = {'pages': len(reader.pages)}
+    for key in ('title', 'author', 'subject'):
+        value = getattr(info, key, None)
+        if value:
+            metadata[key] = str(value).strip()
+    return metadata
+
+
+EPUB_NAMESPACES = {
+    'container': 'urn:oasis:names:tc:opendocument:xmlns:container',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+
+
+def read_epub_package(archive):
+    """
+    Retourne le chemin et l'arbre XML du fichier OPF d'un EPUB ouvert.
+
+    Returns:
+        tuple (chemin, élément racine) ou (None, None) si l'EPUB n'en déclare pas
+    """
+    from lxml import etree
+
+    parser = etree.XMLParser(resolve_entities=False, no_network=True, recover=True)
+    container = etree.fromstring(archive.read('META-INF/container.xml'), parser)
+    rootfile = container.find('.//container:rootfile', EPUB_NAMESPACES)
+    if rootfile is None or not rootfile.get('full-path'):
+        return None, None
+    opf_path = rootfile.get('full-path')
+    return opf_path, etree.fromstring(archive.read(opf_path), parser)
+
+
+def extract_epub(path):
+    with zipfile.ZipFile(path) as archive:
+        opf_path, opf = read_epub_package(archive)
+    if opf is None:
+        return {}
+
+    def texts(tag):
+        return [
+            ' '.join(element.text.split())
+            for element in opf.iterfind(f'.//dc:{tag}', EPUB_NAMESPACES)
+            if element.text and element.text.strip()
+        ]
+
+    metadata = {}
+    for key, tag in (('title', 'title'), ('publisher', 'publisher'), ('language', 'language'), ('description', 'description')):
+        values = texts(tag)
+        if values:
+            metadata[key] = values[0]
+    authors = texts('creator')
+    if authors:
+        metadata['author'] = ', '.join(authors)
+    for identifier in texts('identifier'):
+        digits = re.sub(r'[^0-9Xx]', '', identifier)
+        if len(digits) in (10, 13):
+            metadata['isbn'] = digits
+            break
+    for date in texts('date'):
+        year = re.match(r'(\d{4})', date)
+        if year:
+            metadata['year'] = int(year.group(1))
+            break
+    return metadata
+
+
+# Types d'enregistrements EXTH utiles
+MOBI_EXTH_FIELDS = {
+    100: 'author',
+    101: 'publisher',
+    103: 'description',
+    104: 'isbn',
+    106: 'date',
+    524: 'language',
+}
+
+
+def extract_mobi(path):
+    metadata = {}
+    with open(path, 'rb') as handle:
+        header = handle.read(86)
+        if len(header) < 86 or header[60:68] != b'BOOKMOBI':
+            return metadata
+        name = header[:32].split(b'\0', 1)[0].decode('latin-1').strip()
+        if name:
+            metadata['title'] = name.replace('_', ' ')
+
+        record_offset = struct.unpack('>I', header[78:82])[0]
+        handle.seek(record_offset)
+        record = handle.read(64 * 1024)
+    if record[16:20] != b'MOBI':
+        return metadata
+
+    header_length, = struct.unpack('>I', record[20:24])
+    encoding = 'utf-8' if struct.unpack('>I', record[28:32])[0] == 65001 else 'cp1252'
+    name_offset, name_length = struct.unpack('>II', record[84:92])
+    full_name = record[name_offset:name_offset + name_length].decode(encoding, errors='replace').strip()
+    if full_name:
+        metadata['title'] = full_name
+
+    exth_flags, = struct.unpack('>I', record[128:132])
+    exth_start = 16 + header_length
+    if exth_flags & 0x40 and record[exth_start:exth_start + 4] == b'EXTH':
+        count, = struct.unpack('>I', record[exth_start + 8:exth_start + 12])
+        position = exth_start + 12
+        for _ in range(count):
+            if position + 8 > len(record):
+                break
+            kind, length = struct.unpack('>II', record[position:position + 8])
+            if length < 8:
+                break
+            if kind in MOBI_EXTH_FIELDS:
+                value = record[position + 8:position + length].decode(encoding, errors='replace').strip()
+                if value:
+                    metadata.setdefault(MOBI_EXTH_FIELDS[kind], value)
+            position += length
+
+    year = re.match(r'(\d{4})', metadata.pop('date', ''))
+    if year:
+        metadata['year'] = int(year.group(1))
+    return metadata
+
+
+EXTRACTORS = {
+    'PDF': extract_pdf,
+    'EPUB': extract_epub,
+    'MOBI': extract_mobi,
+}
+
+
+# ============================================
+# INGESTION D'UN LIVRE
+# ============================================
+def ingest_book(book):
+    """Analyse le fichier d'un livre et enregistre le résultat sur le livre"""
+    name = book.file.name
+    path = book.file.path
+    book.file_format = FORMATS.get(os.path.splitext(name)[1].lower(), '')
+    book.file_size = os.path.getsize(path)
+    book.file_sha256 = blob_hash(name) or hash_file(path)
+
+    extractor = EXTRACTORS.get(book.file_format)
+    metadata = extractor(path) if extractor else {}
+    book.file_metadata = metadata
+    book.ingested_file = name
+    fields = ['file_format', 'file_size', 'file_sha256', 'file_metadata', 'ingested_file', 'updated_at']
+
+    # Compléter uniquement les champs laissés vides
+    if not book.pages and metadata.get('pages'):
+        book.pages = metadata['pages']
+        fields.append('pages')
+    if not book.publication_year and metadata.get('year'):
+        book.publication_year = metadata['year']
+        fields.append('publication_year')
+    if not book.summary and metadata.get('description'):
+        book.summary = metadata['description']
+        fields.append('summary')
+    if not (book.title or '').strip() and metadata.get('title'):
+        book.title = metadata['title'][:500]
+        fields.append('title')
+    if not book.language and metadata.get('language'):
+        code = metadata['language'].split('-')[0].lower()
+        book.language = LANGUAGE_NAMES.get(code, metadata['language'])[:50]
+        fields.append('language')
+
+    book.save(update_fields=fields)
+    return book
+
+
+# ============================================
+# TRAITEMENT DE LA FILE
+# ============================================
+def claim_job():
+    """
+    Réserve la plus ancienne tâche en attente (ou abandonnée).
+
+    SKIP LOCKED permet de lancer plusieurs workers sur la même file.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = IngestionJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | Q(status='running', started_at__lt=now - STALE_AFTER)
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """Exécute une tâche ; en cas d'erreur, elle est retentée jusqu'à MAX_ATTEMPTS fois"""
+    try:
+        book = Book.objects.get(pk=job.book_id)
+        if (book.file.name if book.file else '') != job.file_name:
+            # Le fichier a été remplacé : une autre tâche s'en charge
+            job.error = 'Fichier remplacé avant l\'analyse'
+        else:
+            ingest_book(book)
+            job.error = ''
+        job.status = 'done'
+    except Exception as error:
+        logger.exception("Échec de l'analyse du fichier %s (livre %s)", job.file_name, job.book_id)
+        job.error = str(error)
+        job.status = 'pending' if job.attempts < MAX_ATTEMPTS else 'failed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def process_jobs(limit=None):
+    """
+    Traite les tâches jusqu'à épuisement de la file (ou limit tâches).
+
+    Returns:
+        int: Nombre de tâches traitées
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
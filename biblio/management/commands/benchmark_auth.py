@@ -0,0 +1,89 @@
+import time
+from importlib import import_module
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from biblio.roles import get_user_role
+
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le coût d'authentification d'une requête (session, utilisateur, rôle) "
+        'pour chaque moteur de session'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            help='Utilisateur à simuler (défaut : premier superutilisateur actif)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Nombre de requêtes simulées par moteur (défaut : 500)'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=sorted(SESSION_ENGINES),
+            action='append',
+            dest='engines',
+            help='Moteur à mesurer (option répétable ; défaut : tous)'
+        )
+
+    def handle(self, *args, **options):
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_active=True).order_by('-is_superuser', 'pk').first()
+        if user is None:
+            raise CommandError('Utilisateur introuvable.')
+
+        self.stdout.write(f'{"Moteur":<16} {"ms / requête":>14} {"Requêtes SQL":>14}')
+        for name in options['engines'] or SESSION_ENGINES:
+            elapsed, queries = self.measure(import_module(SESSION_ENGINES[name]).SessionStore, user, options['requests'])
+            self.stdout.write(f'{name:<16} {elapsed * 1000:>14.3f} {queries:>14.2f}')
+
+    def measure(self, store_class, user, count):
+        """Ce que font SessionMiddleware, AuthenticationMiddleware et UserRoleMiddleware"""
+        session = store_class()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        session_key = session.session_key
+        factory = RequestFactory()
+
+        def authenticated_request():
+            nonlocal session_key
+            request = factory.get('/')
+            request.session = store_class(session_key)
+            request.user = get_user(request)
+            get_user_role(request).is_admin
+            if request.session.modified:
+                request.session.save()
+                session_key = request.session.session_key
+
+        try:
+            # Première requête : rôle mis en session, caches remplis
+            authenticated_request()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                for _ in range(count):
+                    authenticated_request()
+                elapsed = time.perf_counter() - start
+        finally:
+            store_class(session_key).delete()
+        return elapsed / count, len(captured) / count
@@ -0,0 +1,55 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblio import exports
+
+
+class Command(BaseCommand):
+    help = 'Mesure le temps de génération des exports sur des lignes synthétiques'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=sorted(exports.EXPORTERS),
+            default='pdf',
+            help='Format d\'export à mesurer (défaut: pdf)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 5000, 20000],
+            help='Nombres de lignes à générer (défaut: 1000 5000 20000)'
+        )
+
+    def handle(self, *args, **options):
+        export = exports.get_format(options['format'])
+        exporter = exports.load_exporter(export.name)
+        if exporter is None:
+            raise CommandError(f'La bibliothèque {export.library} n\'est pas installée.')
+        build = exporter.build
+
+        self.stdout.write(f'{"Lignes":>10} {"Durée (s)":>12} {"ms / ligne":>12} {"Taille (Ko)":>12}')
+        for count in options['rows']:
+            rows = (
+                [
+                    f'Livre de test numéro {index}',
+                    f'978{index:010d}',
+                    'Auteur A, Auteur B',
+                    'Roman, Histoire',
+                    'Disponible',
+                    '3',
+                    '2',
+                ]
+                for index in range(count)
+            )
+            with tempfile.TemporaryFile() as output:
+                start = time.perf_counter()
+                exported = build(output, rows)
+                elapsed = time.perf_counter() - start
+                size = output.tell()
+
+            per_row = elapsed * 1000 / exported if exported else 0
+            self.stdout.write(f'{exported:>10} {elapsed:>12.2f} {per_row:>12.3f} {size / 1024:>12.0f}')
@@ -0,0 +1,123 @@
+import os
+import shutil
+import time
+
+from django.core.management.base import BaseCommand
+
+from biblio.models import Book
+from biblio.uploads import purge_expired_uploads
+from biblio.storage import BLOB_PREFIX, BLOB_GRACE_SECONDS, blob_hash, blob_name, hash_file, get_book_storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Range les fichiers numériques des livres dans le stockage par contenu '
+        'et supprime les fichiers qui ne sont plus référencés ainsi que les envois expirés'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--migrate-legacy',
+            action='store_true',
+            help='Déplace les fichiers books/<id>/<nom> vers le stockage par contenu'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche ce qui serait fait sans rien modifier'
+        )
+
+    def handle(self, *args, **options):
+        self.storage = get_book_storage()
+        self.dry_run = options['dry_run']
+
+        if options['migrate_legacy']:
+            self.migrate_legacy()
+        self.remove_orphans()
+        if not self.dry_run:
+            purged = purge_expired_uploads()
+            self.stdout.write(self.style.SUCCESS(f'{purged} envoi(s) par morceaux expiré(s) supprimé(s)'))
+        self.report()
+
+    def migrate_legacy(self):
+        """Remplace chaque ancien fichier par le fichier de même contenu"""
+        moved = 0
+        books = Book.objects.exclude(file='').exclude(file__isnull=True).exclude(
+            file__startswith=f'{BLOB_PREFIX}/'
+        ).only('pk', 'file')
+
+        for book in books.iterator():
+            legacy_name = book.file.name
+            legacy_path = self.storage.path(legacy_name)
+            if not os.path.exists(legacy_path):
+                self.stdout.write(self.style.WARNING(f'Fichier manquant pour le livre {book.pk}: {legacy_name}'))
+                continue
+
+            name = blob_name(hash_file(legacy_path), os.path.splitext(legacy_name)[1])
+            moved += 1
+            if self.dry_run:
+                self.stdout.write(f'{legacy_name} -> {name}')
+                continue
+
+            path = self.storage.path(name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                try:
+                    os.link(legacy_path, path)
+                except OSError:
+                    shutil.copy2(legacy_path, path)
+            # update() : pas de signal, django_cleanup ne touche pas à l'ancien fichier
+            Book.objects.filter(pk=book.pk).update(file=name)
+            if not Book.objects.filter(file=legacy_name).exists():
+                os.remove(legacy_path)
+
+        self.stdout.write(self.style.SUCCESS(f'{moved} fichier(s) migré(s)'))
+
+    def remove_orphans(self):
+        """Supprime les contenus non référencés et les fichiers de transit abandonnés"""
+        root = self.storage.path(BLOB_PREFIX)
+        limit = time.time() - BLOB_GRACE_SECONDS
+        referenced = set(
+            Book.objects.filter(file__startswith=f'{BLOB_PREFIX}/').values_list('file', flat=True)
+        )
+        removed = 0
+        freed = 0
+
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.storage.location).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                if not blob_hash(name) and not filename.endswith('.part'):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > limit:
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if self.dry_run:
+                    self.stdout.write(f'Suppression de {name}')
+                else:
+                    os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} fichier(s) non référencé(s) supprimé(s), {freed / 1024 / 1024:.1f} Mo libérés'
+        ))
+
+    def report(self):
+        referenced = Book.objects.exclude(file='').exclude(file__isnull=True)
+        unique_names = referenced.values('file').distinct()
+        total_size = 0
+        for name in unique_names.values_list('file', flat=True):
+            try:
+                total_size += os.path.getsize(self.storage.path(name))
+            except OSError:
+                pass
+        self.stdout.write(
+            f'{referenced.count()} livre(s) numérique(s), {unique_names.count()} fichier(s) unique(s), '
+            f'{total_size / 1024 / 1024:.1f} Mo sur disque'
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Supprime les sessions expirées par petits lots (clé primaire), '
+        'sans verrouiller la table django_session'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de sessions supprimées par requête (défaut : 1000)'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Secondes d\'attente entre deux lots (défaut : 0.1)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        deleted = 0
+
+        while True:
+            # Index sur expire_date ; chaque lot est une transaction courte
+            # qui ne verrouille que ses propres lignes
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            if len(keys) < batch_size:
+                break
+            time.sleep(options['pause'])
+
+        # Les copies en cache (cached_db) expirent d'elles-mêmes
+        self.stdout.write(self.style.SUCCESS(f'{deleted} session(s) expirée(s) supprimée(s)'))
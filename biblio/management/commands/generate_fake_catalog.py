@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblio.fake_catalog import DEFAULT_SIZES, generate_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Génère un catalogue synthétique reproductible (livres, auteurs, éditeurs, catégories, '
+        'usagers, prêts, favoris) pour les tests de charge (voir biblio/fake_catalog.py)'
+    )
+
+    def add_arguments(self, parser):
+        for table, count in DEFAULT_SIZES.items():
+            parser.add_argument(
+                f'--{table}',
+                type=int,
+                help=f'Nombre de lignes « {table} » (défaut : {count})'
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Graine : même graine et même base de départ, mêmes données (défaut : 0)'
+        )
+        parser.add_argument(
+            '--digital-ratio',
+            type=float,
+            default=0.25,
+            help='Part des livres numériques (défaut : 0.25)'
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.0,
+            help='Exposant de Zipf de la popularité des livres (défaut : 1.0)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Lignes par lot et par transaction (défaut : 5000)'
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['digital_ratio'] <= 1:
+            raise CommandError('--digital-ratio doit être compris entre 0 et 1.')
+
+        def progress(table, count, elapsed):
+            rate = count / elapsed if elapsed else 0
+            self.stdout.write(f'{table} : {count} ligne(s) en {elapsed:.1f} s ({rate:.0f} lignes/s)')
+
+        started = time.perf_counter()
+        try:
+            counts = generate_catalog(
+                sizes={table: options[table] for table in DEFAULT_SIZES},
+                seed=options['seed'],
+                digital_ratio=options['digital_ratio'],
+                exponent=options['zipf'],
+                batch_size=options['batch_size'],
+                progress=progress,
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(counts.values())} ligne(s) créée(s) en {time.perf_counter() - started:.1f} s'
+        ))
@@ -0,0 +1,51 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblio.catalog_import import import_books
+
+
+class Command(BaseCommand):
+    help = 'Importe des livres depuis un fichier CSV ou Excel (voir biblio/catalog_import.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier .csv ou .xlsx')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valide le fichier et compte les créations sans rien écrire'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Livres par lot et par transaction (défaut : BIBLIO_CATALOG_IMPORT)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as handle:
+                result = import_books(
+                    handle,
+                    os.path.basename(path),
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size'],
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        for line, message in result.errors:
+            self.stderr.write(f'Ligne {line} : {message}')
+
+        verb = 'à créer' if options['dry_run'] else 'créé(s)'
+        self.stdout.write(
+            f'{result.records} ligne(s) lue(s), {len(result.errors)} erreur(s), '
+            f'{result.duplicates} déjà au catalogue'
+        )
+        self.stdout.write(
+            f'Auteurs {verb} : {result.new_authors}, éditeurs : {result.new_publishers}, '
+            f'catégories : {result.new_categories}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} livre(s) {verb} en {result.elapsed:.1f} s ({result.rate:.0f} lignes/s)'
+        ))
@@ -0,0 +1,63 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblio.patron_import import default_workers, import_patrons
+
+
+class Command(BaseCommand):
+    help = 'Importe des usagers depuis un fichier CSV ou Excel (voir biblio/patron_import.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier .csv ou .xlsx')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valide le fichier sans créer de compte'
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Crée les lignes valides même si d\'autres sont en erreur'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processus de hachage des mots de passe (défaut : un par cœur)'
+        )
+        parser.add_argument(
+            '--hash-iterations',
+            type=int,
+            help='Coût PBKDF2 initial, remplacé par le coût normal à la première connexion'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as handle:
+                result = import_patrons(
+                    handle,
+                    os.path.basename(path),
+                    dry_run=options['dry_run'],
+                    skip_invalid=options['skip_invalid'],
+                    workers=options['workers'] or default_workers(),
+                    iterations=options['hash_iterations'],
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        elapsed = time.perf_counter() - start
+
+        for line, message in result.errors:
+            self.stderr.write(f'Ligne {line} : {message}')
+
+        self.stdout.write(f'{result.rows} ligne(s) lue(s), {len(result.errors)} erreur(s)')
+        if result.without_password:
+            self.stdout.write(f'{result.without_password} compte(s) sans mot de passe')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Validation terminée (aucun compte créé)'))
+        elif result.errors and not options['skip_invalid']:
+            raise CommandError('Import annulé : corrigez les erreurs ou utilisez --skip-invalid.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{result.created} compte(s) créé(s) en {elapsed:.1f} s'))
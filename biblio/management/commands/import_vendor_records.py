@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from biblio.vendor_records import FORMATS, import_records
+
+
+class Command(BaseCommand):
+    help = 'Importe des notices fournisseurs MARCXML ou ONIX (voir biblio/vendor_records.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier .xml')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Format du fichier (défaut : détecté d\'après l\'élément racine)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valide les notices et compte les créations sans rien écrire'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Livres par lot et par transaction (défaut : BIBLIO_CATALOG_IMPORT)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = import_records(
+                options['path'],
+                record_format=options['format'],
+                dry_run=options['dry_run'],
+                batch_size=options['batch_size'],
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        for line, message in result.errors:
+            self.stderr.write(f'Ligne {line} : {message}' if line else message)
+
+        verb = 'à créer' if options['dry_run'] else 'créé(s)'
+        self.stdout.write(
+            f'{result.records} notice(s) lue(s), {len(result.errors)} erreur(s), '
+            f'{result.duplicates} doublon(s) d\'ISBN'
+        )
+        self.stdout.write(
+            f'Auteurs {verb} : {result.new_authors}, éditeurs : {result.new_publishers}, '
+            f'catégories : {result.new_categories}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} livre(s) {verb} en {result.elapsed:.1f} s '
+            f'({result.rate:.0f} notices/s)'
+        ))
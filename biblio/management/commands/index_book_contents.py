@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from biblio.content_index import index_books
+
+
+class Command(BaseCommand):
+    help = (
+        'Extrait le texte des livres numériques (EPUB, PDF) et met à jour '
+        "l'index de recherche plein texte ; seuls les fichiers nouveaux ou modifiés sont traités"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--book',
+            type=int,
+            action='append',
+            dest='book_ids',
+            help='Identifiant d\'un livre à indexer (option répétable)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Réindexe aussi les livres déjà à jour'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help="Nombre de processus d'extraction (défaut : nombre de processeurs)"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Recommence toutes les N secondes au lieu de s\'arrêter'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            indexed = index_books(
+                book_ids=options['book_ids'],
+                rebuild=options['rebuild'],
+                workers=options['workers'],
+            )
+            if indexed or options['interval'] is None:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{indexed} livre(s) indexé(s) en {time.monotonic() - started:.1f} s'
+                ))
+            if options['interval'] is None:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
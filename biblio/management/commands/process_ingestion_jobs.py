@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F
+
+from biblio.ingestion import enqueue, process_jobs
+from biblio.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Analyse les fichiers numériques en attente (taille, empreinte, pages, métadonnées)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Traite la file puis s\'arrête (sinon, attend de nouvelles tâches)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Secondes d\'attente quand la file est vide (défaut : 5)'
+        )
+        parser.add_argument(
+            '--enqueue-missing',
+            action='store_true',
+            help='Met en file les livres dont le fichier n\'a jamais été analysé'
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            books = Book.objects.exclude(file='').exclude(file__isnull=True).exclude(
+                ingested_file=F('file')
+            ).values_list('pk', 'file')
+            count = 0
+            for book_id, name in books.iterator():
+                enqueue(book_id, name)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f'{count} livre(s) mis en file'))
+
+        while True:
+            processed = process_jobs()
+            if processed:
+                self.stdout.write(f'{processed} fichier(s) analysé(s)')
+            if options['once']:
+                break
+            # Connexions fermées entre deux passes : le worker tourne indéfiniment
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,65 @@
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+
+from . import profiling
+from .roles import get_user_role
+
+
+class UserRoleMiddleware:
+    """
+    Expose request.user_role (voir roles.py) aux vues et aux gabarits.
+
+    À placer après AuthenticationMiddleware. Le rôle n'est résolu que s'il
+    est lu.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user_role = SimpleLazyObject(lambda: get_user_role(request))
+        return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profile les requêtes échantillonnées : SQL, gabarits, sérialisation
+    (voir profiling.py), dans l'en-tête Server-Timing et le journal.
+
+    À placer en tête de MIDDLEWARE pour compter aussi le SQL des autres
+    middlewares (session, utilisateur). Retiré au démarrage si
+    BIBLIO_PROFILING['ENABLED'] est faux.
+    """
+
+    def __init__(self, get_response):
+        config = profiling.get_profiling_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rates = profiling.SampleRates(config['SAMPLE_RATES'], config['DEFAULT_SAMPLE_RATE'])
+        self.header = config['HEADER']
+        profiling.install()
+
+    def __call__(self, request):
+        if not self.sample_rates.sample(request.path):
+            return self.get_response(request)
+
+        profile = profiling.RequestProfile()
+        with profile.collect():
+            response = self.get_response(request)
+        if self.header:
+            response['Server-Timing'] = profile.server_timing()
+        if response.streaming:
+            # Exports diffusés : le contenu est produit après le retour de la vue
+            response.streaming_content = self._stream(response.streaming_content, profile, request, response)
+        else:
+            profile.log(request, response)
+        return response
+
+    @staticmethod
+    def _stream(content, profile, request, response):
+        try:
+            with profile.collect(), profile.section(profiling.SERIALIZE):
+                yield from content
+        finally:
+            profile.log(request, response, streamed=True)
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 23:48
+
+import biblio.models
+import biblio.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblio', '0006_favorite'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='file',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=biblio.storage.get_book_storage, upload_to=biblio.models.book_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'epub', 'mobi'])]),
+        ),
+    ]
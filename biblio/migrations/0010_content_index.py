@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-18 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblio', '0009_book_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='content_indexed_file',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='ContentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('start_offset', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='content_chunks', to='biblio.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('book', 'position'), name='unique_content_chunk')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContentTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk_position', models.PositiveIntegerField()),
+                ('term', models.CharField(max_length=40)),
+                ('frequency', models.PositiveIntegerField(default=1)),
+                ('first_offset', models.PositiveIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='content_terms', to='biblio.book')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'book'], name='biblio_cont_term_404893_idx')],
+            },
+        ),
+    ]
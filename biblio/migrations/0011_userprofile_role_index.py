@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-19 00:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Index de la liste des utilisateurs sur la table auth_user (application auth) :
+# pagination par date d'inscription et recherche par début d'email
+USER_INDEXES = [
+    models.Index(fields=['date_joined', 'id'], name='biblio_user_joined_idx'),
+    models.Index(fields=['email'], name='biblio_user_email_idx'),
+]
+
+
+def add_user_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in USER_INDEXES:
+        schema_editor.add_index(User, index)
+
+
+def remove_user_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in USER_INDEXES:
+        schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('biblio', '0010_content_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['role'], name='biblio_user_role_db2944_idx'),
+        ),
+        migrations.RunPython(add_user_indexes, remove_user_indexes),
+    ]
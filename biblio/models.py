@@ -2,9 +2,11 @@ from django.db import models
 from django.core.validators import FileExtensionValidator
 from django.urls import reverse
 import os
+import uuid
 
 # Import du modèle UserProfile
 from .models_user import UserProfile
+from .storage import get_book_storage
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
@@ -108,11 +110,22 @@ class Book(models.Model):
     cover_image = models.ImageField(upload_to=book_cover_path, blank=True, null=True)
     file = models.FileField(
         upload_to=book_upload_path,
+        storage=get_book_storage,
         blank=True,
         null=True,
+        db_index=True,
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'epub', 'mobi'])]
     )
     status = models.CharField(max_length=100, default="available", choices=STATUS_CHOICES)
+    # Renseignés par la chaîne d'ingestion (biblio/ingestion.py), jamais pendant une requête
+    file_format = models.CharField(max_length=10, blank=True, default='')
+    file_size = models.BigIntegerField(blank=True, null=True)
+    file_sha256 = models.CharField(max_length=64, blank=True, default='')
+    file_metadata = models.JSONField(blank=True, default=dict)
+    # Nom du fichier auquel correspondent ces informations
+    ingested_file = models.CharField(max_length=255, blank=True, default='')
+    # Fichier dont le texte est dans l'index plein texte (biblio/content_index.py)
+    content_indexed_file = models.CharField(max_length=255, blank=True, default='')
     authors = models.ManyToManyField(Author, through='BookAuthor')
     categories = models.ManyToManyField(Category, through='BookCategory')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -142,6 +155,8 @@ class Book(models.Model):
     @property
     def file_type(self):
         """Retourne le type de fichier"""
+        if self.file_format and self.file and self.ingested_file == self.file.name:
+            return self.file_format
         ext = self.file_extension
         if ext == '.pdf':
             return 'PDF'
@@ -168,6 +183,7 @@ class Book(models.Model):
             'status': self.status,
             'is_digital': self.is_digital,
             'file_type': self.file_type,
+            'file_size': self.file_size,
             'publisher': self.publisher.to_dict() if self.publisher else None,
             'categories': [cat.to_dict() for cat in self.categories.all()],
             'authors': [author.to_dict() for author in self.authors.all()],
@@ -245,3 +261,109 @@ class Favorite(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
+
+
+class UploadSession(models.Model):
+    """
+    Envoi d'un fichier numérique par morceaux.
+
+    Les morceaux sont ajoutés à un fichier de transit ; received_size indique
+    où reprendre après une coupure. Voir biblio/uploads.py.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'En cours'),
+        ('complete', 'Terminé'),
+        ('aborted', 'Abandonné'),
+    ]
+
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    book = models.ForeignKey(Book, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)
+    # Empreinte annoncée par le client, vérifiée à la finalisation
+    expected_sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Envoi par morceaux"
+        verbose_name_plural = "Envois par morceaux"
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+
+class IngestionJob(models.Model):
+    """
+    Analyse en attente du fichier numérique d'un livre.
+
+    La file est traitée par la commande process_ingestion_jobs, hors des
+    requêtes web. Voir biblio/ingestion.py.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    # Fichier à analyser ; ignoré si le livre a changé de fichier entre-temps
+    file_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        verbose_name = "Analyse de fichier"
+        verbose_name_plural = "Analyses de fichiers"
+
+    def __str__(self):
+        return f"{self.book_id} - {self.file_name} ({self.get_status_display()})"
+
+
+class ContentChunk(models.Model):
+    """
+    Morceau du texte extrait du fichier numérique d'un livre.
+
+    start_offset est la position du morceau (en caractères) dans le texte
+    complet du livre. Voir biblio/content_index.py.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='content_chunks')
+    position = models.PositiveIntegerField()
+    start_offset = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'position'], name='unique_content_chunk')
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} #{self.position}"
+
+
+class ContentTerm(models.Model):
+    """
+    Entrée de l'index inversé : un terme normalisé dans un morceau de texte.
+
+    first_offset est la position de la première occurrence dans le morceau.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='content_terms')
+    chunk_position = models.PositiveIntegerField()
+    term = models.CharField(max_length=40)
+    frequency = models.PositiveIntegerField(default=1)
+    first_offset = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['term', 'book'])]
+
+    def __str__(self):
+        return f"{self.term} ({self.book_id} #{self.chunk_position})"
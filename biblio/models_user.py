@@ -24,6 +24,7 @@ class UserProfile(models.Model):
     class Meta:
         verbose_name = 'Profil utilisateur'
         verbose_name_plural = 'Profils utilisateurs'
+        indexes = [models.Index(fields=['role'])]
     
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
@@ -64,19 +65,27 @@ class UserProfile(models.Model):
         }
 
 
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """
-    Signal pour créer automatiquement un profil lors de la création d'un utilisateur
-    """
-    if created:
-        UserProfile.objects.create(user=instance)
+# Champs de User sans rapport avec le profil : connexion, changement de mot de passe
+PROFILE_INDEPENDENT_FIELDS = frozenset({'last_login', 'password'})
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def sync_user_profile(sender, instance, created, update_fields=None, raw=False, **kwargs):
     """
-    Signal pour sauvegarder le profil lors de la sauvegarde de l'utilisateur
+    Signal qui crée le profil d'un nouvel utilisateur et enregistre le profil
+    modifié en même temps que l'utilisateur.
+
+    Le profil n'est ni chargé ni réécrit quand il n'a pas été touché : une
+    connexion (last_login) ou un changement de mot de passe ne coûte aucune
+    requête sur UserProfile.
     """
-    if hasattr(instance, 'profile'):
+    if raw:
+        return
+    if created:
+        UserProfile.objects.get_or_create(user=instance)
+        return
+    if update_fields is not None and set(update_fields) <= PROFILE_INDEPENDENT_FIELDS:
+        return
+    # Seul un profil déjà chargé sur cette instance a pu être modifié
+    if User.profile.is_cached(instance):
         instance.profile.save()
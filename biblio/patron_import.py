@@ -0,0 +1,330 @@
+"""
+Import en masse des usagers depuis un fichier CSV ou Excel.
+
+Le fichier est lu et validé en un seul passage, ligne par ligne : les
+doublons sont cherchés dans le fichier puis dans la base par lots de
+BATCH_SIZE (une requête par lot et par colonne unique), sans tenir compte de
+la casse des deux côtés. Les mots de passe sont ensuite hachés et les
+comptes créés par bulk_create, utilisateurs puis profils, dans une seule
+transaction.
+
+PBKDF2 occupe un cœur par mot de passe : la commande import_patrons hache
+dans un pool de processus (workers). L'import depuis l'interface hache dans
+le processus de la requête : un worker web ne doit pas créer de processus
+(connexions et verrous hérités) ni occuper tous les cœurs du serveur. Il est
+donc limité à WEB_MAX_PASSWORDS mots de passe, pour rester loin du délai
+de Gunicorn (--timeout 120 dans deploy.sh).
+
+bulk_create n'envoie pas post_save : le profil et son rôle sont créés ici,
+sans passer par sync_user_profile.
+
+Colonnes reconnues (en-têtes en français ou en anglais, casse et accents
+ignorés) : username, email, first_name, last_name, password, role, phone,
+address. Un mot de passe vide donne un compte sans mot de passe utilisable.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connections, transaction
+from django.db.models.functions import Lower
+
+from .models_user import UserProfile
+from .tabular import header_key, read_table
+
+
+DEFAULT_SETTINGS = {
+    'BATCH_SIZE': 500,
+    # Processus de hachage de la commande import_patrons (None : un par cœur)
+    'WORKERS': None,
+    # Coût PBKDF2 des mots de passe importés (None : celui du hacheur). Un coût
+    # réduit est remplacé par le coût normal à la première connexion.
+    'HASH_ITERATIONS': None,
+    # Mots de passe hachés au plus par un import depuis l'interface (environ
+    # 0,3 s chacun au coût par défaut de Django : 200 font une minute)
+    'WEB_MAX_PASSWORDS': 200,
+}
+
+# Colonne -> en-têtes acceptés (normalisés par tabular.header_key)
+COLUMNS = {
+    'username': ('username', 'nomdutilisateur', 'identifiant', 'login'),
+    'email': ('email', 'courriel', 'mail', 'adresseemail'),
+    'first_name': ('firstname', 'prenom'),
+    'last_name': ('lastname', 'nom', 'nomdefamille'),
+    'password': ('password', 'motdepasse'),
+    'role': ('role',),
+    'phone': ('phone', 'telephone'),
+    'address': ('address', 'adresse'),
+}
+REQUIRED_COLUMNS = ('username', 'email', 'first_name', 'last_name')
+
+ROLE_VALUES = {'admin': 'admin', 'administrateur': 'admin', 'user': 'user', 'utilisateur': 'user', '': 'user'}
+
+# Parallélisme inutile en dessous de ce nombre de mots de passe
+MIN_POOL_PASSWORDS = 8
+
+_username_validator = UnicodeUsernameValidator()
+
+
+class PatronRow(NamedTuple):
+    line: int
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    password: str
+    role: str
+    phone: str
+    address: str
+
+
+class ImportResult(NamedTuple):
+    rows: int
+    created: int
+    # [(numéro de ligne, message)]
+    errors: list
+    without_password: int
+
+
+def get_patron_import_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_PATRON_IMPORT', {})}
+
+
+def read_rows(fileobj, filename):
+    """Lignes du fichier (voir tabular.read_table)"""
+    return read_table(fileobj, filename, COLUMNS, REQUIRED_COLUMNS)
+
+
+# ============================================
+# VALIDATION
+# ============================================
+def _row_errors(row):
+    errors = []
+    try:
+        _username_validator(row.username)
+        if len(row.username) > User._meta.get_field('username').max_length:
+            raise ValidationError("Nom d'utilisateur trop long.")
+    except ValidationError as error:
+        errors.append(f"Nom d'utilisateur invalide : {row.username or '(vide)'} ({' '.join(error.messages)})")
+    try:
+        validate_email(row.email)
+    except ValidationError:
+        errors.append(f"Email invalide : {row.email or '(vide)'}")
+    if not row.first_name or not row.last_name:
+        errors.append('Prénom et nom obligatoires.')
+    if max(len(row.first_name), len(row.last_name)) > User._meta.get_field('first_name').max_length:
+        errors.append('Prénom ou nom trop long.')
+    if row.role is None:
+        errors.append('Rôle inconnu (admin ou user).')
+    if len(row.phone) > UserProfile._meta.get_field('phone').max_length:
+        errors.append('Numéro de téléphone trop long.')
+    if row.password and not errors:
+        user = User(username=row.username, email=row.email, first_name=row.first_name, last_name=row.last_name)
+        try:
+            validate_password(row.password, user)
+        except ValidationError as error:
+            errors.append(f"Mot de passe refusé : {' '.join(error.messages)}")
+    return errors
+
+
+def _existing_values(field, values):
+    """Valeurs (en minuscules) de values déjà prises dans la colonne field, casse ignorée"""
+    return set(
+        User.objects.annotate(folded=Lower(field))
+        .filter(folded__in={value.lower() for value in values})
+        .values_list('folded', flat=True)
+    )
+
+
+def _existing_in_database(batch):
+    """Erreurs des lignes du lot dont l'identifiant ou l'email existe déjà"""
+    usernames = _existing_values('username', [row.username for row in batch])
+    emails = _existing_values('email', [row.email for row in batch])
+    errors = []
+    for row in batch:
+        if row.username.lower() in usernames:
+            errors.append((row.line, f"Le nom d'utilisateur {row.username} existe déjà."))
+        elif row.email.lower() in emails:
+            errors.append((row.line, f"L'adresse email {row.email} est déjà utilisée."))
+    return errors
+
+
+def validate_rows(rows, batch_size=None):
+    """
+    Valide les lignes lues par read_rows, en un seul passage.
+
+    Returns:
+        (lignes valides [PatronRow], erreurs [(numéro de ligne, message)], nombre de lignes)
+    """
+    batch_size = batch_size or get_patron_import_settings()['BATCH_SIZE']
+    valid, errors, batch = [], [], []
+    seen_usernames, seen_emails = set(), set()
+    count = 0
+
+    def check_batch():
+        rejected = _existing_in_database(batch)
+        rejected_lines = {line for line, _ in rejected}
+        errors.extend(rejected)
+        valid.extend(row for row in batch if row.line not in rejected_lines)
+        batch.clear()
+
+    for line, values in rows:
+        count += 1
+        row = PatronRow(
+            line=line,
+            username=values.get('username', ''),
+            email=values.get('email', ''),
+            first_name=values.get('first_name', ''),
+            last_name=values.get('last_name', ''),
+            password=values.get('password', ''),
+            role=ROLE_VALUES.get(header_key(values.get('role', ''))),
+            phone=values.get('phone', ''),
+            address=values.get('address', ''),
+        )
+        row_errors = _row_errors(row)
+        if row.username.lower() in seen_usernames:
+            row_errors.append(f"Nom d'utilisateur en double dans le fichier : {row.username}")
+        if row.email.lower() in seen_emails:
+            row_errors.append(f"Email en double dans le fichier : {row.email}")
+        seen_usernames.add(row.username.lower())
+        seen_emails.add(row.email.lower())
+        if row_errors:
+            errors.extend((line, message) for message in row_errors)
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            check_batch()
+    if batch:
+        check_batch()
+    return valid, errors, count
+
+
+# ============================================
+# HACHAGE ET CRÉATION
+# ============================================
+def hash_password(password, iterations=None):
+    """Hache un mot de passe ; vide, il donne un mot de passe inutilisable"""
+    if not password:
+        return make_password(None)
+    hasher = get_hasher()
+    if iterations and hasattr(hasher, 'iterations'):
+        return hasher.encode(password, hasher.salt(), iterations)
+    return hasher.encode(password, hasher.salt())
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def default_workers():
+    """Processus de hachage de la commande import_patrons"""
+    return get_patron_import_settings()['WORKERS'] or os.cpu_count() or 1
+
+
+def hash_passwords(passwords, workers=1, iterations=None):
+    """
+    Hache les mots de passe, dans un pool de workers processus s'il y en a plus d'un.
+
+    Le pool est réservé aux commandes : ne pas l'utiliser depuis une vue.
+
+    Returns:
+        list: Mots de passe hachés, dans l'ordre de passwords
+    """
+    iterations = iterations or get_patron_import_settings()['HASH_ITERATIONS']
+    encode = partial(hash_password, iterations=iterations)
+    if not workers or workers == 1 or sum(1 for password in passwords if password) < MIN_POOL_PASSWORDS:
+        return [encode(password) for password in passwords]
+
+    # Les processus du pool ne doivent pas hériter des connexions ouvertes
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(encode, passwords, chunksize=chunksize))
+
+
+def create_patrons(patrons, password_hashes, batch_size=None):
+    """
+    Crée les comptes et leurs profils par lots, dans une transaction.
+
+    Returns:
+        int: Nombre de comptes créés
+    """
+    batch_size = batch_size or get_patron_import_settings()['BATCH_SIZE']
+    with transaction.atomic():
+        for start in range(0, len(patrons), batch_size):
+            batch = patrons[start:start + batch_size]
+            User.objects.bulk_create([
+                User(
+                    username=row.username,
+                    email=row.email,
+                    first_name=row.first_name,
+                    last_name=row.last_name,
+                    password=password,
+                )
+                for row, password in zip(batch, password_hashes[start:start + batch_size])
+            ])
+            # MySQL ne renvoie pas les clés créées par bulk_create
+            user_ids = dict(
+                User.objects.filter(username__in=[row.username for row in batch]).values_list('username', 'id')
+            )
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user_id=user_ids[row.username],
+                    role=row.role,
+                    phone=row.phone or None,
+                    address=row.address or None,
+                )
+                for row in batch
+            ])
+    return len(patrons)
+
+
+def import_patrons(fileobj, filename, dry_run=False, skip_invalid=False, workers=1, iterations=None,
+                   max_passwords=None):
+    """
+    Importe les usagers d'un fichier CSV ou Excel.
+
+    Args:
+        fileobj: Fichier binaire
+        filename: Nom du fichier (extension .csv, .xlsx…)
+        dry_run: Valider seulement, sans rien créer
+        skip_invalid: Créer les lignes valides même si d'autres sont en erreur
+            (par défaut, une seule erreur annule tout l'import)
+        workers: Processus de hachage (1 : dans ce processus, seule valeur
+            possible depuis une vue)
+        iterations: Coût PBKDF2 des mots de passe importés
+        max_passwords: Nombre maximum de mots de passe à hacher (None : sans
+            limite) ; la validation seule (dry_run) n'est pas limitée
+
+    Returns:
+        ImportResult
+
+    Raises:
+        ValueError: Fichier illisible, colonnes obligatoires absentes ou
+            trop de mots de passe à hacher
+    """
+    valid, errors, count = validate_rows(read_rows(fileobj, filename))
+    without_password = sum(1 for row in valid if not row.password)
+    if dry_run or not valid or (errors and not skip_invalid):
+        return ImportResult(count, 0, errors, without_password)
+
+    with_password = len(valid) - without_password
+    if max_passwords is not None and with_password > max_passwords:
+        raise ValueError(
+            f'{with_password} mots de passe à hacher : au-delà de {max_passwords}, l\'import dépasserait '
+            f'le délai d\'une requête. Utilisez la commande « python manage.py import_patrons {filename} ».'
+        )
+
+    password_hashes = hash_passwords([row.password for row in valid], workers, iterations)
+    created = create_patrons(valid, password_hashes)
+    return ImportResult(count, created, errors, without_password)
@@ -0,0 +1,194 @@
+"""
+Profilage par requête : SQL, rendu des gabarits, sérialisation.
+
+Activé par BIBLIO_PROFILING['ENABLED'] (voir middleware.ProfilingMiddleware ;
+désactivé, le middleware est retiré au démarrage et ne coûte rien). Une
+requête est profilée avec la probabilité donnée par SAMPLE_RATES pour le
+plus long préfixe de son chemin (DEFAULT_SAMPLE_RATE sinon) ; les autres ne
+paient qu'un tirage aléatoire. Pour une requête profilée :
+
+- chaque requête SQL est comptée et chronométrée (execute_wrapper) ;
+- le rendu des gabarits est chronométré ;
+- la sérialisation aussi : encodage des JsonResponse, blocs marqués par
+  section(SERIALIZE) dans les vues, production des réponses diffusées.
+
+Le SQL lancé pendant un rendu ou une sérialisation (QuerySet paresseux)
+n'est compté qu'une fois, dans db. Les mesures partent dans l'en-tête
+Server-Timing (onglet Réseau des outils de développement) et dans une
+ligne JSON du journal biblio.profiling ; pour une réponse diffusée, la
+ligne est écrite à la fin de la diffusion.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    # Probabilité de profiler une requête dont aucun préfixe ne correspond
+    'DEFAULT_SAMPLE_RATE': 0.0,
+    # {préfixe de chemin: probabilité}, ex. {'/api/': 0.05, '/books/export/': 1.0}
+    'SAMPLE_RATES': {},
+    # En-tête Server-Timing sur les réponses profilées
+    'HEADER': True,
+}
+
+TEMPLATE = 'tpl'
+SERIALIZE = 'ser'
+
+_current = contextvars.ContextVar('biblio_profile', default=None)
+_installed = False
+
+
+def get_profiling_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_PROFILING', {})}
+
+
+class SampleRates:
+    """Probabilité de profilage d'un chemin, par plus long préfixe"""
+
+    def __init__(self, rates, default):
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.default = default
+
+    def rate(self, path):
+        for prefix, rate in self.rates:
+            if path.startswith(prefix):
+                return rate
+        return self.default
+
+    def sample(self, path):
+        rate = self.rate(path)
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class RequestProfile:
+    """Mesures d'une requête"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.sections = {TEMPLATE: 0.0, SERIALIZE: 0.0}
+        self._open = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    @contextmanager
+    def section(self, kind):
+        """Chronomètre un bloc, hors SQL ; les blocs imbriqués du même type ne comptent qu'une fois"""
+        if kind in self._open:
+            yield
+            return
+        self._open.add(kind)
+        started = time.perf_counter()
+        db_before = self.db_seconds
+        try:
+            yield
+        finally:
+            self._open.discard(kind)
+            elapsed = time.perf_counter() - started - (self.db_seconds - db_before)
+            self.sections[kind] = self.sections.get(kind, 0.0) + max(elapsed, 0.0)
+
+    @contextmanager
+    def collect(self):
+        """Rend le profil courant et compte le SQL de toutes les connexions"""
+        token = _current.set(self)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield self
+        finally:
+            _current.reset(token)
+
+    def timings(self):
+        """{nom: millisecondes} ; app est le temps restant (code Python des vues, middlewares)"""
+        total = time.perf_counter() - self.started
+        measured = self.db_seconds + sum(self.sections.values())
+        return {
+            'db': self.db_seconds * 1000,
+            TEMPLATE: self.sections[TEMPLATE] * 1000,
+            SERIALIZE: self.sections[SERIALIZE] * 1000,
+            'app': max(total - measured, 0.0) * 1000,
+            'total': total * 1000,
+        }
+
+    def server_timing(self):
+        timings = self.timings()
+        entries = [f'db;dur={timings["db"]:.1f};desc="SQL x{self.db_queries}"']
+        entries += [f'{name};dur={timings[name]:.1f}' for name in (TEMPLATE, SERIALIZE, 'app', 'total')]
+        return ', '.join(entries)
+
+    def log(self, request, response, streamed=False):
+        timings = self.timings()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(getattr(request, 'resolver_match', None), 'view_name', None),
+            'status': response.status_code,
+            'streamed': streamed,
+            'db_queries': self.db_queries,
+            **{f'{name}_ms': round(value, 1) for name, value in timings.items()},
+        }))
+
+
+def current_profile():
+    return _current.get()
+
+
+def section(kind):
+    """
+    Bloc chronométré dans le profil de la requête courante, s'il y en a un.
+
+        with profiling.section(profiling.SERIALIZE):
+            data = [book.to_dict() for book in books]
+    """
+    profile = _current.get()
+    return profile.section(kind) if profile is not None else nullcontext()
+
+
+def _timed(kind, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return function(*args, **kwargs)
+        with profile.section(kind):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def install():
+    """
+    Instrumente le rendu des gabarits et l'encodage des JsonResponse.
+
+    Appelé une fois, au démarrage du middleware activé. Hors requête
+    profilée, l'enveloppe ne coûte qu'une lecture de ContextVar.
+    """
+    global _installed
+    if _installed:
+        return
+    from django.http import JsonResponse
+    from django.template.backends.django import Template
+
+    Template.render = _timed(TEMPLATE, Template.render)
+    JsonResponse.__init__ = _timed(SERIALIZE, JsonResponse.__init__)
+    _installed = True
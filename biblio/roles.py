@@ -0,0 +1,140 @@
+"""
+Rôle de l'utilisateur connecté, résolu une fois puis gardé en session.
+
+Le rôle (avec le nom affiché et l'avatar utilisés par la barre latérale) est
+lu dans UserProfile à la première requête, puis conservé dans la session
+avec un numéro de version. La version de chaque utilisateur est tenue dans
+le cache partagé et changée à chaque modification de son profil (changement
+de rôle par change_user_role_view, admin, formulaire de profil) : la session
+est alors relue à la requête suivante, quel que soit le worker.
+
+Une version absente du cache (éviction, vidage, redémarrage) est remplacée
+par une valeur aléatoire neuve, que ne porte aucune session : le rôle est
+relu. Si le cache ne garde rien, le rôle est relu à chaque requête.
+
+Les décorateurs, les vues et les gabarits (request.user_role, voir
+middleware.py) lisent donc le rôle sans requête SQL.
+"""
+
+import secrets
+from typing import NamedTuple, Optional
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models_user import PROFILE_INDEPENDENT_FIELDS, UserProfile
+
+
+ROLE_SESSION_KEY = '_biblio_user_role'
+ROLE_VERSION_KEY = 'biblio:role_version:{user_id}'
+
+
+class UserRole(NamedTuple):
+    user_id: Optional[int]
+    role: Optional[str]
+    role_display: str
+    full_name: str
+    avatar_url: Optional[str]
+    version: int
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+ANONYMOUS_ROLE = UserRole(None, None, '', '', None, 0)
+
+
+# ============================================
+# VERSION PARTAGÉE ENTRE LES WORKERS
+# ============================================
+def _new_version():
+    return secrets.randbits(62)
+
+
+def get_role_version(user_id):
+    """Version courante, ou None si le cache ne peut pas en garder"""
+    key = ROLE_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # add : si un autre worker vient d'en créer une, c'est la sienne qui compte
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_role_version(user_id):
+    cache.set(ROLE_VERSION_KEY.format(user_id=user_id), _new_version(), None)
+
+
+def _schedule_bump(user_id):
+    transaction.on_commit(lambda: bump_role_version(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_role(sender, instance, **kwargs):
+    _schedule_bump(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_role(sender, instance, update_fields=None, **kwargs):
+    # Connexion, mot de passe : le nom affiché ne change pas
+    if update_fields is not None and set(update_fields) <= PROFILE_INDEPENDENT_FIELDS:
+        return
+    _schedule_bump(instance.pk)
+
+
+# ============================================
+# RÉSOLUTION
+# ============================================
+def load_user_role(user, version):
+    """Lit le rôle dans la base (une requête)"""
+    profile = UserProfile.objects.filter(user_id=user.pk).first()
+    if profile is None:
+        full_name = f"{user.first_name} {user.last_name}".strip() or user.username
+        return UserRole(user.pk, None, '', full_name, None, version)
+    profile.user = user
+    return UserRole(
+        user.pk,
+        profile.role,
+        profile.get_role_display(),
+        profile.full_name,
+        profile.avatar.url if profile.avatar else None,
+        version,
+    )
+
+
+def resolve_user_role(request):
+    user = request.user
+    if not user.is_authenticated:
+        return ANONYMOUS_ROLE
+
+    version = get_role_version(user.pk)
+    session = getattr(request, 'session', None)
+    data = session.get(ROLE_SESSION_KEY) if session is not None else None
+    if data and version is not None:
+        role = UserRole(*data)
+        if role.user_id == user.pk and role.version == version:
+            return role
+
+    role = load_user_role(user, version)
+    if session is not None:
+        session[ROLE_SESSION_KEY] = list(role)
+    return role
+
+
+def get_user_role(request):
+    """Rôle de l'utilisateur de la requête, calculé au plus une fois par requête"""
+    try:
+        return request._biblio_user_role
+    except AttributeError:
+        request._biblio_user_role = resolve_user_role(request)
+        return request._biblio_user_role
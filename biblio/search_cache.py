@@ -0,0 +1,241 @@
+"""
+Cache des résultats de recherche du catalogue.
+
+L'interface de filtrage de la page d'accueil ré-émet en permanence des requêtes
+quasi identiques vers /api/books/. Plutôt que de relancer la requête filtrée
+(avec ses jointures et son DISTINCT) à chaque fois, on garde en mémoire, pour
+chaque combinaison de filtres, la liste ordonnée des identifiants de livres et
+les compteurs associés. Les pages suivantes sont alors servies par une simple
+recherche par clé primaire.
+
+La clé de cache est l'empreinte de la spécification de filtres (voir
+biblio/filters.py) combinée à la génération du catalogue. Toute modification
+d'un livre, d'un auteur, d'une catégorie ou d'un éditeur change la génération,
+ce qui invalide d'un coup toutes les entrées.
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Book, Author, Category, Publisher, BookAuthor, BookCategory
+
+
+CATALOG_GENERATION_KEY = 'biblio:catalog_generation'
+
+DEFAULT_SETTINGS = {
+    'MAX_ENTRIES': 256,       # Nombre maximum de recherches gardées
+    'MAX_IDS': 10000,         # Au-delà, le résultat n'est pas mis en cache
+    'MAX_TOTAL_IDS': 200000,  # Plafond global d'identifiants en mémoire
+}
+
+
+def get_cache_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_SEARCH_CACHE', {})}
+
+
+# ============================================
+# GÉNÉRATION DU CATALOGUE
+# ============================================
+def get_catalog_generation():
+    """
+    Retourne la génération courante du catalogue.
+
+    La génération est stockée dans le cache du projet pour être partagée
+    entre les workers Gunicorn.
+    """
+    generation = cache.get(CATALOG_GENERATION_KEY)
+    if generation is None:
+        cache.add(CATALOG_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(CATALOG_GENERATION_KEY)
+    return generation
+
+
+def bump_catalog_generation():
+    """
+    Change la génération du catalogue.
+
+    On utilise une valeur aléatoire plutôt qu'un compteur : deux workers qui
+    invalident en même temps ne peuvent pas retomber sur la même valeur.
+    """
+    cache.set(CATALOG_GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_save, sender=BookAuthor)
+@receiver(post_delete, sender=BookAuthor)
+@receiver(post_save, sender=BookCategory)
+@receiver(post_delete, sender=BookCategory)
+def invalidate_on_catalog_change(sender, **kwargs):
+    """Invalide les recherches en cache après chaque modification du catalogue"""
+    # Après le commit, pour qu'une recherche concurrente ne remette pas en
+    # cache un résultat calculé avant la modification
+    transaction.on_commit(bump_catalog_generation)
+
+
+@receiver(m2m_changed, sender=BookAuthor)
+@receiver(m2m_changed, sender=BookCategory)
+def invalidate_on_relation_change(sender, action, **kwargs):
+    """Invalide les recherches en cache après un .set()/.add() sur les auteurs ou catégories"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_catalog_generation)
+
+
+# ============================================
+# CLÉ DE CACHE
+# ============================================
+def cache_key(spec):
+    """
+    Clé de cache d'une recherche.
+
+    Args:
+        spec: BookFilterSpec (paramètres déjà validés et normalisés : ordre,
+            espaces et casse n'ont pas d'effet sur son empreinte)
+
+    Returns:
+        str: Empreinte de la spécification combinée à la génération du catalogue
+    """
+    return f'{spec.fingerprint}:{get_catalog_generation()}'
+
+
+# ============================================
+# CACHE LRU DES IDENTIFIANTS
+# ============================================
+class CachedResult(NamedTuple):
+    # Identifiants ordonnés, ou None si le résultat est trop volumineux pour
+    # être gardé en mémoire (seuls les compteurs sont alors en cache)
+    ids: tuple
+    total: int
+    available: int
+    # Comptages de facettes déjà calculés pour cette recherche ; partagé
+    # entre les requêtes, jamais modifié en place (voir cache_facets)
+    facets: dict
+    approximate: bool = False
+
+
+class SearchResultCache:
+    """
+    Cache LRU par processus des résultats de recherche.
+
+    Les entrées trop volumineuses sont ignorées et les plus anciennes sont
+    évincées dès qu'un des plafonds (nombre d'entrées ou nombre total
+    d'identifiants) est dépassé.
+    """
+
+    def __init__(self, max_entries, max_ids, max_total_ids):
+        self.max_entries = max_entries
+        self.max_ids = max_ids
+        self.max_total_ids = max_total_ids
+        self._entries = OrderedDict()
+        self._total_ids = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        size = len(entry.ids or ())
+        if size > self.max_ids:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_ids -= len(previous.ids or ())
+            self._entries[key] = entry
+            self._total_ids += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_ids > self.max_total_ids
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._total_ids -= len(evicted.ids or ())
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_ids = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_config = get_cache_settings()
+result_cache = SearchResultCache(
+    max_entries=_config['MAX_ENTRIES'],
+    max_ids=_config['MAX_IDS'],
+    max_total_ids=_config['MAX_TOTAL_IDS'],
+)
+
+
+def get_cached_result(key):
+    return result_cache.get(key)
+
+
+def cache_result(key, ids, available):
+    """
+    Met en cache une liste ordonnée d'identifiants.
+
+    Returns:
+        CachedResult: L'entrée créée (qu'elle ait été gardée ou non)
+    """
+    entry = CachedResult(ids=tuple(ids), total=len(ids), available=available, facets={})
+    result_cache.set(key, entry)
+    return entry
+
+
+def cache_counts(key, total, available, approximate=False):
+    """Met en cache les seuls compteurs d'un résultat trop volumineux"""
+    entry = CachedResult(ids=None, total=total, available=available, facets={}, approximate=approximate)
+    result_cache.set(key, entry)
+    return entry
+
+
+def cache_facets(key, entry, facets):
+    """
+    Remplace une entrée par une copie complétée de nouvelles facettes.
+
+    Returns:
+        CachedResult: La nouvelle entrée
+    """
+    entry = entry._replace(facets={**entry.facets, **facets})
+    result_cache.set(key, entry)
+    return entry
+
+
+class LazyIds:
+    """
+    Séquence d'identifiants lue page par page dans la base.
+
+    Utilisée à la place de la liste en cache pour les résultats volumineux :
+    le Paginator n'en lit que la tranche de la page demandée.
+    """
+
+    def __init__(self, queryset, total):
+        self.queryset = queryset.values_list('pk', flat=True)
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.queryset[index])
+        return self.queryset[index]
@@ -0,0 +1,269 @@
+"""
+Liens signés et temporaires vers les fichiers numériques.
+
+Les vues de téléchargement et de lecture vérifient l'utilisateur puis
+redirigent vers un lien /files/<nom>?e=…&d=…&f=…&s=… signé par HMAC-SHA256
+(clé dérivée de SECRET_KEY) et valable TTL_SECONDS.
+
+Ce lien est servi par SignedMediaApplication, une petite application WSGI
+placée devant Django (voir mef_biblio_web/wsgi.py) : elle vérifie la
+signature et l'expiration, puis envoie le fichier (sendfile du serveur si
+possible, requêtes Range, ETag, 304) sans base de données, sans session et
+sans passer par les middlewares de Django.
+
+Seul mef_biblio_web/wsgi.py installe cette application. Sous runserver ou
+asgi.py, les liens arrivent à Django : quand DEBUG est actif, la vue
+signed_media_view les sert avec la même vérification (voir
+mef_biblio_web/urls.py) ; sinon ils répondent 404.
+
+Les expirations sont arrondies à EXPIRY_ROUNDING : pendant ce laps de temps
+un même livre reçoit le même lien, que le navigateur garde en cache.
+"""
+
+import base64
+import hashlib
+import hmac
+import math
+import mimetypes
+import os
+import posixpath
+import re
+import time
+import unicodedata
+from email.utils import formatdate
+from urllib.parse import parse_qsl, quote, urlencode
+
+
+DEFAULT_SETTINGS = {
+    'URL_PREFIX': '/files/',
+    'TTL_SECONDS': 3600,
+    'EXPIRY_ROUNDING': 300,
+}
+
+DISPOSITIONS = ('attachment', 'inline')
+
+READ_SIZE = 64 * 1024
+
+_BLOB_SHA256 = re.compile(r'^books/blobs/[0-9a-f]{2}/([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_signed_media_settings():
+    from django.conf import settings
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_SIGNED_MEDIA', {})}
+
+
+def signing_key(secret_key):
+    """Clé propre aux liens de fichiers, dérivée de SECRET_KEY"""
+    return hashlib.sha256(b'biblio.signed_media:' + secret_key.encode()).digest()
+
+
+def signature(key, name, expires, disposition, filename):
+    message = '\n'.join([name, str(expires), disposition, filename]).encode()
+    digest = hmac.new(key, message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def signed_url(name, filename, as_attachment=True):
+    """
+    Lien signé vers un fichier du stockage des livres.
+
+    Args:
+        name: Nom du fichier dans le stockage (book.file.name)
+        filename: Nom proposé au navigateur
+        as_attachment: Téléchargement (True) ou affichage dans le navigateur
+    """
+    from django.conf import settings
+
+    config = get_signed_media_settings()
+    rounding = config['EXPIRY_ROUNDING']
+    expires = int(math.ceil((time.time() + config['TTL_SECONDS']) / rounding) * rounding)
+    disposition = DISPOSITIONS[0] if as_attachment else DISPOSITIONS[1]
+    query = urlencode({
+        'e': expires,
+        'd': disposition,
+        'f': filename,
+        's': signature(signing_key(settings.SECRET_KEY), name, expires, disposition, filename),
+    })
+    return f"{config['URL_PREFIX']}{quote(name)}?{query}"
+
+
+# ============================================
+# APPLICATION WSGI
+# ============================================
+def _content_disposition(disposition, filename):
+    fallback = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode()
+    fallback = fallback.replace('"', '').replace('\\', '') or 'livre'
+    return f'{disposition}; filename="{fallback}"; filename*=UTF-8\'\'{quote(filename)}'
+
+
+def _read_range(handle, length):
+    try:
+        while length > 0:
+            data = handle.read(min(READ_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        handle.close()
+
+
+class SignedMediaApplication:
+    """
+    Sert les liens signés ; toutes les autres requêtes vont à l'application Django.
+
+    Args:
+        application: Application WSGI de Django
+        root: Dossier du stockage des livres
+        secret_key: SECRET_KEY du projet
+        prefix: Préfixe des liens signés
+    """
+
+    def __init__(self, application, root, secret_key, prefix=DEFAULT_SETTINGS['URL_PREFIX']):
+        self.application = application
+        self.root = os.path.realpath(root)
+        self.key = signing_key(secret_key)
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix):
+            return self.application(environ, start_response)
+        # PATH_INFO est décodé en latin-1 par le serveur WSGI
+        name = path[len(self.prefix):].encode('latin-1').decode('utf-8', errors='replace')
+        return self.serve(environ, start_response, name)
+
+    def error(self, start_response, status, message, headers=()):
+        body = message.encode()
+        start_response(status, [
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Content-Length', str(len(body))),
+            ('Cache-Control', 'no-store'),
+            *headers,
+        ])
+        return [body]
+
+    def serve(self, environ, start_response, name):
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            return self.error(start_response, '405 Method Not Allowed', 'Méthode non autorisée', [('Allow', 'GET, HEAD')])
+
+        params = dict(parse_qsl(environ.get('QUERY_STRING', '')))
+        try:
+            expires = int(params.get('e', ''))
+        except ValueError:
+            return self.error(start_response, '403 Forbidden', 'Lien invalide')
+        disposition = params.get('d', '')
+        filename = params.get('f', '')
+        expected = signature(self.key, name, expires, disposition, filename)
+        if disposition not in DISPOSITIONS or not hmac.compare_digest(expected, params.get('s', '')):
+            return self.error(start_response, '403 Forbidden', 'Lien invalide')
+        now = int(time.time())
+        if expires < now:
+            return self.error(start_response, '403 Forbidden', 'Lien expiré')
+
+        name = posixpath.normpath(name)
+        path = os.path.realpath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            return self.error(start_response, '404 Not Found', 'Fichier non trouvé')
+        try:
+            handle = open(path, 'rb')
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return self.error(start_response, '404 Not Found', 'Fichier non trouvé')
+
+        stat = os.fstat(handle.fileno())
+        size = stat.st_size
+        # Fichier stocké par contenu : l'empreinte est un ETag fort et le contenu ne change jamais
+        blob = _BLOB_SHA256.match(name)
+        etag = f'"{blob.group(1)}"' if blob else f'"{stat.st_mtime_ns:x}-{size:x}"'
+        cache_control = f'private, max-age={expires - now}' + (', immutable' if blob else '')
+        headers = [
+            ('ETag', etag),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('Cache-Control', cache_control),
+            ('Accept-Ranges', 'bytes'),
+        ]
+
+        if etag in (environ.get('HTTP_IF_NONE_MATCH') or ''):
+            handle.close()
+            start_response('304 Not Modified', headers)
+            return []
+
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        headers += [
+            ('Content-Type', content_type),
+            ('Content-Disposition', _content_disposition(disposition, filename)),
+            ('X-Content-Type-Options', 'nosniff'),
+        ]
+
+        # Requête partielle (lecteurs PDF des navigateurs, reprise de téléchargement)
+        start, end = 0, size - 1
+        status = '200 OK'
+        range_header = environ.get('HTTP_RANGE', '')
+        if_range = environ.get('HTTP_IF_RANGE', '')
+        if range_header and (not if_range or if_range == etag):
+            match = _RANGE.match(range_header.strip())
+            if match and match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            elif match and match.group(2):
+                start = max(0, size - int(match.group(2)))
+            if not match or start > end or start >= size:
+                handle.close()
+                return self.error(
+                    start_response, '416 Range Not Satisfiable', 'Plage invalide',
+                    [('Content-Range', f'bytes */{size}')]
+                )
+            status = '206 Partial Content'
+            headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+
+        length = end - start + 1 if size else 0
+        headers.append(('Content-Length', str(length)))
+        start_response(status, headers)
+
+        if method == 'HEAD':
+            handle.close()
+            return []
+        if status == '200 OK' and 'wsgi.file_wrapper' in environ:
+            # sendfile() du serveur (gunicorn) : les octets ne passent pas par Python
+            return environ['wsgi.file_wrapper'](handle, READ_SIZE)
+        handle.seek(start)
+        return _read_range(handle, length)
+
+
+# ============================================
+# VUE DJANGO (DÉVELOPPEMENT)
+# ============================================
+def signed_media_view(request, name):
+    """
+    Sert un lien signé depuis Django quand DEBUG est actif (runserver, asgi.py).
+
+    Mêmes vérifications et mêmes réponses que SignedMediaApplication, dont
+    elle reprend la méthode serve ; en production le lien n'arrive jamais
+    jusqu'ici (wsgi.py) ou répond 404.
+    """
+    from django.conf import settings
+    from django.http import Http404, StreamingHttpResponse
+    from .storage import get_book_storage
+
+    if not settings.DEBUG:
+        raise Http404('Fichier non trouvé')
+
+    application = SignedMediaApplication(
+        None, get_book_storage().location, settings.SECRET_KEY, get_signed_media_settings()['URL_PREFIX']
+    )
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split()[0])
+        started['headers'] = headers
+
+    # Le corps est lu par morceaux : pas de sendfile hors du serveur WSGI du projet
+    environ = {key: value for key, value in request.META.items() if key != 'wsgi.file_wrapper'}
+    body = application.serve(environ, start_response, name)
+    response = StreamingHttpResponse(body, status=started['status'])
+    for header, value in started['headers']:
+        response[header] = value
+    return response
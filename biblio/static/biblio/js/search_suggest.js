@@ -0,0 +1,53 @@
+// Autocomplétion des champs de recherche (titres, auteurs, éditeurs)
+// Usage : <input data-suggest ...> puis inclure ce script
+(function() {
+    function attachSuggestions(input) {
+        const datalist = document.createElement('datalist');
+        datalist.id = `${input.id || input.name}-suggestions`;
+        input.after(datalist);
+        input.setAttribute('list', datalist.id);
+        input.setAttribute('autocomplete', 'off');
+
+        let timeout;
+        let controller;
+
+        input.addEventListener('input', function() {
+            clearTimeout(timeout);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                datalist.innerHTML = '';
+                return;
+            }
+
+            timeout = setTimeout(() => {
+                // Annuler la requête précédente si elle est encore en cours
+                if (controller) controller.abort();
+                controller = new AbortController();
+
+                fetch(`/api/suggest/?q=${encodeURIComponent(query)}`, { signal: controller.signal })
+                    .then(response => response.json())
+                    .then(data => {
+                        const labels = new Set();
+                        ['titles', 'authors', 'publishers'].forEach(kind => {
+                            (data[kind] || []).forEach(item => labels.add(item.label));
+                        });
+                        datalist.innerHTML = '';
+                        labels.forEach(label => {
+                            const option = document.createElement('option');
+                            option.value = label;
+                            datalist.appendChild(option);
+                        });
+                    })
+                    .catch(error => {
+                        if (error.name !== 'AbortError') {
+                            console.error('Error loading suggestions:', error);
+                        }
+                    });
+            }, 150);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('input[data-suggest]').forEach(attachSuggestions);
+    });
+})();
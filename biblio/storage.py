@@ -0,0 +1,147 @@
+"""
+Stockage des fichiers numériques par contenu.
+
+Chaque fichier est rangé sous l'empreinte SHA-256 de son contenu
+(books/blobs/ab/abcdef….pdf) : un même PDF envoyé pour une réimpression ou
+une fiche en double n'est stocké qu'une fois, et l'espace disque (comme la
+durée des sauvegardes) ne dépend que du contenu unique.
+
+Le nombre de références d'un fichier est le nombre de livres dont le champ
+file pointe sur lui ; un fichier n'est effacé que lorsque plus aucun livre
+ne le référence. L'empreinte, déjà présente dans le nom, sert d'ETag fort
+aux téléchargements.
+"""
+
+import hashlib
+import os
+import re
+import time
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+BLOB_PREFIX = 'books/blobs'
+
+# Un fichier non référencé plus récent que ce délai n'est pas effacé : un
+# envoi concurrent du même contenu peut être en train de l'adopter
+BLOB_GRACE_SECONDS = 3600
+
+_BLOB_NAME = re.compile(r'^books/blobs/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_name(sha256, extension=''):
+    """Nom de stockage d'un contenu (extension avec son point, en minuscules)"""
+    return f'{BLOB_PREFIX}/{sha256[:2]}/{sha256}{extension.lower()}'
+
+
+def blob_hash(name):
+    """
+    Empreinte SHA-256 d'un fichier d'après son nom.
+
+    Returns:
+        str ou None pour un fichier stocké avant le passage au stockage par contenu
+    """
+    match = _BLOB_NAME.match(name or '')
+    return match.group('sha256') if match else None
+
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage qui dédoublonne les fichiers par leur contenu"""
+
+    def get_available_name(self, name, max_length=None):
+        # Un même nom désigne toujours le même contenu : pas de suffixe aléatoire
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1]
+
+        # Fichier déjà sur disque (envoi volumineux, envoi par morceaux) :
+        # une lecture pour l'empreinte, puis un simple renommage
+        temporary_path = getattr(content, 'temporary_file_path', None)
+        if temporary_path is not None:
+            source = temporary_path()
+            sha256 = getattr(content, 'sha256', None) or hash_file(source)
+            final_name = blob_name(sha256, extension)
+            final_path = self.path(final_name)
+            if self._adopt_existing(final_path):
+                os.remove(source)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                file_move_safe(source, final_path)
+                self._set_permissions(final_path)
+            return final_name
+
+        # Sinon, copie dans un fichier de transit en calculant l'empreinte
+        staging_dir = self.path(os.path.join(BLOB_PREFIX, 'tmp'))
+        os.makedirs(staging_dir, exist_ok=True)
+        staging_path = os.path.join(staging_dir, f'{os.getpid()}-{time.monotonic_ns()}.part')
+        sha256 = hashlib.sha256()
+        try:
+            with open(staging_path, 'wb') as output:
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    output.write(chunk)
+            final_name = blob_name(sha256.hexdigest(), extension)
+            final_path = self.path(final_name)
+            if self._adopt_existing(final_path):
+                os.remove(staging_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(staging_path, final_path)
+                self._set_permissions(final_path)
+        except BaseException:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+            raise
+        return final_name
+
+    def _adopt_existing(self, path):
+        """Réutilise un contenu déjà stocké (et le protège d'un effacement concurrent)"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _set_permissions(self, path):
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+
+    # ============================================
+    # RÉFÉRENCES
+    # ============================================
+    def reference_count(self, name):
+        """Nombre de livres qui pointent sur ce fichier"""
+        Book = apps.get_model('biblio', 'Book')
+        return Book.objects.filter(file=name).count()
+
+    def delete(self, name):
+        """Efface le fichier seulement si plus aucun livre ne le référence"""
+        if not name or self.reference_count(name):
+            return
+        if blob_hash(name):
+            try:
+                if time.time() - os.path.getmtime(self.path(name)) < BLOB_GRACE_SECONDS:
+                    return
+            except OSError:
+                return
+        super().delete(name)
+
+
+def get_book_storage():
+    """Stockage des fichiers numériques des livres (Book.file)"""
+    return ContentAddressedStorage()
@@ -0,0 +1,277 @@
+"""
+Autocomplétion des titres, auteurs et éditeurs.
+
+Les suggestions sont servies depuis un index de préfixes en mémoire (tableaux
+triés + recherche dichotomique), construit à la première demande dans chaque
+worker puis tenu à jour par les signaux des modèles. Les clés sont normalisées
+sans accents ni casse : « eco » trouve « Économie haïtienne ».
+
+Chaque mot d'un libellé est indexé, si bien que « rosee » trouve aussi
+« Gouverneurs de la rosée ». Une requête de suggestion ne touche jamais la
+base de données ; seul un changement fait dans un autre worker provoque une
+reconstruction de l'index. La version partagée qui le signale n'est relue
+dans le cache qu'une fois par VERSION_CHECK_INTERVAL secondes.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Book, Author, Publisher
+
+
+SUGGEST_VERSION_KEY = 'biblio:suggest_version'
+
+# Longueur maximale d'une clé indexée (les préfixes plus longs sont rares)
+MAX_KEY_LENGTH = 48
+
+# Délai (secondes) entre deux lectures de la version partagée par un worker
+VERSION_CHECK_INTERVAL = 2.0
+
+# Borne supérieure des clés commençant par un préfixe
+_LAST_CHAR = chr(0x10FFFF)
+
+_WORD_SEPARATORS = re.compile(r"[\s'’\-_.,;:!?()\[\]\"«»/]+")
+
+
+def fold(text):
+    """
+    Normalise un texte pour la recherche : sans accents, sans casse et
+    avec la ponctuation remplacée par des espaces.
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_WORD_SEPARATORS.split(text.casefold())).strip()
+
+
+class PrefixIndex:
+    """
+    Index de préfixes sur des libellés.
+
+    Chaque libellé est découpé en suffixes commençant à chaque mot ; les
+    entrées (milieu de libellé ?, clé, identifiant) sont gardées dans une
+    liste triée : les débuts de libellé forment une première plage, les
+    autres mots une seconde, chacune parcourue par recherche dichotomique.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._keys_by_id = {}
+        self._labels = {}
+        self._sort_keys = {}
+
+    def __len__(self):
+        return len(self._labels)
+
+    @staticmethod
+    def _keys_for(folded):
+        words = folded.split(' ')
+        keys = set()
+        for position in range(len(words)):
+            key = ' '.join(words[position:])[:MAX_KEY_LENGTH]
+            if key:
+                keys.add((key, position == 0))
+        return keys
+
+    def add(self, obj_id, label):
+        """Ajoute ou remplace un libellé"""
+        self.remove(obj_id)
+        folded = fold(label)
+        keys = self._keys_for(folded)
+        if not keys:
+            return
+        for key, is_start in keys:
+            bisect.insort(self._entries, (not is_start, key, obj_id))
+        self._keys_by_id[obj_id] = keys
+        self._labels[obj_id] = label
+        self._sort_keys[obj_id] = (len(folded), folded)
+
+    def remove(self, obj_id):
+        """Retire un libellé de l'index"""
+        keys = self._keys_by_id.pop(obj_id, None)
+        self._labels.pop(obj_id, None)
+        self._sort_keys.pop(obj_id, None)
+        if not keys:
+            return
+        for key, is_start in keys:
+            entry = (not is_start, key, obj_id)
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def bulk_load(self, items):
+        """Charge un ensemble complet de libellés (construction initiale)"""
+        entries = []
+        for obj_id, label in items:
+            folded = fold(label)
+            keys = self._keys_for(folded)
+            if not keys:
+                continue
+            entries.extend((not is_start, key, obj_id) for key, is_start in keys)
+            self._keys_by_id[obj_id] = keys
+            self._labels[obj_id] = label
+            self._sort_keys[obj_id] = (len(folded), folded)
+        entries.sort()
+        self._entries = entries
+
+    def search(self, prefix, limit):
+        """
+        Retourne les libellés dont un mot commence par le préfixe.
+
+        Les libellés qui commencent par le préfixe passent en premier, puis
+        les plus courts. Chaque plage est classée en entier : aucune bonne
+        suggestion n'est écartée avant le classement.
+        """
+        if not prefix or limit <= 0:
+            return []
+        found = []
+        for not_start in (False, True):
+            if len(found) >= limit:
+                break
+            low = bisect.bisect_left(self._entries, (not_start, prefix))
+            high = bisect.bisect_left(self._entries, (not_start, prefix + _LAST_CHAR), low)
+            # Un libellé déjà retenu par son début n'est pas repris pour un autre mot
+            candidates = {self._entries[position][2] for position in range(low, high)}.difference(found)
+            found.extend(heapq.nsmallest(
+                limit - len(found), candidates, key=lambda obj_id: (self._sort_keys[obj_id], obj_id)
+            ))
+        return [{'id': obj_id, 'label': self._labels[obj_id]} for obj_id in found]
+
+
+class SuggestIndex:
+    """Index des titres, auteurs et éditeurs d'un worker"""
+
+    SOURCES = {
+        'titles': (Book, 'title'),
+        'authors': (Author, 'name'),
+        'publishers': (Publisher, 'publisher_name'),
+    }
+
+    def __init__(self):
+        self.indexes = {}
+        self.version = None
+        # Dernière lecture de la version partagée (time.monotonic), None pour forcer
+        self.checked_at = None
+        self._lock = threading.RLock()
+
+    def build(self, version):
+        indexes = {}
+        for kind, (model, field) in self.SOURCES.items():
+            index = PrefixIndex()
+            index.bulk_load(model.objects.values_list('pk', field).iterator())
+            indexes[kind] = index
+        with self._lock:
+            self.indexes = indexes
+            self.version = version
+
+    def ensure_current(self):
+        """Construit (ou reconstruit) l'index si un autre worker l'a rendu obsolète"""
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self.checked_at = now
+        version = get_suggest_version()
+        if version != self.version:
+            self.build(version)
+
+    def update(self, kind, obj_id, label=None):
+        """Applique une modification locale à l'index"""
+        with self._lock:
+            if not self.indexes:
+                return
+            if label is None:
+                self.indexes[kind].remove(obj_id)
+            else:
+                self.indexes[kind].add(obj_id, label)
+
+    def suggest(self, query, limit=5):
+        self.ensure_current()
+        prefix = fold(query)
+        with self._lock:
+            return {
+                kind: index.search(prefix, limit)
+                for kind, index in self.indexes.items()
+            }
+
+
+suggest_index = SuggestIndex()
+
+
+# ============================================
+# VERSION PARTAGÉE ENTRE LES WORKERS
+# ============================================
+def get_suggest_version():
+    version = cache.get(SUGGEST_VERSION_KEY)
+    if version is None:
+        cache.add(SUGGEST_VERSION_KEY, 0, None)
+        version = cache.get(SUGGEST_VERSION_KEY, 0)
+    return version
+
+
+def invalidate_suggestions():
+    """
+    Fait reconstruire l'index dans tous les workers.
+
+    Pour les écritures qui n'envoient pas de signaux (bulk_create des imports).
+    """
+    get_suggest_version()
+    try:
+        cache.incr(SUGGEST_VERSION_KEY)
+    except ValueError:
+        cache.set(SUGGEST_VERSION_KEY, 0, None)
+    # Ce worker relit la version dès la prochaine suggestion
+    suggest_index.checked_at = None
+
+
+def _apply_change(kind, obj_id, label):
+    """
+    Met à jour l'index local puis incrémente la version partagée.
+
+    Si aucun autre worker n'a modifié le catalogue entre-temps, la nouvelle
+    version est simplement adoptée ; sinon l'index sera reconstruit à la
+    prochaine suggestion.
+    """
+    get_suggest_version()
+    try:
+        version = cache.incr(SUGGEST_VERSION_KEY)
+    except ValueError:
+        version = None
+
+    with suggest_index._lock:
+        suggest_index.update(kind, obj_id, label)
+        if version is not None and suggest_index.version is not None and version == suggest_index.version + 1:
+            suggest_index.version = version
+
+
+def _schedule_update(kind, instance, field, deleted):
+    obj_id = instance.pk
+    label = None if deleted else getattr(instance, field)
+    transaction.on_commit(lambda: _apply_change(kind, obj_id, label))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def update_title_suggestions(sender, instance, signal, **kwargs):
+    _schedule_update('titles', instance, 'title', deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def update_author_suggestions(sender, instance, signal, **kwargs):
+    _schedule_update('authors', instance, 'name', deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def update_publisher_suggestions(sender, instance, signal, **kwargs):
+    _schedule_update('publishers', instance, 'publisher_name', deleted=signal is post_delete)
@@ -0,0 +1,121 @@
+"""
+Lecture en flux des fichiers CSV et Excel importés (usagers, catalogue).
+
+Les lignes sont lues une à une : un CSV par le module csv (encodage UTF-8
+ou cp1252 et séparateur détectés), un classeur Excel par openpyxl en mode
+read_only, qui ne charge pas la feuille entière en mémoire. La première
+ligne donne les en-têtes, reconnus par leurs alias (casse, accents et
+ponctuation ignorés).
+"""
+
+import csv
+import io
+import os
+import re
+import unicodedata
+
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+def header_key(value):
+    """Forme normalisée d'un en-tête ou d'une valeur codée : « Prénom » -> 'prenom'"""
+    text = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _column_positions(header, columns, required):
+    aliases = {alias: column for column, names in columns.items() for alias in names}
+    positions = {}
+    for index, title in enumerate(header):
+        column = aliases.get(header_key(title))
+        if column and column not in positions:
+            positions[column] = index
+    missing = [column for column in required if column not in positions]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    return positions
+
+
+def _csv_rows(fileobj):
+    sample = fileobj.read(64 * 1024)
+    try:
+        sample.decode('utf-8')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError as error:
+        # Coupure au milieu d'un caractère en fin d'échantillon : c'est bien de l'UTF-8
+        encoding = 'utf-8-sig' if error.start >= len(sample) - 3 else 'cp1252'
+    fileobj.seek(0)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+    try:
+        dialect = csv.Sniffer().sniff(sample.decode(encoding, errors='ignore'), delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text, dialect)
+    try:
+        for values in reader:
+            yield reader.line_num, values
+    finally:
+        text.detach()
+
+
+def _excel_rows(fileobj):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("La bibliothèque openpyxl n'est pas installée : import Excel impossible.")
+
+    try:
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as error:
+        raise ValueError(f"Fichier Excel illisible : {error}") from error
+    try:
+        for line, values in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+            yield line, values
+    finally:
+        workbook.close()
+
+
+def read_table(fileobj, filename, columns, required=()):
+    """
+    Lit le fichier ligne par ligne.
+
+    Args:
+        fileobj: Fichier binaire (ouvert en lecture, repositionnable)
+        filename: Nom du fichier, dont l'extension choisit le format
+        columns: {colonne: en-têtes acceptés, normalisés par header_key}
+        required: Colonnes obligatoires
+
+    Yields:
+        (numéro de ligne, {colonne: valeur})
+
+    Raises:
+        ValueError: Fichier illisible ou vide, colonne obligatoire absente
+    """
+    if os.path.splitext(filename)[1].lower() in EXCEL_EXTENSIONS:
+        rows = _excel_rows(fileobj)
+    else:
+        rows = _csv_rows(fileobj)
+
+    for _, header in rows:
+        positions = _column_positions(header, columns, required)
+        break
+    else:
+        raise ValueError('Le fichier est vide.')
+
+    for line, values in rows:
+        values = [_cell(value) for value in values]
+        if not any(values):
+            continue
+        yield line, {
+            column: values[index] if index < len(values) else ''
+            for column, index in positions.items()
+        }
@@ -1,3 +1,1524 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import unittest.mock
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import unquote
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import content_index, export_cache, facets, ingestion, search_cache, suggest, uploads
+from .catalog_import import import_books
+from .exports import delimited
+from .fake_catalog import generate_catalog
+from .filters import DEFAULT_SORT, BookFilterSpec, estimate_row_count, export_filters
+from .models import (
+    Author, Book, BookAuthor, BookCategory, Category, ContentChunk, Favorite, IngestionJob, Loan, Publisher,
+    UploadSession,
+)
+from .models_user import UserProfile
+from .patron_import import import_patrons
+from .roles import ROLE_VERSION_KEY
+from .signed_media import SignedMediaApplication, signed_url
+from .storage import BLOB_GRACE_SECONDS, blob_name, get_book_storage
+from .views import get_filtered_books, get_search_result
+from .vendor_records import MARC_FORMAT, ONIX_FORMAT, detect_format, import_records
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# ============================================
+# DÉMARRAGE DES WORKERS
+# ============================================
+STARTUP_SCRIPT = """
+import resource, sys
+import django
+django.setup()
+import biblio.urls
+try:
+    # Pic de ce processus seul : ru_maxrss garde celui du parent d'avant exec
+    with open('/proc/self/status') as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss // 1024 if sys.platform == 'darwin' else rss
+print(rss)
+"""
+
+# Modules qui ne doivent être importés qu'à la première demande d'export
+HEAVY_EXPORT_MODULES = ('openpyxl', 'reportlab', 'docx')
+
+
+@unittest.skipIf(resource is None, 'module resource indisponible sur cette plateforme')
+class StartupBudgetTests(SimpleTestCase):
+    """Garde-fous sur le temps d'import et la mémoire d'un worker au démarrage"""
+
+    # Temps cumulé d'import de biblio.urls (et donc de toutes les vues)
+    IMPORT_TIME_BUDGET_MS = 250
+    # Mémoire résidente maximale du processus après le chargement des URLs
+    RSS_BUDGET_MB = 60
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        cls.rss_kb = int(process.stdout.strip().splitlines()[-1])
+        cls.imports = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            cls.imports[name.strip()] = int(cumulative)
+
+    def test_export_libraries_not_imported_at_startup(self):
+        loaded = sorted(
+            name for name in self.imports
+            if name.split('.')[0] in HEAVY_EXPORT_MODULES
+        )
+        self.assertEqual(loaded, [])
+
+    def test_import_time_budget(self):
+        elapsed_ms = self.imports['biblio.urls'] / 1000
+        self.assertLessEqual(
+            elapsed_ms, self.IMPORT_TIME_BUDGET_MS,
+            f'biblio.urls met {elapsed_ms:.0f} ms à importer'
+        )
+
+    def test_memory_budget(self):
+        rss_mb = self.rss_kb / 1024
+        self.assertLessEqual(
+            rss_mb, self.RSS_BUDGET_MB,
+            f'Un worker occupe {rss_mb:.0f} Mo après le chargement des URLs'
+        )
+
+
+# ============================================
+# RÉGLAGES DE PRODUCTION
+# ============================================
+class ProductionSettingsTests(SimpleTestCase):
+    """settings_prod.py, déployé tel quel, garde les middlewares et les caches partagés"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.development = importlib.import_module('mef_biblio_web.settings')
+        cls.production = importlib.import_module('mef_biblio_web.settings_prod')
+
+    def test_same_middleware_as_development(self):
+        self.assertEqual(self.production.MIDDLEWARE, self.development.MIDDLEWARE)
+
+    def test_caches_shared_between_workers(self):
+        # Génération du catalogue et version des rôles : une seule valeur pour tous les workers
+        self.assertIn('default', self.production.CACHES)
+        for alias, config in self.production.CACHES.items():
+            self.assertNotIn('locmem', config['BACKEND'], alias)
+
+    def test_deploy_keeps_committed_settings(self):
+        with open(os.path.join(settings.BASE_DIR, 'deploy.sh'), encoding='utf-8') as script:
+            self.assertNotIn('settings_prod.py <<', script.read())
+
+
+# ============================================
+# CONNEXION
+# ============================================
+class LoginQueryTests(TestCase):
+    """La connexion ne doit ni relire ni réécrire le profil"""
+
+    # Utilisateur, last_login, session (vérification de la clé, création,
+    # enregistrement)
+    LOGIN_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lecteur', 'lecteur@example.com', 'motdepasse-123')
+
+    def test_profile_created_with_user(self):
+        self.assertEqual(UserProfile.objects.filter(user=self.user).count(), 1)
+
+    def test_login_query_count(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('login'), {
+                'username': 'lecteur',
+                'password': 'motdepasse-123',
+            })
+        self.assertEqual(response.status_code, 302)
+        # Les savepoints viennent de la transaction du test
+        queries = [query['sql'] for query in captured if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual([sql for sql in queries if 'biblio_userprofile' in sql], [])
+        self.assertEqual(len(queries), self.LOGIN_QUERIES, queries)
+
+    def test_password_change_does_not_touch_profile(self):
+        updated_at = UserProfile.objects.get(user=self.user).updated_at
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('autre-motdepasse-456')
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertFalse(any('biblio_userprofile' in query['sql'] for query in queries))
+        self.assertEqual(UserProfile.objects.get(user=self.user).updated_at, updated_at)
+
+    def test_loaded_profile_saved_with_user(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.phone = '509 0000 0000'
+        user.save()
+        self.assertEqual(UserProfile.objects.get(user=self.user).phone, '509 0000 0000')
+
+
+class ClearExpiredSessionsTests(TestCase):
+    """Purge des sessions expirées par lots"""
+
+    def test_only_expired_sessions_deleted(self):
+        now = timezone.now()
+        for index in range(5):
+            Session.objects.create(session_key=f'expiree{index}', session_data='', expire_date=now - timedelta(days=1))
+        for index in range(2):
+            Session.objects.create(session_key=f'active{index}', session_data='', expire_date=now + timedelta(days=1))
+
+        output = io.StringIO()
+        call_command('clear_expired_sessions', batch_size=2, pause=0, stdout=output)
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True)), ['active0', 'active1'])
+        self.assertIn('5 session(s)', output.getvalue())
+
+
+# ============================================
+# FILTRES ET TRI DU CATALOGUE
+# ============================================
+class CatalogFixtureMixin:
+    """Petit catalogue commun aux tests des filtres, facettes, caches et exports"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        soleil = Publisher.objects.create(publisher_name='Éditions Soleil')
+        nord = Publisher.objects.create(publisher_name='Presses du Nord')
+        roumain = Author.objects.create(name='Jacques Roumain')
+        chauvet = Author.objects.create(name='Marie Chauvet')
+        cls.novel = Category.objects.create(category_name='Roman')
+        cls.poetry = Category.objects.create(category_name='Poésie')
+
+        cls.gouverneurs = Book.objects.create(
+            title='Gouverneurs de la rosée', isbn='9782070000001', publisher=soleil,
+            publication_year=1944, available_copies=2, total_copies=2,
+        )
+        cls.amour = Book.objects.create(
+            title='Amour, colère et folie', isbn='9782070000002', publisher=soleil,
+            publication_year=1968, available_copies=0, status='borrowed', file='books/amour.pdf',
+        )
+        cls.fonds = Book.objects.create(
+            title='Fonds des nègres', isbn='9782070000003', publisher=nord,
+            publication_year=1960, summary='La vie dans un lakou du Sud.',
+        )
+        cls.bois = Book.objects.create(
+            title="Bois d'ébène", isbn='9782070000004', publisher=nord,
+            publication_year=1945, language='créole haïtien',
+        )
+        for book, authors, categories in (
+            (cls.gouverneurs, [roumain], [cls.novel]),
+            (cls.amour, [chauvet], [cls.novel]),
+            (cls.fonds, [chauvet], [cls.novel, cls.poetry]),
+            (cls.bois, [roumain, chauvet], [cls.poetry]),
+        ):
+            for order, author in enumerate(authors, 1):
+                BookAuthor.objects.create(book=book, author=author, contribution_order=order)
+            for category in categories:
+                BookCategory.objects.create(book=book, category=category)
+
+        reader = User.objects.create_user('emprunteur', 'emprunteur@example.com', 'motdepasse-123')
+        for book, count in ((cls.fonds, 3), (cls.gouverneurs, 1)):
+            for _ in range(count):
+                Loan.objects.create(book=book, user=reader, status='RETURNED')
+
+
+class BookFilterSpecTests(CatalogFixtureMixin, TestCase):
+    """Validation des paramètres, filtres et tris de BookFilterSpec"""
+
+    def titles(self, queryset):
+        return [book.title for book in queryset]
+
+    def filtered(self, **params):
+        return set(self.titles(BookFilterSpec.from_params(params).filter_queryset()))
+
+    def ordered(self, sort, order=''):
+        return self.titles(BookFilterSpec.from_params({'sort': sort, 'order': order}).compile())
+
+    def test_from_params_normalizes(self):
+        params = QueryDict(
+            'category=2&category=x&category=1&category=2&status=bogus&status=available'
+            '&format=pdf&availability=maybe&search=%20%20Hello%20%20%20World%20'
+            '&language=fran%C3%A7ais&language=&min_year=abc&max_year=1950&sort=publication_year&order=ASC'
+        )
+        spec = BookFilterSpec.from_params(params)
+        self.assertEqual(spec, BookFilterSpec(
+            search='Hello World', categories=(1, 2), statuses=('available',), languages=('français',),
+            max_year=1950, sort='year',
+        ))
+        self.assertEqual(spec.filters_applied, {
+            'search': True, 'category': True, 'status': True, 'format': False,
+            'languages': True, 'year_range': True,
+        })
+
+    def test_fingerprint_ignores_order_and_case(self):
+        first = BookFilterSpec.from_params(QueryDict('category=1&category=2&search=Roman&sort=title'))
+        second = BookFilterSpec.from_params(QueryDict('sort=title&search=roman&category=2&category=1'))
+        self.assertEqual(first.fingerprint, second.fingerprint)
+        self.assertNotEqual(first.fingerprint, first.replace(sort='-title').fingerprint)
+
+    def test_sort_parameter(self):
+        for sort, order, expected in (
+            ('title', '', 'title'),
+            ('title', 'desc', '-title'),
+            ('-title', 'asc', '-title'),
+            ('popularity', '', '-popularity'),
+            ('publication_year', '', '-year'),
+            ('unknown', 'asc', DEFAULT_SORT),
+            ('', '', DEFAULT_SORT),
+        ):
+            self.assertEqual(BookFilterSpec.from_params({'sort': sort, 'order': order}).sort, expected, (sort, order))
+
+    def test_filters(self):
+        everything = {'Gouverneurs de la rosée', 'Amour, colère et folie', 'Fonds des nègres', "Bois d'ébène"}
+        self.assertEqual(self.filtered(), everything)
+        for params, expected in (
+            # Titre, résumé, ISBN, éditeur, n'importe quel auteur
+            ({'search': 'GOUVERNEURS'}, {'Gouverneurs de la rosée'}),
+            ({'search': 'lakou'}, {'Fonds des nègres'}),
+            ({'search': '0000002'}, {'Amour, colère et folie'}),
+            ({'search': 'presses du'}, {'Fonds des nègres', "Bois d'ébène"}),
+            ({'search': 'chauvet'}, {'Amour, colère et folie', 'Fonds des nègres', "Bois d'ébène"}),
+            ({'category': [str(self.poetry.pk)]}, {'Fonds des nègres', "Bois d'ébène"}),
+            ({'category': [str(self.novel.pk), str(self.poetry.pk)]}, everything),
+            ({'status': ['borrowed']}, {'Amour, colère et folie'}),
+            ({'format': 'digital'}, {'Amour, colère et folie'}),
+            ({'format': 'physical'}, everything - {'Amour, colère et folie'}),
+            ({'language': ['créole haïtien']}, {"Bois d'ébène"}),
+            ({'availability': 'unavailable'}, {'Amour, colère et folie'}),
+            ({'availability': 'available'}, everything - {'Amour, colère et folie'}),
+            ({'min_year': '1945', 'max_year': '1960'}, {'Fonds des nègres', "Bois d'ébène"}),
+            ({'search': 'chauvet', 'category': [str(self.novel.pk)], 'max_year': '1960'}, {'Fonds des nègres'}),
+        ):
+            self.assertEqual(self.filtered(**params), expected, params)
+
+    def test_no_duplicate_rows(self):
+        # Deux auteurs et deux catégories correspondent : une seule ligne par livre
+        spec = BookFilterSpec.from_params({'search': 'a', 'category': [str(self.novel.pk), str(self.poetry.pk)]})
+        self.assertEqual(spec.filter_queryset().count(), 4)
+
+    def test_sorts(self):
+        self.assertEqual(self.ordered('title'), [
+            'Amour, colère et folie', "Bois d'ébène", 'Fonds des nègres', 'Gouverneurs de la rosée',
+        ])
+        self.assertEqual(self.ordered('year', 'asc'), [
+            'Gouverneurs de la rosée', "Bois d'ébène", 'Fonds des nègres', 'Amour, colère et folie',
+        ])
+        self.assertEqual(self.ordered('year'), [
+            'Amour, colère et folie', 'Fonds des nègres', "Bois d'ébène", 'Gouverneurs de la rosée',
+        ])
+        # Premier auteur du livre, puis clé primaire pour les ex æquo
+        self.assertEqual(self.ordered('author'), [
+            'Gouverneurs de la rosée', "Bois d'ébène", 'Amour, colère et folie', 'Fonds des nègres',
+        ])
+        # Nombre de prêts, puis clé primaire décroissante
+        self.assertEqual(self.ordered('popularity'), [
+            'Fonds des nègres', 'Gouverneurs de la rosée', "Bois d'ébène", 'Amour, colère et folie',
+        ])
+        self.assertEqual(self.ordered('created_at'), [
+            "Bois d'ébène", 'Fonds des nègres', 'Amour, colère et folie', 'Gouverneurs de la rosée',
+        ])
+
+    def test_export_filters_default_to_physical(self):
+        self.assertEqual(export_filters(QueryDict('')).book_format, 'physical')
+        self.assertEqual(export_filters(QueryDict('format=digital')).book_format, 'digital')
+        self.assertEqual(export_filters(QueryDict('include_pdf=1')).book_format, '')
+
+
+@override_settings(BIBLIO_APPROXIMATE_COUNT_THRESHOLD=1000)
+class ApproximateCountTests(CatalogFixtureMixin, TestCase):
+    """Total exact sous le seuil, estimé au-delà (sans filtre seulement)"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        search_cache.result_cache.clear()
+
+    def estimate(self, rows):
+        return unittest.mock.patch('biblio.filters.estimate_row_count', return_value=rows)
+
+    def test_sqlite_has_no_estimate(self):
+        self.assertIsNone(estimate_row_count(Book))
+
+    def test_exact_under_threshold(self):
+        with self.estimate(999) as estimate:
+            self.assertEqual(BookFilterSpec().counts(), {'total': 4, 'available': 3, 'approximate': False})
+        estimate.assert_called_once_with(Book)
+
+    def test_approximate_over_threshold(self):
+        with self.estimate(250000):
+            self.assertEqual(BookFilterSpec().counts(), {'total': 250000, 'available': None, 'approximate': True})
+            # Une recherche filtrée est toujours comptée
+            spec = BookFilterSpec.from_params({'availability': 'available'})
+            self.assertEqual(spec.counts(), {'total': 3, 'available': 3, 'approximate': False})
+
+    def test_threshold_disabled(self):
+        with override_settings(BIBLIO_APPROXIMATE_COUNT_THRESHOLD=None), self.estimate(250000) as estimate:
+            self.assertFalse(BookFilterSpec().counts()['approximate'])
+        estimate.assert_not_called()
+
+    def test_api_reports_approximation(self):
+        url = reverse('api_books')
+        with self.estimate(250000):
+            data = self.client.get(url, {'per_page': 2, 'sort': 'title'}).json()
+            filtered = self.client.get(url, {'per_page': 2, 'status': 'available'}).json()
+        self.assertEqual((data['approximate'], data['total'], data['pages']), (True, 250000, 125000))
+        # La page est lue dans la base, sans liste d'identifiants en cache
+        self.assertEqual([book['title'] for book in data['books']], ['Amour, colère et folie', "Bois d'ébène"])
+        self.assertEqual((filtered['approximate'], filtered['total']), (False, 3))
+
+        data = self.client.get(url, {'per_page': 2}).json()
+        self.assertEqual((data['approximate'], data['total']), (False, 4))
+
+
+# ============================================
+# CACHE DES RECHERCHES
+# ============================================
+class SearchCacheTests(CatalogFixtureMixin, TestCase):
+    """Clé de cache normalisée, invalidation après commit, éviction LRU"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        search_cache.result_cache.clear()
+
+    def key(self, query):
+        return search_cache.cache_key(BookFilterSpec.from_params(QueryDict(query)))
+
+    def test_key_normalized(self):
+        self.assertEqual(
+            self.key('category=2&category=1&search=%20Roman%20%20noir&sort=title&order=asc'),
+            self.key('search=roman+NOIR&sort=title&category=1&category=2'),
+        )
+        self.assertNotEqual(self.key('search=roman'), self.key('search=roman&sort=title'))
+
+    def test_key_follows_generation(self):
+        key = self.key('search=roman')
+        search_cache.bump_catalog_generation()
+        self.assertNotEqual(self.key('search=roman'), key)
+
+    def assertBumpedOnCommit(self, change, label):
+        generation = search_cache.get_catalog_generation()
+        with self.captureOnCommitCallbacks() as callbacks:
+            change()
+        # Rien avant le commit : une recherche concurrente verrait l'ancien catalogue
+        self.assertEqual(search_cache.get_catalog_generation(), generation, label)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(search_cache.get_catalog_generation(), generation, label)
+
+    def test_generation_bumped_on_commit(self):
+        author = Author.objects.create(name='Jacques Stephen Alexis')
+        category = Category.objects.create(category_name='Nouvelles')
+        for label, change in (
+            ('livre', lambda: Book.objects.create(title='Compère Général Soleil')),
+            ('livre modifié', lambda: self.bois.save()),
+            ('auteur', lambda: Author.objects.create(name='René Depestre')),
+            ('catégorie', lambda: Category.objects.create(category_name='Théâtre')),
+            ('éditeur', lambda: Publisher.objects.create(publisher_name='Deschamps')),
+            ('lien auteur', lambda: BookAuthor.objects.create(book=self.gouverneurs, author=author)),
+            ('lien catégorie', lambda: BookCategory.objects.create(book=self.gouverneurs, category=category)),
+            ('auteurs.add', lambda: self.amour.authors.add(author)),
+            ('catégories.remove', lambda: self.amour.categories.remove(self.novel)),
+            ('catégories.clear', lambda: self.fonds.categories.clear()),
+            ('suppression', lambda: self.bois.delete()),
+        ):
+            self.assertBumpedOnCommit(change, label)
+
+    def test_lru_eviction(self):
+        lru = search_cache.SearchResultCache(max_entries=2, max_ids=3, max_total_ids=5)
+
+        def entry(*ids):
+            return search_cache.CachedResult(ids=ids, total=len(ids), available=0, facets={})
+
+        self.assertFalse(lru.set('trop', entry(1, 2, 3, 4)))
+        self.assertIsNone(lru.get('trop'))
+
+        lru.set('a', entry(1))
+        lru.set('b', entry(2))
+        lru.get('a')
+        lru.set('c', entry(3))
+        # MAX_ENTRIES : 'b' est la moins récemment utilisée
+        self.assertEqual((lru.get('a') is not None, lru.get('b'), lru.get('c') is not None), (True, None, True))
+
+        lru.set('d', entry(4, 5, 6))
+        self.assertEqual([key for key in 'acd' if lru.get(key) is not None], ['c', 'd'])
+        # MAX_ENTRIES fait sortir 'c', puis MAX_TOTAL_IDS (3 + 3 > 5) fait sortir 'd'
+        lru.set('e', entry(7, 8, 9))
+        self.assertEqual([key for key in 'cde' if lru.get(key) is not None], ['e'])
+
+    def test_result_served_from_cache(self):
+        url = reverse('api_books')
+        first = self.client.get(url, {'category': self.novel.pk, 'sort': 'title', 'per_page': 2}).json()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, {'sort': 'title', 'category': self.novel.pk, 'per_page': 2, 'page': 2}).json()
+        self.assertEqual(first['total'], 3)
+        self.assertEqual([book['title'] for book in first['books'] + second['books']], [
+            'Amour, colère et folie', 'Fonds des nègres', 'Gouverneurs de la rosée',
+        ])
+        # Ni identifiants ni comptage : seule la page est lue par clé primaire
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql'].upper()])
+
+    def test_exports_rerun_the_filtered_query(self):
+        spec = export_filters(QueryDict('sort=title'))
+        get_search_result(spec)
+        books = get_filtered_books(RequestFactory().get('/'), spec)
+        self.assertNotIn(' IN (', str(books.query))
+        self.assertEqual([book.title for book in books], [
+            "Bois d'ébène", 'Fonds des nègres', 'Gouverneurs de la rosée',
+        ])
+
+
+# ============================================
+# FACETTES
+# ============================================
+class FacetTests(CatalogFixtureMixin, TestCase):
+    """Comptages de facettes : une requête, sans le filtre de la facette comptée"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        search_cache.result_cache.clear()
+
+    def counts(self, spec, name):
+        return {item['label']: item['count'] for item in facets.compute_facets(spec, [name])[name]}
+
+    def test_parse_facets(self):
+        self.assertEqual(facets.parse_facets(' Status,inconnue,category,status'), ['status', 'category'])
+        self.assertEqual(facets.parse_facets(''), [])
+
+    def test_counts_in_one_query(self):
+        spec = BookFilterSpec()
+        with self.assertNumQueries(1):
+            result = facets.compute_facets(spec, list(facets.AVAILABLE_FACETS))
+        self.assertEqual(result['category'], [
+            {'value': self.novel.pk, 'label': 'Roman', 'count': 3},
+            {'value': self.poetry.pk, 'label': 'Poésie', 'count': 2},
+        ])
+        self.assertEqual(self.counts(spec, 'format'), {'Physique': 3, 'PDF': 1})
+        self.assertEqual(self.counts(spec, 'status'), {'Disponible': 3, 'Emprunté': 1})
+        self.assertEqual(self.counts(spec, 'language'), {'français': 3, 'créole haïtien': 1})
+        self.assertEqual(result['year'][0]['value'], 1944)
+
+    def test_own_filter_excluded(self):
+        spec = BookFilterSpec.from_params({'category': [str(self.poetry.pk)], 'status': ['available']})
+        # Les autres catégories gardent leur compte ; le filtre de statut s'applique
+        self.assertEqual(self.counts(spec, 'category'), {'Roman': 2, 'Poésie': 2})
+        # Les autres statuts aussi ; le filtre de catégorie s'applique
+        self.assertEqual(self.counts(spec, 'status'), {'Disponible': 2})
+        self.assertEqual(self.counts(spec, 'language'), {'français': 1, 'créole haïtien': 1})
+
+        spec = BookFilterSpec.from_params({'min_year': '1950', 'format': 'digital'})
+        self.assertEqual(self.counts(spec, 'year'), {'1968': 1})
+        self.assertEqual(self.counts(spec, 'format'), {'PDF': 1, 'Physique': 1})
+
+    def test_cached_entry_not_mutated(self):
+        spec = BookFilterSpec.from_params({'category': [str(self.novel.pk)]})
+        key = search_cache.cache_key(spec)
+        shared = get_search_result(spec, key)
+
+        data = self.client.get(reverse('api_books'), {'category': self.novel.pk, 'facets': 'category,status'}).json()
+        self.assertEqual(data['facets']['category'][0], {'value': self.novel.pk, 'label': 'Roman', 'count': 3})
+        self.assertEqual(shared.facets, {})
+        self.assertEqual(sorted(search_cache.get_cached_result(key).facets), ['category', 'status'])
+
+        with self.assertNumQueries(0):
+            cached = get_search_result(spec, key)
+        self.assertEqual(cached.facets['status'], data['facets']['status'])
+
+
+# ============================================
+# AUTOCOMPLÉTION
+# ============================================
+class PrefixIndexTests(SimpleTestCase):
+    """Index de préfixes : normalisation et classement des suggestions"""
+
+    def labels(self, index, prefix, limit=5):
+        return [item['label'] for item in index.search(suggest.fold(prefix), limit)]
+
+    def test_fold(self):
+        self.assertEqual(suggest.fold("  L'ÉCONOMIE  haïtienne — Tome 1 "), 'l economie haitienne — tome 1')
+        self.assertEqual(suggest.fold('Gouverneurs de la rosée.'), 'gouverneurs de la rosee')
+
+    def test_word_prefix_ignores_accents_and_case(self):
+        index = suggest.PrefixIndex()
+        index.bulk_load([(1, 'Économie haïtienne'), (2, 'Gouverneurs de la rosée'), (3, 'Éco-tourisme')])
+        self.assertEqual(self.labels(index, 'ECO'), ['Éco-tourisme', 'Économie haïtienne'])
+        self.assertEqual(self.labels(index, 'Rosée'), ['Gouverneurs de la rosée'])
+        self.assertEqual(self.labels(index, 'haïti'), ['Économie haïtienne'])
+        self.assertEqual(self.labels(index, 'xyz'), [])
+
+    def test_label_start_ranked_first(self):
+        index = suggest.PrefixIndex()
+        # Beaucoup de mots « rosa… » classés avant « rosee » dans l'index
+        index.bulk_load([(number, f'Recueil {number} rosa') for number in range(1, 301)])
+        index.add(1000, 'Rosée du matin')
+        index.add(1001, 'Roseraie')
+        index.add(1002, 'Rose')
+        self.assertEqual(self.labels(index, 'ros', 3), ['Rose', 'Roseraie', 'Rosée du matin'])
+        self.assertEqual(self.labels(index, 'ros', 4)[3], 'Recueil 1 rosa')
+
+    def test_add_and_remove(self):
+        index = suggest.PrefixIndex()
+        index.add(1, 'Compère Général Soleil')
+        index.add(1, 'Les arbres musiciens')
+        self.assertEqual(self.labels(index, 'soleil'), [])
+        self.assertEqual(self.labels(index, 'arbres'), ['Les arbres musiciens'])
+        index.remove(1)
+        self.assertEqual((self.labels(index, 'arbres'), len(index)), ([], 0))
+
+
+class SuggestApiTests(TestCase):
+    """Index des suggestions d'un worker : mises à jour et invalidation"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        suggest.suggest_index.version = None
+        suggest.suggest_index.checked_at = None
+        Book.objects.create(title='Économie haïtienne')
+
+    def titles(self, query):
+        data = self.client.get(reverse('api_suggest'), {'q': query}).json()
+        return [item['label'] for item in data['titles']]
+
+    def test_local_change_applied_on_commit(self):
+        self.assertEqual(self.titles('eco'), ['Économie haïtienne'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title="Écologie de l'île")
+        self.assertEqual(self.titles('eco'), ["Écologie de l'île", 'Économie haïtienne'])
+
+    def test_invalidate_rebuilds(self):
+        self.assertEqual(self.titles('ile'), [])
+        # bulk_create n'envoie pas de signal
+        Book.objects.bulk_create([Book(title="Écologie de l'île")])
+        self.assertEqual(self.titles('ile'), [])
+        suggest.invalidate_suggestions()
+        self.assertEqual(self.titles('ile'), ["Écologie de l'île"])
+
+    def test_version_not_read_on_every_request(self):
+        self.titles('eco')
+        with unittest.mock.patch.object(suggest, 'get_suggest_version', wraps=suggest.get_suggest_version) as version:
+            for query in ('ec', 'eco', 'econ'):
+                self.titles(query)
+            self.assertEqual(version.call_count, 0)
+            suggest.suggest_index.checked_at -= suggest.VERSION_CHECK_INTERVAL
+            self.titles('econo')
+            self.assertEqual(version.call_count, 1)
+
+
+# ============================================
+# CACHE DES EXPORTS
+# ============================================
+class ExportCacheTests(CatalogFixtureMixin, TestCase):
+    """Clé des exports, écriture atomique et éviction LRU sur la date de modification"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        config = override_settings(BIBLIO_EXPORT_CACHE={'DIR': self.directory, 'MAX_SIZE': 100, 'MAX_FILES': 3})
+        config.enable()
+        self.addCleanup(config.disable)
+
+    def files(self):
+        return sorted(os.listdir(self.directory))
+
+    def store(self, key, content):
+        with export_cache.store_export(key, '.bin', lambda output: output.write(content)) as handle:
+            return handle.read()
+
+    def test_key(self):
+        spec = BookFilterSpec.from_params({'category': ['1']})
+        key = export_cache.export_key('pdf', spec, None)
+        self.assertEqual(key, export_cache.export_key('pdf', BookFilterSpec.from_params({'category': ['1']}), ''))
+        self.assertEqual(len({
+            key,
+            export_cache.export_key('word', spec, None),
+            export_cache.export_key('pdf', spec.replace(sort='title'), None),
+            export_cache.export_key('pdf', spec, '1'),
+        }), 4)
+        search_cache.bump_catalog_generation()
+        self.assertNotEqual(export_cache.export_key('pdf', spec, None), key)
+
+    def test_atomic_write(self):
+        def build(output):
+            output.write(b'moitie')
+            # Rien sous le nom définitif tant que l'écriture n'est pas finie
+            self.assertIsNone(export_cache.open_export('cle', '.bin'))
+            raise RuntimeError('échec')
+
+        with self.assertRaises(RuntimeError):
+            export_cache.store_export('cle', '.bin', build)
+        self.assertEqual(self.files(), [])
+
+        self.assertEqual(self.store('cle', b'contenu'), b'contenu')
+        self.assertEqual(self.files(), ['cle.bin'])
+        with export_cache.open_export('cle', '.bin') as handle:
+            self.assertEqual(handle.read(), b'contenu')
+
+    def test_lru_eviction(self):
+        for age, key in enumerate(('a', 'b', 'c')):
+            self.store(key, b'x' * 10)
+            # Dates explicites : a la plus ancienne, puis b, puis c
+            os.utime(os.path.join(self.directory, f'{key}.bin'), (1000 + age, 1000 + age))
+        # Lire a la rend récente : b devient la moins récemment servie
+        export_cache.open_export('a', '.bin').close()
+
+        self.store('d', b'x' * 10)
+        self.assertEqual(self.files(), ['a.bin', 'c.bin', 'd.bin'])
+
+        # MAX_SIZE : 30 + 81 octets > 100, c puis a sortent
+        os.utime(os.path.join(self.directory, 'c.bin'), (1000, 1000))
+        self.store('e', b'x' * 81)
+        self.assertEqual(self.files(), ['d.bin', 'e.bin'])
+
+    def test_view_served_from_cache_until_catalog_changes(self):
+        self.client.force_login(User.objects.create_user('lecteur', 'lecteur@example.com', 'motdepasse-123'))
+        url = reverse('export_books_word')
+        with override_settings(BIBLIO_EXPORT_CACHE={'DIR': self.directory}), \
+                unittest.mock.patch.object(export_cache, 'store_export', wraps=export_cache.store_export) as store:
+            first = b''.join(self.client.get(url).streaming_content)
+            second = b''.join(self.client.get(url).streaming_content)
+            self.assertEqual((store.call_count, first), (1, second))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.bois.save()
+            b''.join(self.client.get(url).streaming_content)
+            self.assertEqual(store.call_count, 2)
+
+
+# ============================================
+# EXPORTS CSV / TSV
+# ============================================
+TRICKY_TITLE = 'Contes, "légendes"\n\tet récits'
+
+
+class DelimitedExportTests(CatalogFixtureMixin, TestCase):
+    """Exports CSV / TSV diffusés en continu : en-tête, échappement, gzip"""
+
+    def setUp(self):
+        super().setUp()
+        Book.objects.filter(pk=self.bois.pk).update(title=TRICKY_TITLE)
+        self.client.force_login(User.objects.create_user('lecteur', 'lecteur@example.com', 'motdepasse-123'))
+
+    def rows(self, export_format, **params):
+        response = self.client.get(reverse(f'export_books_{export_format}'), params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content)
+        if params.get('gzip'):
+            content = gzip.decompress(content)
+        delimiter = '\t' if export_format == 'tsv' else ','
+        quoting = csv.QUOTE_NONE if export_format == 'tsv' else csv.QUOTE_MINIMAL
+        return response, list(csv.reader(io.StringIO(content.decode('utf-8'), newline=''), delimiter=delimiter, quoting=quoting))
+
+    def test_csv(self):
+        response, rows = self.rows('csv', sort='title')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="livres_bibliotheque_\d+_\d+\.csv"$')
+        self.assertEqual(rows[0], delimited.HEADERS)
+        # Livres physiques seulement ; guillemets et saut de ligne conservés par l'échappement CSV
+        self.assertEqual([row[0] for row in rows[1:]], [TRICKY_TITLE, 'Fonds des nègres', 'Gouverneurs de la rosée'])
+        self.assertEqual(rows[1][2], 'Jacques Roumain, Marie Chauvet')
+        self.assertEqual(rows[1][4:], ['Presses du Nord', '1945', 'Disponible', '1', '1', 'créole haïtien'])
+
+        _, rows = self.rows('csv', include_pdf='1')
+        self.assertEqual(len(rows), 5)
+
+    def test_tsv(self):
+        response, rows = self.rows('tsv', sort='title')
+        self.assertEqual(response['Content-Type'], 'text/tab-separated-values; charset=utf-8')
+        self.assertTrue(response['Content-Disposition'].endswith('.tsv"'))
+        # Ni guillemets ni tabulation ni saut de ligne dans une valeur
+        self.assertEqual(rows[1][0], 'Contes, "légendes"  et récits')
+        self.assertEqual({len(row) for row in rows}, {len(delimited.HEADERS)})
+
+    def test_gzip(self):
+        plain, plain_rows = self.rows('csv')
+        response, rows = self.rows('csv', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+        self.assertEqual(rows, plain_rows)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('export_books_csv')).status_code, 302)
+
+    def test_header_sent_before_rows(self):
+        def rows():
+            raise AssertionError('lignes lues avant l\'envoi de l\'en-tête')
+            yield
+
+        for compress in (False, True):
+            chunks = delimited.stream(rows(), 'csv', compress)
+            first = next(chunks)
+            if compress:
+                # Z_SYNC_FLUSH : le bloc se décompresse seul
+                first = zlib.decompressobj(31).decompress(first)
+            self.assertEqual(first.decode('utf-8'), ','.join(delimited.HEADERS) + '\r\n')
+
+    def test_rows_grouped_in_blocks(self):
+        with unittest.mock.patch.object(delimited, 'ROWS_PER_BLOCK', 2):
+            chunks = list(delimited.stream(([number] for number in range(5)), 'csv'))
+        self.assertEqual([chunk.count(b'\r\n') for chunk in chunks], [1, 2, 2, 1])
+
+
+# ============================================
+# FICHIERS NUMÉRIQUES
+# ============================================
+class TemporaryMediaMixin:
+    """MEDIA_ROOT dans un dossier temporaire, vidé après chaque test"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media_root = directory.name
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, TestCase):
+    """Un fichier partagé n'est effacé qu'avec son dernier livre, passé le délai de grâce"""
+
+    CONTENT = b'%PDF-1.4 contenu partage'
+
+    def add_book(self, title):
+        book = Book(title=title)
+        book.file.save('livre.pdf', ContentFile(self.CONTENT), save=True)
+        return book
+
+    def delete(self, book):
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+
+    def age(self, name):
+        past = time.time() - BLOB_GRACE_SECONDS - 1
+        os.utime(get_book_storage().path(name), (past, past))
+
+    def test_shared_blob(self):
+        first, second = self.add_book('Premier tirage'), self.add_book('Réimpression')
+        name = blob_name(hashlib.sha256(self.CONTENT).hexdigest(), '.pdf')
+        self.assertEqual((first.file.name, second.file.name), (name, name))
+        storage = get_book_storage()
+        self.assertEqual(storage.reference_count(name), 2)
+        self.age(name)
+
+        self.delete(first)
+        self.assertTrue(storage.exists(name))
+        self.delete(second)
+        self.assertFalse(storage.exists(name))
+
+    def test_recent_blob_kept(self):
+        # Plus de référence, mais un envoi du même contenu peut être en train de l'adopter
+        book = self.add_book('Livre')
+        name = book.file.name
+        self.delete(book)
+        self.assertTrue(get_book_storage().exists(name))
+        self.age(name)
+        get_book_storage().delete(name)
+        self.assertFalse(get_book_storage().exists(name))
+
+
+def make_pdf(pages, title=''):
+    """Petit PDF de pages pages (reportlab)"""
+    from reportlab.pdfgen import canvas
+
+    output = io.BytesIO()
+    document = canvas.Canvas(output)
+    document.setTitle(title)
+    for number in range(1, pages + 1):
+        document.drawString(100, 700, f'Page {number}')
+        document.showPage()
+    document.save()
+    return output.getvalue()
+
+
+class IngestionQueueTests(TemporaryMediaMixin, TestCase):
+    """File d'analyse : mise en file au commit, réservation, nouvelles tentatives"""
+
+    def add_book(self, content, **fields):
+        book = Book(title='Livre numérique', **fields)
+        with self.captureOnCommitCallbacks(execute=True):
+            book.file.save('livre.pdf', ContentFile(content), save=True)
+        return book
+
+    def test_file_analysed_by_worker(self):
+        book = self.add_book(make_pdf(3, title='Titre du fichier'))
+        job = IngestionJob.objects.get()
+        self.assertEqual((job.status, job.file_name), ('pending', book.file.name))
+
+        self.assertEqual(ingestion.process_jobs(), 1)
+        book.refresh_from_db()
+        self.assertEqual((book.file_format, book.pages, book.file_metadata['title']), ('PDF', 3, 'Titre du fichier'))
+        self.assertEqual(book.ingested_file, book.file.name)
+        self.assertEqual(IngestionJob.objects.get().status, 'done')
+        self.assertIsNone(ingestion.claim_job())
+
+    def test_manual_fields_kept(self):
+        book = self.add_book(make_pdf(3), pages=250)
+        ingestion.process_jobs()
+        book.refresh_from_db()
+        self.assertEqual((book.pages, book.file_metadata['pages']), (250, 3))
+
+    def test_failed_job_retried(self):
+        self.add_book(b'%PDF-1.4 fichier tronque')
+        for attempt in range(1, ingestion.MAX_ATTEMPTS + 1):
+            with self.assertLogs('biblio.ingestion', 'ERROR'):
+                job = ingestion.run_job(ingestion.claim_job())
+            self.assertEqual(job.attempts, attempt)
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(ingestion.claim_job())
+
+    def test_stale_running_job_reclaimed(self):
+        self.add_book(make_pdf(1))
+        job = ingestion.claim_job()
+        self.assertIsNone(ingestion.claim_job())
+        IngestionJob.objects.filter(pk=job.pk).update(started_at=job.started_at - ingestion.STALE_AFTER)
+        self.assertEqual(ingestion.claim_job().attempts, 2)
+
+
+class ChunkedUploadTests(TemporaryMediaMixin, TestCase):
+    """Envoi par morceaux : position, empreinte de chaque morceau, fin d'envoi"""
+
+    CONTENT = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('bibliothecaire', 'bibliothecaire@example.org')
+        UserProfile.objects.filter(user=cls.admin).update(role='admin')
+        cls.book = Book.objects.create(title='Livre numérique')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('api_upload_start'),
+            {'filename': 'livre.pdf', 'size': len(self.CONTENT), 'book_id': self.book.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.upload_id = response.json()['upload_id']
+        self.url = reverse('api_upload_session', args=[self.upload_id])
+
+    def put(self, offset, data, sha256=None):
+        return self.client.put(
+            f'{self.url}?offset={offset}', data, content_type='application/octet-stream',
+            headers={'X-Chunk-SHA256': sha256 or hashlib.sha256(data).hexdigest()},
+        )
+
+    def complete(self):
+        return self.client.post(reverse('api_upload_complete', args=[self.upload_id]), content_type='application/json')
+
+    def test_wrong_offset(self):
+        response = self.put(10, self.CONTENT[10:20])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+
+    def test_wrong_chunk_hash(self):
+        response = self.put(0, self.CONTENT[:100], sha256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['offset'], 0)
+        # Le morceau refusé est retiré : il se renvoie à la même position
+        self.assertEqual(os.path.getsize(uploads.staging_path(UploadSession.objects.get())), 0)
+        self.assertEqual(self.put(0, self.CONTENT[:100]).json()['offset'], 100)
+
+    def test_complete_upload(self):
+        self.assertEqual(self.complete().status_code, 409)
+        self.put(0, self.CONTENT[:500])
+        self.assertEqual(self.put(500, self.CONTENT[500:]).json()['offset'], len(self.CONTENT))
+        response = self.complete()
+        self.assertEqual(response.status_code, 200)
+
+        self.book.refresh_from_db()
+        sha256 = hashlib.sha256(self.CONTENT).hexdigest()
+        self.assertEqual(self.book.file.name, blob_name(sha256, '.pdf'))
+        with self.book.file.open('rb') as handle:
+            self.assertEqual(handle.read(), self.CONTENT)
+
+        # Un envoi terminé ne s'abandonne plus : son fichier appartient au livre
+        self.assertEqual(self.client.delete(self.url).status_code, 409)
+        self.assertEqual(UploadSession.objects.get().status, 'complete')
+
+
+# ============================================
+# RECHERCHE DANS LE CONTENU
+# ============================================
+ECONOMY_TEXT = (
+    "Chapitre premier. L'Économie haïtienne au XIXe siècle.\n"
+    "Le café domine les exportations ; l'economie rurale dépend du café et du lakou."
+)
+HISTORY_TEXT = "Histoire des ports. L'économie portuaire et le commerce du café."
+
+
+class ContentIndexTests(TestCase):
+    """Index inversé du texte des livres : termes normalisés, tous requis, extraits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.economy = Book.objects.create(title='Économie haïtienne', file='books/economie.epub')
+        cls.history = Book.objects.create(title='Histoire des ports', file='books/ports.epub')
+        for book, text in ((cls.economy, ECONOMY_TEXT), (cls.history, HISTORY_TEXT)):
+            content_index.store_book_index(book.pk, book.file.name, content_index.analyse_text(text))
+        cls.user = User.objects.create_user('lecteur', 'lecteur@example.com', 'motdepasse-123')
+
+    def test_parse_query(self):
+        # Sans accents ni casse, sans mots vides ni doublons, dans l'ordre de saisie
+        self.assertEqual(content_index.parse_query("  L'ÉCONOMIE de la Haïti, économie  "), ['economie', 'haiti'])
+        self.assertEqual(content_index.parse_query('le de x'), [])
+        words = ' '.join(f'terme{index}' for index in range(20))
+        self.assertEqual(len(content_index.parse_query(words)), content_index.MAX_QUERY_TERMS)
+
+    def test_matching_books_requires_all_terms(self):
+        both = list(content_index.matching_books(['economie', 'cafe']))
+        # « economie » deux fois et « café » deux fois contre une fois chacun
+        self.assertEqual(both, [
+            {'book_id': self.economy.pk, 'score': 4},
+            {'book_id': self.history.pk, 'score': 2},
+        ])
+        self.assertEqual(
+            [row['book_id'] for row in content_index.matching_books(['economie', 'lakou'])],
+            [self.economy.pk],
+        )
+        self.assertEqual(list(content_index.matching_books(['economie', 'absent'])), [])
+
+    def test_snippet_offsets_and_highlights(self):
+        snippets = content_index.book_snippets([self.economy.pk], ['economie', 'lakou'])
+        [snippet] = snippets[self.economy.pk]
+        # Le texte stocké a ses espaces normalisés ; l'extrait y est à sa position
+        stored = ContentChunk.objects.get(book=self.economy).text
+        self.assertEqual(stored[snippet['offset']:snippet['offset'] + len(snippet['text'])], snippet['text'])
+        self.assertEqual(
+            [snippet['text'][start:end] for start, end in snippet['highlights']],
+            ['Économie', 'economie', 'lakou'],
+        )
+
+    def test_api_requires_login(self):
+        url = reverse('api_content_search')
+        response = self.client.get(url, {'q': 'lakou'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(settings.LOGIN_URL))
+
+        self.client.force_login(self.user)
+        data = self.client.get(url, {'q': 'lakou'}).json()
+        self.assertEqual(data['terms'], ['lakou'])
+        self.assertEqual([result['book']['id'] for result in data['results']], [self.economy.pk])
+        self.assertEqual(len(data['results'][0]['snippets']), 1)
+
+
+# ============================================
+# RÔLE EN SESSION
+# ============================================
+class RoleSessionTests(TestCase):
+    """Un administrateur rétrogradé perd ses droits dès la requête suivante"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('gestionnaire', 'gestionnaire@example.com', 'motdepasse-123')
+        UserProfile.objects.filter(user=cls.user).update(role='admin')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('loan_list')).status_code, 200)
+
+    def demote(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.role = 'user'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+
+    def assertNotAdmin(self):
+        response = self.client.get(reverse('loan_list'))
+        self.assertRedirects(response, reverse('index'), fetch_redirect_response=False)
+
+    def test_demotion_applies_to_next_request(self):
+        self.demote()
+        self.assertNotAdmin()
+
+    def test_demotion_applies_after_version_evicted(self):
+        self.demote()
+        # Version éjectée du cache avant la requête suivante
+        cache.delete(ROLE_VERSION_KEY.format(user_id=self.user.pk))
+        self.assertNotAdmin()
+
+    def test_role_cached_while_version_kept(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('loan_list'))
+        self.assertFalse(any('biblio_userprofile' in query['sql'] for query in queries))
+
+
+# ============================================
+# LIENS SIGNÉS
+# ============================================
+class SignedMediaTests(SimpleTestCase):
+    """SignedMediaApplication : signature, expiration, plages, confinement"""
+
+    CONTENT = b'0123456789abcdef'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = os.path.join(directory.name, 'books')
+        os.makedirs(os.path.join(self.root, 'files'))
+        with open(os.path.join(self.root, 'files', 'livre.pdf'), 'wb') as handle:
+            handle.write(self.CONTENT)
+        with open(os.path.join(directory.name, 'secret.txt'), 'wb') as handle:
+            handle.write(b'secret')
+        self.django_app = unittest.mock.Mock(return_value=[b'django'])
+        self.app = SignedMediaApplication(self.django_app, self.root, settings.SECRET_KEY)
+
+    def get(self, url, **headers):
+        path, _, query = url.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            # Comme un serveur WSGI : décodé, puis en latin-1
+            'PATH_INFO': unquote(path).encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': query,
+            **{f'HTTP_{name.upper()}': value for name, value in headers.items()},
+        }
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = int(status.split()[0])
+            response['headers'] = dict(headers)
+
+        response['body'] = b''.join(self.app(environ, start_response))
+        return response
+
+    def test_valid_link(self):
+        response = self.get(signed_url('files/livre.pdf', 'Mon livre.pdf'))
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['body'], self.CONTENT)
+        self.assertIn('attachment;', response['headers']['Content-Disposition'])
+        self.django_app.assert_not_called()
+
+    def test_other_paths_go_to_django(self):
+        self.assertEqual(self.get('/books/')['body'], b'django')
+
+    def test_tampered_link(self):
+        url = signed_url('files/livre.pdf', 'livre.pdf')
+        for tampered in (
+            url.replace('d=attachment', 'd=inline'),
+            url.replace('f=livre.pdf', 'f=autre.pdf'),
+            url.replace('&s=', '&s=A'),
+            url.replace('/files/files/livre.pdf', '/files/files/autre.pdf'),
+        ):
+            self.assertEqual(self.get(tampered)['status'], 403, tampered)
+
+    def test_expired_link(self):
+        with override_settings(BIBLIO_SIGNED_MEDIA={'TTL_SECONDS': -3600, 'EXPIRY_ROUNDING': 1}):
+            url = signed_url('files/livre.pdf', 'livre.pdf')
+        response = self.get(url)
+        self.assertEqual(response['status'], 403)
+        self.assertEqual(response['body'].decode(), 'Lien expiré')
+
+    def test_range(self):
+        url = signed_url('files/livre.pdf', 'livre.pdf')
+        response = self.get(url, range='bytes=2-5')
+        self.assertEqual(response['status'], 206)
+        self.assertEqual(response['body'], self.CONTENT[2:6])
+        self.assertEqual(response['headers']['Content-Range'], f'bytes 2-5/{len(self.CONTENT)}')
+
+        response = self.get(url, range='bytes=-4')
+        self.assertEqual(response['body'], self.CONTENT[-4:])
+
+        response = self.get(url, range='bytes=100-')
+        self.assertEqual(response['status'], 416)
+        self.assertEqual(response['headers']['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_path_outside_storage(self):
+        # Même correctement signé, un nom ne sort pas du stockage
+        for name in ('../secret.txt', 'files/../../secret.txt', '/etc/passwd'):
+            response = self.get(signed_url(name, 'secret.txt'))
+            self.assertEqual(response['status'], 404, name)
+            self.assertNotIn(b'secret', response['body'])
+
+
+class SignedMediaViewTests(TemporaryMediaMixin, SimpleTestCase):
+    """Liens signés servis par Django hors de wsgi.py (runserver, asgi.py)"""
+
+    CONTENT = b'%PDF-1.4 contenu'
+
+    def setUp(self):
+        super().setUp()
+        self.name = get_book_storage().save('books/files/livre.pdf', ContentFile(self.CONTENT))
+
+    @override_settings(DEBUG=True)
+    def test_served_in_debug(self):
+        url = signed_url(self.name, 'Mon livre.pdf', as_attachment=False)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertIn('inline;', response['Content-Disposition'])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[:4])
+
+        self.assertEqual(self.client.get(url.replace('d=inline', 'd=attachment')).status_code, 403)
+
+    def test_not_served_without_debug(self):
+        self.assertEqual(self.client.get(signed_url(self.name, 'livre.pdf')).status_code, 404)
+
+
+# ============================================
+# LISTE DES UTILISATEURS
+# ============================================
+@unittest.mock.patch('biblio.views_auth.USERS_PER_PAGE', 2)
+class UsersListPaginationTests(TestCase):
+    """Pagination par curseur, dans les deux sens"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.org', date_joined=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+        UserProfile.objects.filter(user=cls.admin).update(role='admin')
+        cls.users = [
+            User.objects.create_user(f'usager{day}', f'usager{day}@example.org', date_joined=datetime(2024, 1, day, tzinfo=dt_timezone.utc))
+            for day in range(1, 5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def page(self, query=''):
+        response = self.client.get(f"{reverse('users_list')}?{query}")
+        return [user.username for user in response.context['users']], response.context
+
+    def test_forward_and_back(self):
+        names, context = self.page()
+        self.assertEqual(names, ['usager4', 'usager3'])
+        self.assertEqual(context['prev_query'], '')
+        names, context = self.page(context['next_query'])
+        self.assertEqual(names, ['usager2', 'usager1'])
+        names, last = self.page(context['next_query'])
+        self.assertEqual(names, ['admin'])
+        self.assertEqual(last['next_query'], '')
+
+        names, context = self.page(last['prev_query'])
+        self.assertEqual(names, ['usager2', 'usager1'])
+        self.assertNotEqual(context['next_query'], '')
+
+        # La dernière page s'est vidée : pas de lien « suivant » mort
+        User.objects.filter(pk=self.admin.pk).update(date_joined=datetime(2030, 1, 1, tzinfo=dt_timezone.utc))
+        names, context = self.page(last['prev_query'])
+        self.assertEqual(names, ['usager2', 'usager1'])
+        self.assertEqual(context['next_query'], '')
+
+
+# ============================================
+# IMPORT DES USAGERS
+# ============================================
+class PatronImportTests(TestCase):
+    """Doublons d'identifiant et d'email, casse ignorée dans le fichier comme dans la base"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('Lecteur', 'Lecteur@Example.org')
+
+    def import_csv(self, *lines):
+        content = '\n'.join(['username,email,prenom,nom', *lines]).encode()
+        return import_patrons(io.BytesIO(content), 'usagers.csv', skip_invalid=True)
+
+    def test_duplicates_ignore_case(self):
+        result = self.import_csv(
+            'lecteur,autre@example.org,Jean,Pierre',
+            'nouveau,lecteur@example.org,Marie,Joseph',
+            'Double,double@example.org,Anne,Louis',
+            'double,DOUBLE2@example.org,Paul,Victor',
+            'unique,Double@Example.org,Alice,Charles',
+        )
+        self.assertEqual(sorted(line for line, _ in result.errors), [2, 3, 5, 6])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(UserProfile.objects.get(user__username='Double').role, 'user')
+
+    @override_settings(BIBLIO_PATRON_IMPORT={'WEB_MAX_PASSWORDS': 1})
+    def test_web_import_password_limit(self):
+        admin = User.objects.create_user('bibliothecaire', 'bibliothecaire@example.org')
+        UserProfile.objects.filter(user=admin).update(role='admin')
+        self.client.force_login(admin)
+        content = '\n'.join([
+            'username,email,prenom,nom,password',
+            'premier,premier@example.org,Jean,Pierre,Kreyol-Lakou-2024',
+            'second,second@example.org,Marie,Joseph,Kreyol-Lakou-2025',
+        ]).encode()
+
+        def post(**data):
+            upload = SimpleUploadedFile('usagers.csv', content, content_type='text/csv')
+            return self.client.post(reverse('import_patrons'), {'file': upload, **data}, follow=True)
+
+        response = post()
+        self.assertFalse(User.objects.filter(username__in=['premier', 'second']).exists())
+        self.assertIn('manage.py import_patrons', ' '.join(str(m) for m in response.context['messages']))
+
+        # La validation seule ne hache rien : elle reste possible depuis l'interface
+        response = post(dry_run='on')
+        self.assertEqual(response.context['result'].rows, 2)
+        self.assertFalse(User.objects.filter(username='premier').exists())
+
+
+# ============================================
+# IMPORT DU CATALOGUE
+# ============================================
+class CatalogImportTests(TestCase):
+    """Import CSV : dédoublonnage par ISBN normalisé, auteurs et éditeurs résolus par nom"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Book.objects.create(title="L'Étranger", isbn='2-07-036822-X')
+
+    def test_import_books(self):
+        content = '\n'.join([
+            'titre;isbn;auteurs;editeur;categories',
+            'Premier livre;0-306-40615-2;Jean Pierre, Marie Joseph;Éditions Soleil;Roman',
+            # ISBN-13 du livre précédent
+            'Premier livre (réédition);9780306406157;Jean Pierre;;Roman',
+            # ISBN-13 d'un livre déjà au catalogue sous son ISBN-10
+            "L'Étranger;978-2-07-036822-8;Albert Camus;;Roman",
+            'Second livre;;JEAN PIERRE;editions soleil;Poésie',
+            'X;;;;',
+        ]).encode()
+        result = import_books(io.BytesIO(content), 'livres.csv', batch_size=1)
+
+        self.assertEqual((result.records, result.created, result.duplicates), (5, 2, 2))
+        self.assertEqual([line for line, _ in result.errors], [6])
+        self.assertEqual((result.new_authors, result.new_publishers, result.new_categories), (2, 1, 2))
+
+        first = Book.objects.get(isbn='0306406152')
+        second = Book.objects.get(title='Second livre')
+        self.assertEqual([author.name for author in first.authors.order_by('bookauthor__contribution_order')],
+                         ['Jean Pierre', 'Marie Joseph'])
+        self.assertEqual(list(second.authors.all()), [first.authors.get(name='Jean Pierre')])
+        self.assertEqual(second.publisher_id, first.publisher_id)
+        self.assertEqual(Book.objects.count(), 3)
+
+
+MARCXML_FIXTURE = """<?xml version="1.0" encoding="UTF-8"?>
+<collection xmlns="http://www.loc.gov/MARC21/slim">
+  <record>
+    <leader>00000nam a2200000 i 4500</leader>
+    <controlfield tag="008">850101s1985    fr            000 1 fre d</controlfield>
+    <datafield tag="020" ind1=" " ind2=" "><subfield code="a">2-07-036822-X (broché)</subfield></datafield>
+    <datafield tag="100" ind1="1" ind2=" "><subfield code="a">Camus, Albert,</subfield></datafield>
+    <datafield tag="245" ind1="1" ind2="3">
+      <subfield code="a">L'étranger /</subfield>
+      <subfield code="c">Albert Camus.</subfield>
+    </datafield>
+    <datafield tag="260" ind1=" " ind2=" ">
+      <subfield code="a">Paris :</subfield>
+      <subfield code="b">Gallimard,</subfield>
+      <subfield code="c">c1972.</subfield>
+    </datafield>
+    <datafield tag="300" ind1=" " ind2=" "><subfield code="a">186 p. ;</subfield></datafield>
+    <datafield tag="650" ind1=" " ind2="7"><subfield code="a">Roman</subfield></datafield>
+  </record>
+</collection>
+"""
+
+ONIX_FIXTURE = """<?xml version="1.0" encoding="UTF-8"?>
+<ONIXMessage release="3.0" xmlns="http://ns.editeur.org/onix/3.0/reference">
+  <Product>
+    <RecordReference>fr.soleil.0001</RecordReference>
+    <ProductIdentifier><ProductIDType>15</ProductIDType><IDValue>9780306406157</IDValue></ProductIdentifier>
+    <DescriptiveDetail>
+      <Collection>
+        <CollectionType>10</CollectionType>
+        <TitleDetail>
+          <TitleType>01</TitleType>
+          <TitleElement><TitleText>Collection Soleil</TitleText></TitleElement>
+        </TitleDetail>
+        <Contributor><ContributorRole>B01</ContributorRole><PersonName>Directeur De Collection</PersonName></Contributor>
+      </Collection>
+      <TitleDetail>
+        <TitleType>01</TitleType>
+        <TitleElement>
+          <TitleElementLevel>01</TitleElementLevel>
+          <TitleText>Contes du pays</TitleText>
+          <Subtitle>Récits</Subtitle>
+        </TitleElement>
+      </TitleDetail>
+      <Contributor><ContributorRole>A01</ContributorRole><NamesBeforeKey>Marie</NamesBeforeKey><KeyNames>Joseph</KeyNames></Contributor>
+      <Contributor><ContributorRole>B06</ContributorRole><PersonName>Traducteur Anonyme</PersonName></Contributor>
+      <Language><LanguageRole>01</LanguageRole><LanguageCode>hat</LanguageCode></Language>
+      <Extent><ExtentType>00</ExtentType><ExtentValue>240</ExtentValue><ExtentUnit>03</ExtentUnit></Extent>
+    </DescriptiveDetail>
+    <PublishingDetail>
+      <Publisher><PublishingRole>01</PublishingRole><PublisherName>Éditions Soleil</PublisherName></Publisher>
+      <PublishingDate><PublishingDateRole>01</PublishingDateRole><Date>20190315</Date></PublishingDate>
+    </PublishingDetail>
+  </Product>
+</ONIXMessage>
+"""
+
+
+class VendorRecordsTests(TestCase):
+    """Import MARCXML et ONIX 3.0 : correspondance des champs avec le catalogue"""
+
+    def import_fixture(self, content, expected_format):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.xml', encoding='utf-8', delete=False)
+        self.addCleanup(os.remove, handle.name)
+        with handle:
+            handle.write(content)
+        self.assertEqual(detect_format(handle.name), expected_format)
+        return import_records(handle.name)
+
+    def test_marcxml(self):
+        result = self.import_fixture(MARCXML_FIXTURE, MARC_FORMAT)
+
+        self.assertEqual((result.records, result.created, result.errors), (1, 1, []))
+        book = Book.objects.get()
+        self.assertEqual(book.title, "L'étranger")
+        self.assertEqual(book.isbn, '207036822X')
+        self.assertEqual([author.name for author in book.authors.all()], ['Albert Camus'])
+        self.assertEqual(book.publisher.publisher_name, 'Gallimard')
+        self.assertEqual((book.publication_year, book.pages, book.language), (1972, 186, 'français'))
+        self.assertEqual([category.category_name for category in book.categories.all()], ['Roman'])
+
+    def test_onix(self):
+        result = self.import_fixture(ONIX_FIXTURE, ONIX_FORMAT)
+
+        self.assertEqual((result.records, result.created, result.errors), (1, 1, []))
+        book = Book.objects.get()
+        # Le titre et le contributeur de la collection ne sont pas ceux du livre
+        self.assertEqual(book.title, 'Contes du pays : Récits')
+        self.assertEqual(book.isbn, '9780306406157')
+        self.assertEqual([author.name for author in book.authors.all()], ['Marie Joseph'])
+        self.assertEqual(book.publisher.publisher_name, 'Éditions Soleil')
+        self.assertEqual((book.publication_year, book.pages, book.language), (2019, 240, 'créole haïtien'))
+
+    def test_duplicate_of_catalog_isbn(self):
+        # ISBN-10 du fichier, ISBN-13 au catalogue
+        Book.objects.create(title="L'Étranger", isbn='9782070368228')
+        result = self.import_fixture(MARCXML_FIXTURE, MARC_FORMAT)
+
+        self.assertEqual((result.records, result.created, result.duplicates), (1, 0, 1))
+        self.assertEqual(Book.objects.count(), 1)
+
+
+# ============================================
+# JEU DE DONNÉES SYNTHÉTIQUE
+# ============================================
+FAKE_SIZES = {
+    'books': 40, 'authors': 15, 'publishers': 5, 'categories': 6,
+    'users': 12, 'loans': 60, 'favorites': 30,
+}
+
+
+class FakeCatalogTests(TestCase):
+    """Même graine, même base de départ : mêmes lignes"""
+
+    def snapshot(self):
+        # request_date est posé par auto_now_add : hors de la comparaison
+        return {
+            'categories': list(Category.objects.order_by('pk').values_list('pk', 'category_name')),
+            'authors': list(Author.objects.order_by('pk').values_list('pk', 'name', 'nationality', 'birth_date', 'biography')),
+            'publishers': list(Publisher.objects.order_by('pk').values_list('pk', 'publisher_name', 'address')),
+            'books': list(Book.objects.order_by('pk').values_list(
+                'pk', 'title', 'isbn', 'publisher_id', 'publication_year', 'pages', 'language', 'summary',
+                'total_copies', 'available_copies', 'status', 'file', 'file_format',
+            )),
+            'book_authors': list(BookAuthor.objects.order_by('book_id', 'author_id').values_list(
+                'book_id', 'author_id', 'contribution_order',
+            )),
+            'book_categories': list(BookCategory.objects.order_by('book_id', 'category_id').values_list(
+                'book_id', 'category_id',
+            )),
+            'users': list(User.objects.order_by('pk').values_list(
+                'pk', 'username', 'first_name', 'last_name', 'date_joined', 'last_login',
+            )),
+            'loans': list(Loan.objects.order_by('pk').values_list(
+                'book_id', 'user_id', 'status', 'loan_date', 'due_date', 'return_date',
+            )),
+            'favorites': list(Favorite.objects.order_by('user_id', 'book_id').values_list('user_id', 'book_id')),
+        }
+
+    def regenerate(self, seed):
+        for model in (Loan, Favorite, BookAuthor, BookCategory, Book, Author, Publisher, Category, User):
+            model.objects.all().delete()
+        generate_catalog(FAKE_SIZES, seed=seed, batch_size=7)
+        return self.snapshot()
+
+    def test_same_seed_same_rows(self):
+        first = self.regenerate(seed=42)
+        self.assertEqual(len(first['books']), FAKE_SIZES['books'])
+        self.assertEqual(len(first['loans']), FAKE_SIZES['loans'])
+
+        self.assertEqual(self.regenerate(seed=42), first)
+        self.assertNotEqual(self.regenerate(seed=43)['books'], first['books'])
+
+    def test_refuses_existing_fake_catalog(self):
+        generate_catalog(FAKE_SIZES, seed=0)
+        with self.assertRaises(ValueError):
+            generate_catalog(FAKE_SIZES, seed=0)
+
+
+# ============================================
+# PROFILAGE
+# ============================================
+PROFILE_EVERYTHING = {'ENABLED': True, 'DEFAULT_SAMPLE_RATE': 1.0, 'SAMPLE_RATES': {}}
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """En-tête Server-Timing et ligne de journal des requêtes échantillonnées"""
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('login'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(BIBLIO_PROFILING=PROFILE_EVERYTHING)
+    def test_sampled_request_is_profiled(self):
+        with self.assertLogs('biblio.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('login'))
+        names = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(names, ['db', 'tpl', 'ser', 'app', 'total'])
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'login')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['tpl_ms'], 0)
+
+    def test_sample_rate_by_path_prefix(self):
+        rates = {reverse('login'): 0.0}
+        with override_settings(BIBLIO_PROFILING={**PROFILE_EVERYTHING, 'SAMPLE_RATES': rates}):
+            response = self.client.get(reverse('login'))
+            self.assertNotIn('Server-Timing', response)
+            response = self.client.get(reverse('register'))
+            self.assertIn('Server-Timing', response)
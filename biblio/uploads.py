@@ -0,0 +1,223 @@
+"""
+Envoi des fichiers numériques par morceaux, avec reprise.
+
+Un envoi se déroule en trois temps :
+
+1. init : le client annonce le nom et la taille du fichier ;
+2. PUT d'un morceau à une position donnée, avec son empreinte SHA-256 :
+   le morceau est vérifié puis ajouté au fichier de transit. Après une
+   coupure, le client relit la position atteinte et reprend à partir d'elle ;
+3. finalisation : le fichier de transit est rattaché au livre par un simple
+   renommage vers le stockage par contenu (voir storage.py), sans recopie.
+
+Les fichiers de transit sont rangés sous MEDIA_ROOT, sur le même système de
+fichiers que le stockage des livres.
+"""
+
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import UploadSession
+from .storage import get_book_storage, hash_file
+
+
+UPLOAD_PREFIX = 'books/uploads'
+
+ALLOWED_EXTENSIONS = ('.pdf', '.epub', '.mobi')
+
+DEFAULT_SETTINGS = {
+    'MAX_SIZE': 1024 * 1024 * 1024,       # Taille maximale d'un fichier (octets)
+    'MAX_CHUNK_SIZE': 8 * 1024 * 1024,    # Taille maximale d'un morceau (octets)
+    'SESSION_TTL_HOURS': 24,              # Durée de vie d'un envoi inactif
+}
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Erreur d'envoi ; status est le code HTTP à renvoyer"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_upload_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BIBLIO_UPLOADS', {})}
+
+
+def staging_path(session):
+    return get_book_storage().path(f'{UPLOAD_PREFIX}/{session.upload_id}.part')
+
+
+# ============================================
+# ÉTAPES DE L'ENVOI
+# ============================================
+def start_upload(user, filename, total_size, book=None, expected_sha256=''):
+    """Crée une session d'envoi et son fichier de transit vide"""
+    config = get_upload_settings()
+    filename = os.path.basename(filename or '').strip()
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise UploadError('Format non supporté (PDF, EPUB ou MOBI uniquement).')
+    if total_size <= 0 or total_size > config['MAX_SIZE']:
+        raise UploadError(f"Taille invalide (maximum {config['MAX_SIZE']} octets).")
+    expected_sha256 = (expected_sha256 or '').lower()
+    if expected_sha256 and len(expected_sha256) != 64:
+        raise UploadError('Empreinte SHA-256 invalide.')
+
+    session = UploadSession.objects.create(
+        user=user,
+        book=book,
+        filename=filename,
+        total_size=total_size,
+        expected_sha256=expected_sha256,
+    )
+    path = staging_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def append_chunk(session, offset, length, stream, chunk_sha256):
+    """
+    Ajoute un morceau au fichier de transit.
+
+    La session doit être verrouillée (select_for_update) par l'appelant. Un
+    morceau dont l'empreinte ne correspond pas est retiré du fichier : le
+    client peut le renvoyer à la même position.
+
+    Args:
+        offset: Position annoncée par le client
+        length: Taille du morceau (Content-Length)
+        stream: Flux à lire (la requête)
+        chunk_sha256: Empreinte SHA-256 annoncée du morceau
+    """
+    if session.status != 'uploading':
+        raise UploadError('Cet envoi est terminé.', status=409)
+    if offset != session.received_size:
+        raise UploadError('Position incorrecte.', status=409)
+    if length <= 0 or length > get_upload_settings()['MAX_CHUNK_SIZE']:
+        raise UploadError('Taille de morceau invalide.')
+    if offset + length > session.total_size:
+        raise UploadError('Le morceau dépasse la taille annoncée du fichier.')
+    if not chunk_sha256:
+        raise UploadError('Empreinte du morceau manquante (en-tête X-Chunk-SHA256).')
+
+    sha256 = hashlib.sha256()
+    received = 0
+    with open(staging_path(session), 'r+b') as output:
+        # Efface un éventuel morceau incomplet laissé par une coupure
+        output.truncate(offset)
+        output.seek(offset)
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            sha256.update(data)
+            output.write(data)
+            received += len(data)
+
+        if received != length or sha256.hexdigest() != chunk_sha256.lower():
+            output.truncate(offset)
+            raise UploadError('Morceau incomplet ou corrompu, renvoyez-le.')
+
+    session.received_size = offset + length
+    session.save(update_fields=['received_size', 'updated_at'])
+    return session
+
+
+class StagedFile(File):
+    """Fichier de transit déjà sur disque, avec son empreinte calculée"""
+
+    def __init__(self, path, name, sha256):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def _check_complete(session):
+    if session.status != 'uploading':
+        raise UploadError('Cet envoi est terminé.', status=409)
+    if session.received_size != session.total_size:
+        raise UploadError('Le fichier est incomplet.', status=409)
+
+
+def hash_upload(session):
+    """
+    Empreinte du fichier de transit complet, vérifiée contre celle annoncée.
+
+    À appeler avant de verrouiller la session : un fichier complet ne reçoit
+    plus de morceau, son empreinte reste valable jusqu'à finish_upload.
+    """
+    _check_complete(session)
+    sha256 = hash_file(staging_path(session))
+    if session.expected_sha256 and sha256 != session.expected_sha256:
+        raise UploadError('Le fichier reçu ne correspond pas à l\'empreinte annoncée.')
+    return sha256
+
+
+def finish_upload(session, book, sha256=None):
+    """
+    Rattache le fichier complet au livre.
+
+    Le fichier de transit est renommé vers le stockage par contenu ; s'il
+    existe déjà un fichier identique, celui-ci est réutilisé.
+
+    Args:
+        sha256: Empreinte calculée par hash_upload (sinon calculée ici)
+    """
+    _check_complete(session)
+    if sha256 is None:
+        sha256 = hash_upload(session)
+
+    staged = StagedFile(staging_path(session), session.filename, sha256)
+    try:
+        book.file.save(session.filename, staged, save=True)
+    finally:
+        staged.close()
+
+    session.book = book
+    session.status = 'complete'
+    session.save(update_fields=['book', 'status', 'updated_at'])
+    return book
+
+
+def abort_upload(session):
+    """Abandonne un envoi en cours et efface son fichier de transit"""
+    if session.status != 'uploading':
+        # Un envoi terminé a rendu son fichier au stockage des livres
+        raise UploadError('Cet envoi est terminé.', status=409)
+    session.status = 'aborted'
+    session.save(update_fields=['status', 'updated_at'])
+    try:
+        os.remove(staging_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def purge_expired_uploads():
+    """
+    Supprime les envois inactifs depuis plus de SESSION_TTL_HOURS.
+
+    Returns:
+        int: Nombre de sessions supprimées
+    """
+    limit = timezone.now() - timedelta(hours=get_upload_settings()['SESSION_TTL_HOURS'])
+    expired = UploadSession.objects.filter(updated_at__lt=limit)
+    count = 0
+    for session in expired.iterator():
+        try:
+            os.remove(staging_path(session))
+        except FileNotFoundError:
+            pass
+        count += 1
+    expired.delete()
+    return count
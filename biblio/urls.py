@@ -3,6 +3,7 @@ from . import views
 from . import views_auth
 from . import views_loan
 from . import views_favorites
+from . import views_uploads
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -11,11 +12,13 @@ urlpatterns = [
     
     # API endpoints
     path('api/books/', views.api_books, name='api_books'),
+    path('api/books/content-search/', views.api_content_search, name='api_content_search'),
     path('api/books/<int:book_id>/', views.api_get_book, name='api_get_book'),
     path('api/books/<int:book_id>/download/', views.api_download_book, name='api_download_book'),
     path('api/categories/', views.api_categories, name='api_categories'),
     path('api/authors/', views.api_authors, name='api_authors'),
     path('api/publishers/', views.api_publishers, name='api_publishers'),
+    path('api/suggest/', views.api_suggest, name='api_suggest'),
     
     # Gestion des fichiers PDF
     path('books/<int:book_id>/download/', views.download_book, name='download_book'),
@@ -40,6 +43,7 @@ urlpatterns = [
     
     # Form views for books
     path('books/add/', views.add_book, name='add_book'),
+    path('books/import/', views.import_books, name='import_books'),
     path('books/<int:book_id>/edit/', views.edit_book, name='edit_book'),
     path('books/<int:book_id>/delete/', views.delete_book, name='delete_book'),
     path('books/', views.book_list, name='book_list'),
@@ -47,6 +51,8 @@ urlpatterns = [
     path('books/export/excel/', views.export_books_excel, name='export_books_excel'),
     path('books/export/pdf/', views.export_books_pdf, name='export_books_pdf'),
     path('books/export/word/', views.export_books_word, name='export_books_word'),
+    path('books/export/csv/', views.export_books_csv, name='export_books_csv'),
+    path('books/export/tsv/', views.export_books_tsv, name='export_books_tsv'),
     
     # Authentication URLs
     path('register/', views_auth.register_view, name='register'),
@@ -57,6 +63,7 @@ urlpatterns = [
     
     # User management URLs (admin only)
     path('users/', views_auth.users_list_view, name='users_list'),
+    path('users/import/', views_auth.import_patrons_view, name='import_patrons'),
     path('users/<int:user_id>/', views_auth.user_detail_view, name='user_detail'),
     path('users/<int:user_id>/change-role/', views_auth.change_user_role_view, name='change_user_role'),
     path('users/<int:user_id>/delete/', views_auth.delete_user_view, name='delete_user'),
@@ -74,6 +81,11 @@ urlpatterns = [
     path('favorites/remove/<int:favorite_id>/', views_favorites.remove_favorite_view, name='remove_favorite'),
     path('favorites/check/<int:book_id>/', views_favorites.check_favorite_status, name='check_favorite_status'),
     
+    # Envoi des fichiers numériques par morceaux
+    path('api/uploads/', views_uploads.api_upload_start, name='api_upload_start'),
+    path('api/uploads/<uuid:upload_id>/', views_uploads.api_upload_session, name='api_upload_session'),
+    path('api/uploads/<uuid:upload_id>/complete/', views_uploads.api_upload_complete, name='api_upload_complete'),
+    
     # API for user info
     path('api/user/info/', views_auth.api_user_info, name='api_user_info'),
 ]
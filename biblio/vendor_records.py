@@ -0,0 +1,391 @@
+"""
+Import des notices des fournisseurs : MARCXML (MARC 21) et ONIX (2.1, 3.0).
+
+Ces fichiers peuvent peser plusieurs centaines de Mo : ils sont lus avec
+lxml.etree.iterparse, une notice (<record> ou <Product>) à la fois.
+Chaque élément traité est vidé puis détaché de la racine avec ses frères
+précédents, si bien que la mémoire reste constante quelle que soit la
+taille du fichier.
+
+Chaque notice est convertie en BookRecord et confiée à
+catalog_import.CatalogWriter : dédoublonnage par ISBN normalisé, auteurs,
+éditeurs et catégories résolus en mémoire, écriture par lots dans des
+transactions séparées.
+"""
+
+import re
+
+from .catalog_import import BookRecord, CatalogWriter, clean_isbn
+
+
+MARC_FORMAT = 'marcxml'
+ONIX_FORMAT = 'onix'
+FORMATS = (MARC_FORMAT, ONIX_FORMAT)
+
+# Codes de langue MARC / ISO 639-2 les plus courants dans nos fonds
+LANGUAGES = {
+    'fre': 'français',
+    'fra': 'français',
+    'hat': 'créole haïtien',
+    'eng': 'anglais',
+    'spa': 'espagnol',
+    'por': 'portugais',
+    'ger': 'allemand',
+    'deu': 'allemand',
+    'ita': 'italien',
+    'lat': 'latin',
+}
+
+_YEAR = re.compile(r'(1[5-9]\d\d|20\d\d)')
+_NUMBER = re.compile(r'\d+')
+_MARC_PAGES = re.compile(r'(\d+)\s*(?:p\b|pages)')
+# Initiale ou abréviation finale dont le point fait partie du nom (« J.-J. »)
+_FINAL_INITIAL = re.compile(r'(?:^|[\s.\-])\w\.$')
+# Ponctuation ISBD en fin de zone : « Les misérables / », « Paris : »
+_TRAILING_PUNCTUATION = re.compile(r'[\s/:;,=.]+$')
+_FORMAT_SNIFF = re.compile(rb'<(?:[\w.-]+:)?(collection|record|ONIXMessage|ONIXmessage)\b')
+
+
+def _clean(value):
+    value = ' '.join((value or '').split())
+    if _FINAL_INITIAL.search(value):
+        return value
+    return _TRAILING_PUNCTUATION.sub('', value)
+
+
+def _year(value):
+    match = _YEAR.search(value or '')
+    return int(match.group(1)) if match else None
+
+
+def _number(value):
+    match = _NUMBER.search(value or '')
+    return int(match.group(0)) if match else None
+
+
+def _language(code):
+    code = (code or '').strip().lower()
+    return LANGUAGES.get(code, code)
+
+
+def _first_isbn(values):
+    """Premier ISBN utilisable d'une liste (« 9782070368228 (broché) »…)"""
+    for value in values:
+        isbn = clean_isbn((value or '').split(' ')[0])
+        if len(isbn) in (10, 13):
+            return isbn
+    return ''
+
+
+def _unique(names):
+    return tuple(dict.fromkeys(name for name in names if name))
+
+
+def _localname(element):
+    tag = element.tag
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+# ============================================
+# MARCXML
+# ============================================
+def _marc_fields(record):
+    """{étiquette: [(indicateur 1, {code: [valeurs]})]} d'une notice MARCXML"""
+    fields = {}
+    for child in record:
+        name = _localname(child)
+        if name == 'controlfield':
+            fields.setdefault(child.get('tag'), []).append(('', {'': [child.text or '']}))
+        elif name == 'datafield':
+            subfields = {}
+            for subfield in child:
+                if _localname(subfield) == 'subfield':
+                    subfields.setdefault(subfield.get('code'), []).append(subfield.text or '')
+            fields.setdefault(child.get('tag'), []).append((child.get('ind1') or ' ', subfields))
+    return fields
+
+
+def _marc_values(fields, tag, code):
+    return [value for _, subfields in fields.get(tag, ()) for value in subfields.get(code, ())]
+
+
+def _marc_name(indicator, value):
+    """« Hugo, Victor, » (nom inversé, indicateur 1) -> « Victor Hugo »"""
+    name = _clean(value)
+    if indicator == '1' and ', ' in name:
+        surname, forenames = name.split(', ', 1)
+        name = f'{forenames} {surname}'
+    return name
+
+
+def marc_record(record):
+    """Notice BookRecord d'un élément <record> MARCXML"""
+    fields = _marc_fields(record)
+    control_008 = (_marc_values(fields, '008', '') or [''])[0]
+
+    title = ' : '.join(
+        _clean(value) for value in (_marc_values(fields, '245', 'a')[:1] + _marc_values(fields, '245', 'b')[:1]) if _clean(value)
+    )
+    authors = _unique(
+        _marc_name(indicator, value)
+        for tag in ('100', '110', '700', '710')
+        for indicator, subfields in fields.get(tag, ())
+        for value in subfields.get('a', ())[:1]
+    )
+    publisher = next(
+        (_clean(value) for tag in ('264', '260') for value in _marc_values(fields, tag, 'b') if _clean(value)), ''
+    )
+    year = next((_year(value) for tag in ('264', '260') for value in _marc_values(fields, tag, 'c') if _year(value)), None)
+    if year is None:
+        year = _year(control_008[7:11])
+    language = next(iter(_marc_values(fields, '041', 'a')), '') or control_008[35:38]
+
+    return BookRecord(
+        title=title,
+        isbn=_first_isbn(_marc_values(fields, '020', 'a')),
+        authors=authors,
+        publisher=publisher,
+        categories=_unique(_clean(value) for tag in ('650', '655') for value in _marc_values(fields, tag, 'a')),
+        publication_year=year,
+        pages=next((int(match.group(1)) for value in _marc_values(fields, '300', 'a') for match in [_MARC_PAGES.search(value)] if match), None),
+        language=_language(language),
+        summary=' '.join(_clean(value) for value in _marc_values(fields, '520', 'a')),
+    )
+
+
+# ============================================
+# ONIX
+# ============================================
+# Balises de référence -> balises courtes (ONIX 2.1 et 3.0)
+ONIX_SHORT_TAGS = {
+    'ProductIdentifier': 'productidentifier',
+    'ProductIDType': 'b221',
+    'IDValue': 'b244',
+    'Title': 'title',
+    'TitleDetail': 'titledetail',
+    'TitleType': 'b202',
+    'TitleElement': 'titleelement',
+    'TitleText': 'b203',
+    'TitlePrefix': 'b030',
+    'TitleWithoutPrefix': 'b031',
+    'Subtitle': 'b029',
+    'DistinctiveTitle': 'b028',
+    'Contributor': 'contributor',
+    'ContributorRole': 'b035',
+    'PersonName': 'b036',
+    'PersonNameInverted': 'b037',
+    'NamesBeforeKey': 'b039',
+    'KeyNames': 'b040',
+    'CorporateName': 'b047',
+    'PublisherName': 'b081',
+    'PublicationDate': 'b003',
+    'PublishingDate': 'publishingdate',
+    'PublishingDateRole': 'x448',
+    'Date': 'b306',
+    'NumberOfPages': 'b061',
+    'Extent': 'extent',
+    'ExtentType': 'b218',
+    'ExtentValue': 'b219',
+    'Language': 'language',
+    'LanguageRole': 'b253',
+    'LanguageCode': 'b252',
+    'OtherText': 'othertext',
+    'TextTypeCode': 'd102',
+    'TextContent': 'textcontent',
+    'TextType': 'x426',
+    'Text': 'd104',
+    'Subject': 'subject',
+    'SubjectHeadingText': 'b070',
+}
+
+# Rôles d'auteur (liste ONIX 17) : « By », « With »
+AUTHOR_ROLES = ('A01', 'A02')
+ISBN_TYPES = ('15', '02')
+SUMMARY_TEXT_TYPES = ('03', '02', '01')
+
+
+def _onix_names(name):
+    return tuple(f'{{*}}{tag}' for tag in (name, ONIX_SHORT_TAGS.get(name, name.lower())))
+
+
+# Composites décrivant la collection, pas le livre lui-même
+ONIX_SERIES_TAGS = ('Collection', 'collection', 'Series', 'series')
+
+
+def _onix_all(element, name):
+    """Descendants d'un nom ONIX, en balises de référence ou courtes, hors collection"""
+    found = []
+    for child in element.iter(*_onix_names(name)):
+        if child is element:
+            continue
+        for ancestor in child.iterancestors():
+            if ancestor is element:
+                found.append(child)
+                break
+            if _localname(ancestor) in ONIX_SERIES_TAGS:
+                break
+    return found
+
+
+def _onix_text(element, name):
+    """Texte du premier descendant de ce nom ('' s'il n'y en a pas)"""
+    for child in _onix_all(element, name):
+        return ''.join(child.itertext()).strip()
+    return ''
+
+
+def _onix_contributor_name(contributor):
+    name = _onix_text(contributor, 'PersonName')
+    if not name and _onix_text(contributor, 'KeyNames'):
+        name = f"{_onix_text(contributor, 'NamesBeforeKey')} {_onix_text(contributor, 'KeyNames')}"
+    if not name and _onix_text(contributor, 'PersonNameInverted'):
+        name = _marc_name('1', _onix_text(contributor, 'PersonNameInverted'))
+    return _clean(name or _onix_text(contributor, 'CorporateName'))
+
+
+def _onix_title(product):
+    # ONIX 3.0 : TitleDetail ; ONIX 2.1 : Title ; type 01 = titre distinctif
+    for container in _onix_all(product, 'TitleDetail') + _onix_all(product, 'Title'):
+        if _onix_text(container, 'TitleType') not in ('', '01'):
+            continue
+        title = _onix_text(container, 'TitleText') or ' '.join(
+            part for part in (_onix_text(container, 'TitlePrefix'), _onix_text(container, 'TitleWithoutPrefix')) if part
+        )
+        subtitle = _onix_text(container, 'Subtitle')
+        if title:
+            return _clean(f'{title} : {subtitle}' if subtitle else title)
+    return _clean(_onix_text(product, 'DistinctiveTitle'))
+
+
+def _onix_summary(product):
+    texts = {}
+    for container in _onix_all(product, 'TextContent') + _onix_all(product, 'OtherText'):
+        text_type = _onix_text(container, 'TextType') or _onix_text(container, 'TextTypeCode')
+        texts.setdefault(text_type, _onix_text(container, 'Text'))
+    summary = next((texts[text_type] for text_type in SUMMARY_TEXT_TYPES if texts.get(text_type)), '')
+    # Le résumé peut être du XHTML ou du HTML échappé
+    return ' '.join(re.sub(r'<[^>]+>', ' ', summary).split())
+
+
+def onix_product(product):
+    """Notice BookRecord d'un élément <Product> ONIX"""
+    isbns = {}
+    for identifier in _onix_all(product, 'ProductIdentifier'):
+        isbns.setdefault(_onix_text(identifier, 'ProductIDType'), _onix_text(identifier, 'IDValue'))
+
+    authors = _unique(
+        _onix_contributor_name(contributor)
+        for contributor in _onix_all(product, 'Contributor')
+        if _onix_text(contributor, 'ContributorRole') in AUTHOR_ROLES
+    )
+
+    year = _year(_onix_text(product, 'PublicationDate'))
+    for date in _onix_all(product, 'PublishingDate'):
+        if _onix_text(date, 'PublishingDateRole') in ('', '01'):
+            year = _year(_onix_text(date, 'Date'))
+            break
+
+    pages = _number(_onix_text(product, 'NumberOfPages'))
+    for extent in _onix_all(product, 'Extent'):
+        if pages is None and _onix_text(extent, 'ExtentType') in ('00', '11'):
+            pages = _number(_onix_text(extent, 'ExtentValue'))
+
+    language = ''
+    for element in _onix_all(product, 'Language'):
+        if _onix_text(element, 'LanguageRole') in ('', '01'):
+            language = _onix_text(element, 'LanguageCode')
+            break
+
+    return BookRecord(
+        title=_onix_title(product),
+        isbn=_first_isbn(isbns.get(id_type, '') for id_type in ISBN_TYPES),
+        authors=authors,
+        publisher=_clean(_onix_text(product, 'PublisherName')),
+        categories=_unique(_clean(_onix_text(subject, 'SubjectHeadingText')) for subject in _onix_all(product, 'Subject')),
+        publication_year=year,
+        pages=pages,
+        language=_language(language),
+        summary=_onix_summary(product),
+    )
+
+
+# ============================================
+# LECTURE EN FLUX
+# ============================================
+PARSERS = {
+    MARC_FORMAT: (('{*}record',), marc_record),
+    ONIX_FORMAT: (('{*}Product', '{*}product'), onix_product),
+}
+
+
+def detect_format(path):
+    """
+    Format d'un fichier d'après son élément racine.
+
+    Raises:
+        ValueError: Ni MARCXML ni ONIX
+    """
+    with open(path, 'rb') as handle:
+        match = _FORMAT_SNIFF.search(handle.read(64 * 1024))
+    if match is None:
+        raise ValueError('Format non reconnu : ni MARCXML ni ONIX.')
+    return ONIX_FORMAT if match.group(1).lower() == b'onixmessage' else MARC_FORMAT
+
+
+def iter_records(path, record_format):
+    """
+    Lit les notices une à une.
+
+    Yields:
+        (numéro de ligne dans le fichier, BookRecord)
+
+    Raises:
+        ValueError: XML mal formé (les notices déjà lues ont été produites)
+    """
+    from lxml import etree
+
+    tags, convert = PARSERS[record_format]
+    context = etree.iterparse(
+        path, events=('end',), tag=tags,
+        resolve_entities=False, no_network=True, remove_comments=True,
+    )
+    try:
+        for _, element in context:
+            yield element.sourceline, convert(element)
+            # Mémoire constante : l'élément et ses frères déjà traités sont libérés
+            element.clear(keep_tail=False)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+    except etree.XMLSyntaxError as error:
+        raise ValueError(f'XML mal formé : {error}') from error
+    finally:
+        del context
+
+
+def import_records(path, record_format=None, dry_run=False, batch_size=None):
+    """
+    Importe un fichier MARCXML ou ONIX dans le catalogue.
+
+    Args:
+        path: Chemin du fichier
+        record_format: MARC_FORMAT, ONIX_FORMAT ou None (détection)
+        dry_run: Tout valider et compter sans rien écrire
+        batch_size: Livres par lot et par transaction
+
+    Returns:
+        catalog_import.CatalogImportResult (rate : notices par seconde)
+
+    Raises:
+        ValueError: Format non reconnu ou XML mal formé
+    """
+    record_format = record_format or detect_format(path)
+    writer = CatalogWriter(batch_size=batch_size, dry_run=dry_run)
+    try:
+        for line, record in iter_records(path, record_format):
+            writer.add(record, line)
+    except ValueError as error:
+        # Les lots complets sont déjà écrits ; le dernier l'est aussi
+        writer.errors.append((None, str(error)))
+    return writer.finish()
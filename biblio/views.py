@@ -1,55 +1,22 @@
 from django import forms
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, FileResponse, HttpResponse, Http404
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Case, When, IntegerField, Value, F, Exists, OuterRef
-from django.db.models.functions import Concat
-from django.conf import settings
+from django.db.models import Q, Count, Case, When, IntegerField
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.utils.encoding import smart_str
-import os
-import mimetypes
 from .models import Book, Author, Category, Publisher
-from .forms import BookForm, AuthorForm, CategoryForm, PublisherForm
+from .forms import BookForm, AuthorForm, CategoryForm, PublisherForm, BookImportForm
 from .decorators import admin_required, ajax_admin_required
-# Ajoutez ces imports en haut de views.py
-from django.http import HttpResponse
+from .roles import get_user_role
+from . import search_cache, facets, suggest, export_cache, exports, content_index, signed_media, catalog_import, profiling
+from .filters import parse_book_filters, export_filters
+from .exports import delimited
 from datetime import datetime
-import io
-
-# Pour Excel
-try:
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.utils import get_column_letter
-except ImportError:
-    openpyxl = None
-
-# Pour PDF
-try:
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import letter, A4, landscape
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-except ImportError:
-    SimpleDocTemplate = None
-
-# Pour Word
-try:
-    from docx import Document
-    from docx.shared import Inches, Pt, RGBColor
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-except ImportError:
-    Document = None
-
-
 
 
 # ============================================
@@ -112,47 +79,12 @@ def get_global_stats():
 @login_required
 def index(request):
     # Récupérer les paramètres de recherche et filtres
-    search_query = request.GET.get('search', '').strip()
-    category_id = request.GET.get('category', '')
-    status_filter = request.GET.get('status', '')
-    format_filter = request.GET.get('format', '')
-    sort_by = request.GET.get('sort', 'created_at')
+    spec = parse_book_filters(request.GET)
     
     # Base queryset pour les livres
-    books_queryset = Book.objects.select_related('publisher').prefetch_related('authors', 'categories')
-    
-    # Appliquer la recherche
-    if search_query:
-        books_queryset = books_queryset.filter(
-            Q(title__icontains=search_query) |
-            Q(isbn__icontains=search_query) |
-            Q(authors__name__icontains=search_query) |
-            Q(publisher__publisher_name__icontains=search_query) |
-            Q(description__icontains=search_query)
-        ).distinct()
-    
-    # Appliquer le filtre de catégorie
-    if category_id:
-        books_queryset = books_queryset.filter(categories__category_id=category_id)
-    
-    # Appliquer le filtre de statut
-    if status_filter:
-        books_queryset = books_queryset.filter(status=status_filter)
-    
-    # Appliquer le filtre de format
-    if format_filter == 'digital':
-        books_queryset = books_queryset.exclude(file='').exclude(file__isnull=True)
-    elif format_filter == 'physical':
-        books_queryset = books_queryset.filter(Q(file='') | Q(file__isnull=True))
-    
-    # Appliquer le tri
-    sort_mapping = {
-        'title': 'title',
-        'publication_year': '-publication_year',
-        'created_at': '-created_at',
-        '-title': '-title',
-    }
-    books_queryset = books_queryset.order_by(sort_mapping.get(sort_by, '-created_at'))
+    books_queryset = spec.compile(
+        Book.objects.select_related('publisher').prefetch_related('authors', 'categories')
+    )
     
     # Livres populaires (affichés séparément en haut)
     popular_books = Book.objects.annotate(
@@ -165,24 +97,18 @@ def index(request):
         )
     ).order_by('-availability_score', '-created_at')[:10]
     
-    # Statistiques pour les livres filtrés
-    filtered_total = books_queryset.count()
-    filtered_available = books_queryset.filter(status='available').count()
-    
     # Récupérer les statistiques globales
     global_stats = get_global_stats()
     
     context = {
         'popular_books': popular_books,
         'all_books': books_queryset,
-        'filtered_total': filtered_total,
-        'filtered_available': filtered_available,
         # Paramètres de recherche actuels
-        'current_search': search_query,
-        'current_category': category_id,
-        'current_status': status_filter,
-        'current_format': format_filter,
-        'current_sort': sort_by,
+        'current_search': spec.search,
+        'current_category': request.GET.get('category', ''),
+        'current_status': request.GET.get('status', ''),
+        'current_format': spec.book_format,
+        'current_sort': request.GET.get('sort', 'created_at'),
     }
     
     # Ajouter les statistiques globales
@@ -194,124 +120,107 @@ def index(request):
 # ============================================
 # API ENDPOINTS
 # ============================================
+def get_search_result(spec, key=None):
+    """
+    Retourne les identifiants ordonnés et les compteurs d'une recherche,
+    depuis le cache de résultats si possible.
+
+    Args:
+        spec: BookFilterSpec
+        key: Clé de cache déjà calculée (search_cache.cache_key)
+    """
+    key = key or search_cache.cache_key(spec)
+    result = search_cache.get_cached_result(key)
+    if result is not None:
+        return result
+    
+    # Gros catalogue sans filtre : compteurs estimés, sans parcourir la table
+    counts = spec.approximate_counts()
+    if counts is None:
+        # Une seule requête pour les identifiants ordonnés et la disponibilité
+        max_ids = search_cache.result_cache.max_ids
+        rows = list(spec.compile().values_list('pk', 'available_copies')[:max_ids + 1])
+        if len(rows) <= max_ids:
+            total_available = sum(1 for _, copies in rows if (copies or 0) > 0)
+            return search_cache.cache_result(key, [pk for pk, _ in rows], total_available)
+        # Résultat trop volumineux : un seul agrégat conditionnel pour les compteurs
+        counts = spec.counts()
+    
+    return search_cache.cache_counts(key, counts['total'], counts['available'], counts['approximate'])
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_books(request):
     page = request.GET.get('page', 1)
     per_page = request.GET.get('per_page', 12)
-    search = request.GET.get('search', '')
-    category_id = request.GET.get('category', None)
-    status = request.GET.getlist('status', [])
-    format_type = request.GET.get('format', '')  # Changé pour gérer 'physical' ou 'digital'
-    languages = request.GET.getlist('language', [])
-    availability = request.GET.get('availability', None)
-    sort_by = request.GET.get('sort', 'created_at')
-    sort_order = request.GET.get('order', 'desc')
-    min_year = request.GET.get('min_year', None)
-    max_year = request.GET.get('max_year', None)
-    
-    books = Book.objects.all()
-    
-    if search:
-        books = books.filter(
-            Q(title__icontains=search) |
-            Q(summary__icontains=search) |
-            Q(authors__name__icontains=search) |
-            Q(isbn__icontains=search) |
-            Q(publisher__publisher_name__icontains=search)
-        ).distinct()
-    
-    if category_id:
-        books = books.filter(categories__category_id=category_id)
-    
-    if status:
-        books = books.filter(status__in=status)
-    
-    # Filtre de format corrigé pour gérer physical/digital
-    if format_type == 'digital':
-        # Livres numériques : ont un fichier
-        books = books.exclude(file='').exclude(file__isnull=True)
-    elif format_type == 'physical':
-        # Livres physiques : n'ont pas de fichier
-        books = books.filter(Q(file='') | Q(file__isnull=True))
-    
-    if languages:
-        books = books.filter(language__in=languages)
-    
-    if availability == 'available':
-        books = books.filter(available_copies__gt=0)
-    elif availability == 'unavailable':
-        books = books.filter(available_copies=0)
-    
-    if min_year:
-        books = books.filter(publication_year__gte=min_year)
-    if max_year:
-        books = books.filter(publication_year__lte=max_year)
-    
-    sort_field = sort_by
-    if sort_order == 'desc':
-        sort_field = f'-{sort_field}'
-    
-    if sort_by == 'title':
-        books = books.order_by(sort_field)
-    elif sort_by == 'author':
-        books = books.annotate(
-            author_name=Concat('authors__name')
-        ).order_by(f'{sort_field}')
-    elif sort_by == 'popularity':
-        books = books.annotate(
-            borrow_count=Count('borrowings')
-        ).order_by(f'-borrow_count')
-    elif sort_by == 'year':
-        books = books.order_by(f'{sort_field}publication_year')
-    else:
-        books = books.order_by(sort_field)
+    spec = parse_book_filters(request.GET)
+    facet_names = facets.parse_facets(request.GET.get('facets', ''))
+    
+    # Les résultats (identifiants ordonnés + compteurs) sont mis en cache
+    # par empreinte des filtres : les pages suivantes et les recherches
+    # répétées ne relancent pas la requête filtrée
+    key = search_cache.cache_key(spec)
+    result = get_search_result(spec, key)
+    
+    # Facettes : toutes celles qui manquent sont calculées en une seule requête,
+    # puis l'entrée partagée est remplacée par une copie qui les contient
+    missing_facets = [name for name in facet_names if name not in result.facets]
+    if missing_facets:
+        result = search_cache.cache_facets(key, result, facets.compute_facets(spec, missing_facets))
+    
+    ids = result.ids
+    if ids is None:
+        # Les identifiants ne sont pas en cache : lecture de la seule page demandée
+        ids = search_cache.LazyIds(spec.compile(), result.total)
+    paginator = Paginator(ids, per_page)
+    try:
+        page_obj = paginator.page(page)
+    except:
+        page_obj = paginator.page(1)
+    
+    # Chargement des livres de la page par clé primaire
+    page_ids = list(page_obj.object_list)
+    books_by_id = Book.objects.select_related('publisher').prefetch_related(
+        'authors', 'categories'
+    ).in_bulk(page_ids)
     
     # Optimisation pour voir si le livre est favori pour l'utilisateur actuel
+    favorite_ids = set()
     if request.user.is_authenticated:
         from .models import Favorite
-        books = books.annotate(
-            is_favorite=Exists(
-                Favorite.objects.filter(
-                    user=request.user,
-                    book=OuterRef('pk')
-                )
-            )
+        favorite_ids = set(
+            Favorite.objects.filter(user=request.user, book_id__in=page_ids)
+            .values_list('book_id', flat=True)
         )
     
-    paginator = Paginator(books, per_page)
-    try:
-        page_obj = paginator.page(page)
-    except:
-        page_obj = paginator.page(1)
-    
-    total_available = books.filter(available_copies__gt=0).count()
-
     # Sérialisation manuelle pour inclure is_favorite
     books_data = []
-    for book in page_obj:
-        data = book.to_dict()
-        if request.user.is_authenticated:
-            data['is_favorite'] = getattr(book, 'is_favorite', False)
-        books_data.append(data)
-    
-    return JsonResponse({
+    with profiling.section(profiling.SERIALIZE):
+        for book_id in page_ids:
+            book = books_by_id.get(book_id)
+            if book is None:
+                continue
+            data = book.to_dict()
+            if request.user.is_authenticated:
+                data['is_favorite'] = book_id in favorite_ids
+            books_data.append(data)
+    
+    response_data = {
         'books': books_data,
-        'total': paginator.count,
-        'available': total_available,
+        'total': result.total,
+        'available': result.available,
+        'approximate': result.approximate,
         'pages': paginator.num_pages,
         'current_page': page_obj.number,
         'has_next': page_obj.has_next(),
         'has_prev': page_obj.has_previous(),
-        'filters_applied': {
-            'search': bool(search),
-            'category': bool(category_id),
-            'status': bool(status),
-            'format': bool(format_type),  # Changé de 'formats' à 'format'
-            'languages': bool(languages),
-            'year_range': bool(min_year or max_year),
-        }
-    })
+        'filters_applied': spec.filters_applied,
+    }
+    if facet_names:
+        response_data['facets'] = {name: result.facets[name] for name in facet_names}
+    
+    return JsonResponse(response_data)
 
 
 @csrf_exempt
@@ -354,11 +263,8 @@ def api_delete_book(request, book_id):
     book = get_object_or_404(Book, pk=book_id)
     
     try:
-        if book.file:
-            file_path = os.path.join(settings.MEDIA_ROOT, book.file.name)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        
+        # Le fichier est effacé par django_cleanup après le commit, et
+        # seulement si aucun autre livre ne partage ce contenu (voir storage.py)
         book.delete()
         return JsonResponse({'message': 'Book deleted successfully'})
     
@@ -366,18 +272,78 @@ def api_delete_book(request, book_id):
         return JsonResponse({'error': f'Deletion error: {str(e)}'}, status=500)
 
 
+@login_required
 def api_download_book(request, book_id):
-    book = get_object_or_404(Book, pk=book_id)
-    if not book.file:
-        return HttpResponse('File not found', status=404)
+    return book_file_redirect(request, book_id, as_attachment=True)
+
+
+@require_http_methods(["GET"])
+def api_suggest(request):
+    """Suggestions de titres, auteurs et éditeurs pour les champs de recherche"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 5)), 1), 20)
+    except ValueError:
+        limit = 5
     
-    file_path = book.file.path
-    if not os.path.exists(file_path):
-        return HttpResponse('File not found', status=404)
+    if len(query) < 2:
+        return JsonResponse({'titles': [], 'authors': [], 'publishers': []})
     
-    response = FileResponse(open(file_path, 'rb'))
-    response['Content-Disposition'] = f'attachment; filename="{book.file.name}"'
-    return response
+    return JsonResponse(suggest.suggest_index.suggest(query, limit))
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_content_search(request):
+    """
+    Recherche dans le texte des livres numériques.
+
+    Retourne les livres qui contiennent tous les termes, avec pour chacun
+    des extraits et leur position dans le texte du livre. Réservée aux
+    utilisateurs connectés, comme le téléchargement et la lecture.
+    """
+    terms = content_index.parse_query(request.GET.get('q', ''))
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 10)), 1), 50)
+    except ValueError:
+        per_page = 10
+    
+    if not terms:
+        return JsonResponse({
+            'terms': [], 'results': [], 'total': 0, 'pages': 0,
+            'current_page': 1, 'has_next': False, 'has_prev': False,
+        })
+    
+    paginator = Paginator(content_index.matching_books(terms), per_page)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    rows = list(page_obj.object_list)
+    book_ids = [row['book_id'] for row in rows]
+    
+    books_by_id = Book.objects.select_related('publisher').prefetch_related(
+        'authors', 'categories'
+    ).in_bulk(book_ids)
+    snippets = content_index.book_snippets(book_ids, terms)
+    
+    results = []
+    for row in rows:
+        book = books_by_id.get(row['book_id'])
+        if book is None:
+            continue
+        results.append({
+            'book': book.to_dict(),
+            'score': row['score'],
+            'snippets': snippets.get(book.pk, []),
+        })
+    
+    return JsonResponse({
+        'terms': terms,
+        'results': results,
+        'total': paginator.count,
+        'pages': paginator.num_pages,
+        'current_page': page_obj.number,
+        'has_next': page_obj.has_next(),
+        'has_prev': page_obj.has_previous(),
+    })
 
 
 @csrf_exempt
@@ -409,7 +375,7 @@ def api_publishers(request):
 def add_author(request):
     if request.method == "POST":
         # Vérification des droits admin pour l'ajout
-        if not hasattr(request.user, 'profile') or not request.user.profile.is_admin:
+        if not get_user_role(request).is_admin:
             messages.error(request, 'Accès refusé. Seuls les administrateurs peuvent ajouter des auteurs.')
             return redirect('add_author')
             
@@ -507,7 +473,7 @@ def delete_author(request, author_id):
 def add_category(request):
     if request.method == "POST":
         # Vérification des droits admin pour l'ajout
-        if not hasattr(request.user, 'profile') or not request.user.profile.is_admin:
+        if not get_user_role(request).is_admin:
             messages.error(request, 'Accès refusé. Seuls les administrateurs peuvent ajouter des catégories.')
             return redirect('add_category')
             
@@ -604,7 +570,7 @@ def delete_category(request, category_id):
 def add_publisher(request):
     if request.method == "POST":
         # Vérification des droits admin pour l'ajout
-        if not hasattr(request.user, 'profile') or not request.user.profile.is_admin:
+        if not get_user_role(request).is_admin:
             messages.error(request, 'Accès refusé. Seuls les administrateurs peuvent ajouter des éditeurs.')
             return redirect('add_publisher')
             
@@ -748,6 +714,38 @@ def add_book(request):
     return render(request, 'biblio/forms/book_form.html', context)
 
 
+@admin_required
+@require_http_methods(["GET", "POST"])
+def import_books(request):
+    """
+    Import en masse de livres depuis un fichier CSV ou Excel.
+
+    Pour plusieurs dizaines de milliers de lignes, préférer la commande
+    import_books : l'import peut dépasser le délai d'une requête.
+    """
+    result = None
+    if request.method == "POST":
+        form = BookImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            dry_run = form.cleaned_data['dry_run']
+            try:
+                result = catalog_import.import_books(upload.file, upload.name, dry_run=dry_run)
+            except ValueError as error:
+                messages.error(request, str(error))
+            else:
+                if dry_run:
+                    messages.success(request, f'{result.created} livre(s) seraient créés (aucune modification).')
+                else:
+                    messages.success(request, f'{result.created} livre(s) importé(s).')
+    else:
+        form = BookImportForm()
+
+    context = {'form': form, 'result': result}
+    context.update(get_global_stats())
+    return render(request, 'biblio/forms/import_books.html', context)
+
+
 @admin_required
 @require_http_methods(["GET", "POST"])
 def edit_book(request, book_id):
@@ -822,24 +820,10 @@ def delete_book(request, book_id):
 
 @login_required
 def book_list(request):
-    books = Book.objects.all().select_related('publisher').prefetch_related('authors', 'categories')
-    
-    search = request.GET.get('search', '')
-    category_id = request.GET.get('category', '')
-    status = request.GET.get('status', '')
-    
-    if search:
-        books = books.filter(
-            Q(title__icontains=search) |
-            Q(authors__name__icontains=search) |
-            Q(isbn__icontains=search)
-        ).distinct()
-    
-    if category_id:
-        books = books.filter(categories__category_id=category_id)
-    
-    if status:
-        books = books.filter(status=status)
+    spec = parse_book_filters(request.GET)
+    books = spec.compile(
+        Book.objects.all().select_related('publisher').prefetch_related('authors', 'categories')
+    )
     
     paginator = Paginator(books, 20)
     page_number = request.GET.get('page')
@@ -850,9 +834,9 @@ def book_list(request):
     context = {
         'page_obj': page_obj,
         'categories': categories,
-        'search': search,
-        'selected_category': category_id,
-        'selected_status': status,
+        'search': spec.search,
+        'selected_category': request.GET.get('category', ''),
+        'selected_status': request.GET.get('status', ''),
     }
     context.update(get_global_stats())
     
@@ -862,467 +846,142 @@ def book_list(request):
 # ============================================
 # TÉLÉCHARGEMENT ET LECTURE
 # ============================================
-def download_book(request, book_id):
-    """Télécharger le fichier PDF du livre"""
-    try:
-        book = get_object_or_404(Book, pk=book_id)
-        if book.file and book.file.name:
-            file_path = book.file.path
-            if os.path.exists(file_path):
-                file_handle = book.file.open('rb')
-                mime_type, encoding = mimetypes.guess_type(file_path)
-                if not mime_type:
-                    mime_type = 'application/octet-stream'
-                
-                response = FileResponse(file_handle, content_type=mime_type)
-                filename = smart_str(os.path.basename(book.file.name))
-                response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                response['Content-Length'] = book.file.size
-                
-                return response
-        
-        raise Http404("Fichier non trouvé")
-    except Book.DoesNotExist:
-        raise Http404("Livre non trouvé")
-    except Exception as e:
-        raise Http404(f"Erreur: {str(e)}")
-
+def book_file_redirect(request, book_id, as_attachment):
+    """
+    Redirige vers un lien signé et temporaire vers le fichier du livre.
 
-def read_book(request, book_id):
-    """Lire le fichier PDF dans le navigateur"""
-    try:
-        book = get_object_or_404(Book, pk=book_id)
-        if book.file and book.file.name:
-            file_path = book.file.path
-            if os.path.exists(file_path):
-                file_handle = book.file.open('rb')
-                response = FileResponse(file_handle, content_type='application/pdf')
-                filename = smart_str(os.path.basename(book.file.name))
-                response['Content-Disposition'] = f'inline; filename="{filename}"'
-                response['Content-Length'] = book.file.size
-                
-                return response
-        
+    Le fichier est ensuite servi par signed_media.SignedMediaApplication,
+    hors du cycle de requête de Django.
+    """
+    book = get_object_or_404(Book.objects.only('pk', 'title', 'file'), pk=book_id)
+    if not book.file:
         raise Http404("Fichier non trouvé")
-    except Book.DoesNotExist:
-        raise Http404("Livre non trouvé")
-    except Exception as e:
-        raise Http404(f"Erreur: {str(e)}")
     
+    filename = smart_str(f'{book.title}{book.file_extension}')
+    return redirect(signed_media.signed_url(book.file.name, filename, as_attachment))
+
+
+@login_required
+def download_book(request, book_id):
+    """Télécharger le fichier du livre"""
+    return book_file_redirect(request, book_id, as_attachment=True)
+
 
+@login_required
+def read_book(request, book_id):
+    """Lire le fichier dans le navigateur"""
+    return book_file_redirect(request, book_id, as_attachment=False)
 
 
 # ============================================
 # FONCTION UTILITAIRE POUR OBTENIR LES LIVRES FILTRÉS
 # ============================================
-def get_filtered_books(request):
-    """Récupère les livres avec les mêmes filtres que book_list"""
+def get_filtered_books(request, spec=None):
+    """
+    Récupère les livres à exporter avec les mêmes filtres que book_list.
+
+    Par défaut, seuls les livres physiques sont exportés (voir
+    filters.export_filters). La requête filtrée est relancée plutôt que de
+    passer les identifiants du cache de recherche en IN (…) : un export lit
+    tout le résultat, et des milliers de paramètres dépassent les limites
+    de SQLite et MySQL. Les exports répétés sont servis par export_cache.
+    """
+    if spec is None:
+        spec = export_filters(request.GET)
     books = Book.objects.all().select_related('publisher').prefetch_related('authors', 'categories')
+    return spec.compile(books)
+
+
+# Nombre de livres lus par requête lors du parcours du QuerySet
+EXPORT_ITERATOR_CHUNK_SIZE = 500
+
+
+def export_books(request, export_format):
+    """
+    Sert un export, depuis le cache disque si les mêmes livres ont déjà été exportés.
+
+    Le module du format (et sa bibliothèque) n'est importé qu'ici, à la
+    première demande : voir biblio/exports.
+    """
+    export = exports.get_format(export_format)
+    exporter = exports.load_exporter(export_format)
+    if exporter is None:
+        messages.error(request, f'La bibliothèque {export.library} n\'est pas installée.')
+        return redirect('book_list')
     
-    search = request.GET.get('search', '')
-    category_id = request.GET.get('category', '')
-    status = request.GET.get('status', '')
-    format_filter = request.GET.get('format', '')
-    
-    if search:
-        books = books.filter(
-            Q(title__icontains=search) |
-            Q(authors__name__icontains=search) |
-            Q(isbn__icontains=search)
-        ).distinct()
-    
-    if category_id:
-        books = books.filter(categories__category_id=category_id)
-    
-    if status:
-        books = books.filter(status=status)
+    spec = export_filters(request.GET)
+    key = export_cache.export_key(export_format, spec, request.GET.get('include_pdf'))
     
-    # Appliquer le filtre de format
-    if format_filter == 'digital':
-        books = books.exclude(file='').exclude(file__isnull=True)
-    elif format_filter == 'physical':
-        books = books.filter(Q(file='') | Q(file__isnull=True))
+    output = export_cache.open_export(key, export.extension)
+    if output is None:
+        def write(output):
+            books = get_filtered_books(request, spec)
+            rows = (exporter.book_row(book) for book in books.iterator(chunk_size=EXPORT_ITERATOR_CHUNK_SIZE))
+            exporter.build(output, rows)
+        output = export_cache.store_export(key, export.extension, write)
     
-    return books
-
+    filename = f'livres_bibliotheque_{datetime.now().strftime("%Y%m%d_%H%M%S")}{export.extension}'
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=export.content_type)
 
 
 # ============================================
-# EXPORT EXCEL
+# EXPORTS EXCEL / PDF / WORD
 # ============================================
 @login_required
 def export_books_excel(request):
     """Exporte la liste des livres en Excel"""
-    if not openpyxl:
-        messages.error(request, 'La bibliothèque openpyxl n\'est pas installée.')
-        return redirect('book_list')
-    
-    # Récupérer les livres filtrés
-    books = get_filtered_books(request)
-    
-    # Par défaut, exporter uniquement les livres physiques
-    # Sauf si un filtre de format est déjà appliqué ou si include_pdf est présent
-    format_filter = request.GET.get('format', '')
-    include_pdf = request.GET.get('include_pdf', '')
-    
-    if not format_filter and not include_pdf:
-        # Exporter uniquement les livres physiques par défaut
-        books = books.filter(Q(file='') | Q(file__isnull=True))
-
-    
-    # Créer un classeur Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Liste des Livres"
-    
-    # Styles
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # En-têtes
-    headers = ['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Éditeur', 'Année', 'Statut', 'Total', 'Disponibles', 'Langue']
-    ws.append(headers)
-    
-    # Appliquer le style aux en-têtes
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    # Données
-    for book in books:
-        # Récupérer les auteurs
-        authors = ', '.join([f"{a.name}" for a in book.authors.all()])
-        if not authors:
-            authors = "Aucun auteur"
-        
-        # Récupérer les catégories
-        categories = ', '.join([c.category_name for c in book.categories.all()])
-        if not categories:
-            categories = "Aucune catégorie"
-        
-        # Statut en français
-        status_map = {
-            'available': 'Disponible',
-            'borrowed': 'Emprunté',
-            'reserved': 'Réservé',
-            'maintenance': 'Maintenance'
-        }
-        status = status_map.get(book.status, book.status)
-        
-        row = [
-            book.title,
-            book.isbn or 'N/A',
-            authors,
-            categories,
-            book.publisher.publisher_name if book.publisher else 'N/A',
-            book.publication_year or 'N/A',
-            status,
-            book.total_copies,
-            book.available_copies,
-            book.language or 'N/A'
-        ]
-        ws.append(row)
-    
-    # Ajuster la largeur des colonnes
-    for col_num in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col_num)
-        max_length = 0
-        for cell in ws[column_letter]:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Appliquer les bordures à toutes les cellules
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=len(headers)):
-        for cell in row:
-            cell.border = border
-            cell.alignment = Alignment(vertical='center', wrap_text=True)
-    
-    # Ajouter une ligne de résumé
-    ws.append([])
-    summary_row = ws.max_row + 1
-    ws[f'A{summary_row}'] = f'Total: {books.count()} livres'
-    ws[f'A{summary_row}'].font = Font(bold=True, size=11)
-    
-    # Créer la réponse HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f'livres_bibliotheque_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    # Sauvegarder le classeur dans la réponse
-    wb.save(response)
-    return response
+    return export_books(request, 'excel')
 
 
-# ============================================
-# EXPORT PDF
-# ============================================
 @login_required
 def export_books_pdf(request):
     """Exporte la liste des livres en PDF"""
-    if not SimpleDocTemplate:
-        messages.error(request, 'La bibliothèque reportlab n\'est pas installée.')
-        return redirect('book_list')
-    
-    # Récupérer les livres filtrés
-    books = get_filtered_books(request)
-    
-    # Créer le PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=0.5*inch, bottomMargin=0.5*inch)
-    
-    # Conteneur pour les éléments
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=30,
-        alignment=1  # Centre
-    )
-    
-    # Titre
-    title = Paragraph("Liste des Livres - Bibliothèque", title_style)
-    elements.append(title)
-    
-    # Date
-    date_style = ParagraphStyle(
-        'DateStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.grey,
-        alignment=1
-    )
-    date_text = Paragraph(f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", date_style)
-    elements.append(date_text)
-    elements.append(Spacer(1, 20))
-    
-    # Données du tableau
-    data = [['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Statut', 'Total', 'Dispo.']]
-    
-    for book in books:
-        # Auteurs
-        authors = ', '.join([f"{a.name}" for a in book.authors.all()])[:50]
-        if not authors:
-            authors = "Aucun"
-        
-        # Catégories
-        categories = ', '.join([c.category_name for c in book.categories.all()])[:40]
-        if not categories:
-            categories = "Aucune"
-        
-        # Statut
-        status_map = {
-            'available': 'Disponible',
-            'borrowed': 'Emprunté',
-            'reserved': 'Réservé',
-            'maintenance': 'Maintenance'
-        }
-        status = status_map.get(book.status, book.status)
-        
-        data.append([
-            book.title[:40],
-            book.isbn or 'N/A',
-            authors,
-            categories,
-            status,
-            str(book.total_copies),
-            str(book.available_copies)
-        ])
-    
-    # Créer le tableau
-    table = Table(data, colWidths=[2.5*inch, 1*inch, 1.5*inch, 1.3*inch, 1*inch, 0.6*inch, 0.6*inch])
-    
-    # Style du tableau
-    table.setStyle(TableStyle([
-        # En-tête
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 12),
-        
-        # Corps du tableau
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-        
-        # Grille
-        ('GRID', (0, 0), (-1, -1), 1, colors.white),
-        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#4472C4')),
-        
-        # Alternance de couleurs
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
-        
-        # Alignement des nombres
-        ('ALIGN', (5, 1), (-1, -1), 'CENTER'),
-    ]))
-    
-    elements.append(table)
-    
-    # Résumé
-    elements.append(Spacer(1, 20))
-    summary_style = ParagraphStyle(
-        'Summary',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor('#1e40af'),
-    )
-    summary = Paragraph(f"<b>Total: {books.count()} livres</b>", summary_style)
-    elements.append(summary)
-    
-    # Construire le PDF
-    doc.build(elements)
-    
-    # Créer la réponse HTTP
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    filename = f'livres_bibliotheque_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+    return export_books(request, 'pdf')
 
 
-# ============================================
-# EXPORT WORD
-# ============================================
 @login_required
 def export_books_word(request):
     """Exporte la liste des livres en Word"""
-    if not Document:
-        messages.error(request, 'La bibliothèque python-docx n\'est pas installée.')
-        return redirect('book_list')
-    
-    # Récupérer les livres filtrés
-    books = get_filtered_books(request)
-    
-    # Par défaut, exporter uniquement les livres physiques
-    # Sauf si un filtre de format est déjà appliqué ou si include_pdf est présent
-    format_filter = request.GET.get('format', '')
-    include_pdf = request.GET.get('include_pdf', '')
-    
-    if not format_filter and not include_pdf:
-        # Exporter uniquement les livres physiques par défaut
-        books = books.filter(Q(file='') | Q(file__isnull=True))
-
-    
-    # Créer un document Word
-    doc = Document()
-    
-    # Titre
-    title = doc.add_heading('Liste des Livres - Bibliothèque', 0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Date
-    date_para = doc.add_paragraph(f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
-    date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    date_para.runs[0].font.size = Pt(10)
-    date_para.runs[0].font.color.rgb = RGBColor(128, 128, 128)
-    
-    doc.add_paragraph()  # Espace
-    
-    # Créer le tableau
-    table = doc.add_table(rows=1, cols=7)
-    table.style = 'Light Grid Accent 1'
-    
-    # En-têtes
-    headers = ['Titre', 'ISBN', 'Auteurs', 'Catégories', 'Statut', 'Total', 'Disponibles']
-    header_cells = table.rows[0].cells
-    
-    for i, header in enumerate(headers):
-        header_cells[i].text = header
-        # Style de l'en-tête
-        for paragraph in header_cells[i].paragraphs:
-            for run in paragraph.runs:
-                run.font.bold = True
-                run.font.size = Pt(11)
-                run.font.color.rgb = RGBColor(31, 78, 121)
-        header_cells[i].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Données
-    for book in books:
-        row_cells = table.add_row().cells
-        
-        # Titre
-        row_cells[0].text = book.title
-        
-        # ISBN
-        row_cells[1].text = book.isbn or 'N/A'
-        
-        # Auteurs
-        authors = ', '.join([f"{a.name}" for a in book.authors.all()])
-        row_cells[2].text = authors if authors else "Aucun auteur"
-        
-        # Catégories
-        categories = ', '.join([c.category_name for c in book.categories.all()])
-        row_cells[3].text = categories if categories else "Aucune catégorie"
-        
-        # Statut
-        status_map = {
-            'available': 'Disponible',
-            'borrowed': 'Emprunté',
-            'reserved': 'Réservé',
-            'maintenance': 'Maintenance'
-        }
-        row_cells[4].text = status_map.get(book.status, book.status)
-        
-        # Exemplaires
-        row_cells[5].text = str(book.total_copies)
-        row_cells[6].text = str(book.available_copies)
-        
-        # Centrer les nombres
-        row_cells[5].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        row_cells[6].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Ajuster la largeur des colonnes
-    widths = [Inches(2.5), Inches(1.2), Inches(1.5), Inches(1.3), Inches(1), Inches(0.7), Inches(0.8)]
-    for row in table.rows:
-        for idx, width in enumerate(widths):
-            row.cells[idx].width = width
-    
-    # Résumé
-    doc.add_paragraph()
-    summary = doc.add_paragraph(f'Total: {books.count()} livres')
-    summary.runs[0].font.bold = True
-    summary.runs[0].font.size = Pt(12)
-    summary.runs[0].font.color.rgb = RGBColor(31, 78, 121)
-    
-    # Sauvegarder dans un buffer
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    
-    # Créer la réponse HTTP
-    response = HttpResponse(
-        buffer,
-        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    return export_books(request, 'word')
+
+
+# ============================================
+# EXPORTS CSV / TSV (EN CONTINU)
+# ============================================
+def stream_books(request, export_format):
+    """
+    Diffuse la liste des livres en CSV ou TSV.
+
+    Mêmes filtres et même règle include_pdf que les autres exports. Le
+    QuerySet est parcouru par blocs, avec le prefetch des auteurs et
+    catégories fait bloc par bloc : la mémoire reste constante quelle que
+    soit la taille du catalogue. ?gzip=1 compresse la sortie.
+    """
+    spec = export_filters(request.GET)
+    books = spec.compile(
+        Book.objects.select_related('publisher').prefetch_related('authors', 'categories')
+    )
+    rows = (delimited.book_row(book) for book in books.iterator(chunk_size=EXPORT_ITERATOR_CHUNK_SIZE))
+    compress = bool(request.GET.get('gzip'))
+    
+    filename = f'livres_bibliotheque_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+    if compress:
+        filename += '.gz'
+    response = StreamingHttpResponse(
+        delimited.stream(rows, export_format, compress),
+        content_type='application/gzip' if compress else delimited.CONTENT_TYPES[export_format]
     )
-    filename = f'livres_bibliotheque_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx'
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
\ No newline at end of file
+    return response
+
+
+@login_required
+def export_books_csv(request):
+    """Exporte la liste des livres en CSV"""
+    return stream_books(request, 'csv')
+
+
+@login_required
+def export_books_tsv(request):
+    """Exporte la liste des livres en TSV"""
+    return stream_books(request, 'tsv')
@@ -1,14 +1,18 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlencode
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, logout, authenticate, update_session_auth_hash
+from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
+from django.db.models import Count, Q
 
-from .forms_auth import UserRegistrationForm, CustomLoginForm, UserProfileForm, UserRoleForm
+from .forms_auth import UserRegistrationForm, CustomLoginForm, UserProfileForm, UserRoleForm, PatronImportForm
+from .patron_import import get_patron_import_settings, import_patrons
 from .models_user import UserProfile
 from .decorators import admin_required, user_or_admin_required
 
@@ -44,14 +48,12 @@ def login_view(request):
     if request.method == 'POST':
         form = CustomLoginForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Bienvenue {user.username} !')
-                next_url = request.GET.get('next', 'index')
-                return redirect(next_url)
+            # Utilisateur déjà authentifié par le formulaire : pas de second hachage
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'Bienvenue {user.username} !')
+            next_url = request.GET.get('next', 'index')
+            return redirect(next_url)
         else:
             messages.error(request, 'Nom d\'utilisateur ou mot de passe incorrect.')
     else:
@@ -95,41 +97,147 @@ def profile_view(request):
     })
 
 
+USERS_PER_PAGE = 50
+
+SEARCH_MODES = ('prefix', 'contains')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _encode_user_cursor(user):
+    """Position d'un utilisateur dans la liste : '<date d'inscription en µs>.<id>'"""
+    return f"{(user.date_joined - _EPOCH) // timedelta(microseconds=1)}.{user.pk}"
+
+
+def _decode_user_cursor(value):
+    try:
+        micros, pk = value.split('.')
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _users_after(users, joined, pk):
+    """Utilisateurs situés après (date_joined, id) dans l'ordre de la liste (décroissant)"""
+    return users.filter(Q(date_joined__lt=joined) | Q(date_joined=joined, id__lt=pk))
+
+
 @admin_required
 def users_list_view(request):
     """
     Vue pour afficher la liste de tous les utilisateurs (admin uniquement)
+
+    Pagination par curseur (after / before) sur (date_joined, id) : chaque
+    page lit USERS_PER_PAGE lignes dans l'index, quelle que soit sa position.
+    La recherche par défaut porte sur le début du nom d'utilisateur ou de
+    l'email (index) ; le mode « contient » parcourt toute la table.
     """
-    search = request.GET.get('search', '')
+    search = request.GET.get('search', '').strip()
     role_filter = request.GET.get('role', '')
-    
-    users = User.objects.select_related('profile').all()
-    
-    # Calculer les statistiques globales (avant filtrage)
-    total_users = User.objects.count()
-    total_admins = User.objects.filter(profile__role='admin').count()
-    total_regulars = User.objects.filter(profile__role='user').count()
-    
-    if search:
+    mode = request.GET.get('mode', 'prefix')
+    if mode not in SEARCH_MODES:
+        mode = 'prefix'
+
+    # Statistiques globales (avant filtrage) en une seule requête
+    stats = User.objects.aggregate(
+        total_users=Count('id'),
+        total_admins=Count('id', filter=Q(profile__role='admin')),
+        total_regulars=Count('id', filter=Q(profile__role='user')),
+    )
+
+    users = User.objects.select_related('profile')
+
+    if search and mode == 'prefix':
+        users = users.filter(Q(username__istartswith=search) | Q(email__istartswith=search))
+    elif search:
         users = users.filter(
             Q(username__icontains=search) |
             Q(first_name__icontains=search) |
             Q(last_name__icontains=search) |
             Q(email__icontains=search)
         )
-    
+
     if role_filter:
         users = users.filter(profile__role=role_filter)
-    
-    users = users.order_by('-date_joined')
-    
+
+    after = _decode_user_cursor(request.GET.get('after', ''))
+    before = _decode_user_cursor(request.GET.get('before', ''))
+    if before:
+        # Page précédente : lecture dans l'ordre croissant puis inversion
+        joined, pk = before
+        rows = list(
+            users.filter(Q(date_joined__gt=joined) | Q(date_joined=joined, id__gt=pk))
+            .order_by('date_joined', 'id')[:USERS_PER_PAGE + 1]
+        )
+        has_prev = len(rows) > USERS_PER_PAGE
+        page = rows[:USERS_PER_PAGE][::-1]
+        # Des lignes ont pu disparaître depuis la page suivante
+        has_next = bool(page) and _users_after(users, page[-1].date_joined, page[-1].pk).exists()
+    else:
+        if after:
+            users = _users_after(users, *after)
+        rows = list(users.order_by('-date_joined', '-id')[:USERS_PER_PAGE + 1])
+        has_next = len(rows) > USERS_PER_PAGE
+        page = rows[:USERS_PER_PAGE]
+        has_prev = after is not None
+
+    params = {key: value for key, value in (('search', search), ('role', role_filter), ('mode', mode)) if value}
+    first_query = urlencode(params)
+    prev_query = urlencode({**params, 'before': _encode_user_cursor(page[0])}) if page and has_prev else ''
+    next_query = urlencode({**params, 'after': _encode_user_cursor(page[-1])}) if page and has_next else ''
+
     return render(request, 'biblio/auth/users_list.html', {
-        'users': users,
+        'users': page,
         'search': search,
         'role_filter': role_filter,
-        'total_users': total_users,
-        'total_admins': total_admins,
-        'total_regulars': total_regulars,
+        'search_mode': mode,
+        'first_query': first_query,
+        'prev_query': prev_query,
+        'next_query': next_query,
+        **stats,
+    })
+
+
+@admin_required
+@require_http_methods(["GET", "POST"])
+def import_patrons_view(request):
+    """
+    Vue pour importer des usagers depuis un fichier CSV ou Excel (admin uniquement)
+
+    Le hachage des mots de passe se fait dans la requête : au-delà de
+    WEB_MAX_PASSWORDS, l'import est refusé et renvoie à la commande
+    import_patrons.
+    """
+    max_passwords = get_patron_import_settings()['WEB_MAX_PASSWORDS']
+    result = None
+    if request.method == 'POST':
+        form = PatronImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_patrons(
+                    upload.file,
+                    upload.name,
+                    dry_run=form.cleaned_data['dry_run'],
+                    skip_invalid=form.cleaned_data['skip_invalid'],
+                    max_passwords=max_passwords,
+                )
+            except ValueError as error:
+                messages.error(request, str(error))
+            else:
+                if result.created:
+                    messages.success(request, f'{result.created} compte(s) créé(s).')
+                elif form.cleaned_data['dry_run'] and not result.errors:
+                    messages.success(request, f'{result.rows} ligne(s) valide(s), aucun compte créé.')
+                elif result.errors:
+                    messages.error(request, 'Aucun compte créé : corrigez les erreurs ci-dessous.')
+    else:
+        form = PatronImportForm()
+
+    return render(request, 'biblio/auth/import_patrons.html', {
+        'form': form,
+        'result': result,
+        'max_passwords': max_passwords,
     })
 
 
@@ -2,8 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.contrib import messages
-from django.db.models import Q
 from .models import Favorite, Book
+from .filters import parse_book_filters
 from django.views.decorators.http import require_http_methods
 
 
@@ -12,16 +12,17 @@ def favorites_list_view(request):
     """
     Affiche la liste des livres favoris de l'utilisateur connecté.
     """
-    search = request.GET.get('search', '')
+    spec = parse_book_filters(request.GET)
+    search = spec.search
     
-    favorites = Favorite.objects.filter(user=request.user).select_related('book', 'book__publisher')
+    favorites = (
+        Favorite.objects.filter(user=request.user)
+        .select_related('book', 'book__publisher')
+        .prefetch_related('book__authors', 'book__categories')
+    )
     
-    if search:
-        favorites = favorites.filter(
-            Q(book__title__icontains=search) |
-            Q(book__authors__name__icontains=search) |
-            Q(book__isbn__icontains=search)
-        ).distinct()
+    if spec.is_filtered:
+        favorites = favorites.filter(book__in=spec.filter_queryset().values('pk'))
     
     # Récupérer les livres depuis les favoris
     favorite_books = [fav.book for fav in favorites]
@@ -30,7 +31,7 @@ def favorites_list_view(request):
         'favorites': favorites,
         'favorite_books': favorite_books,
         'search': search,
-        'total_favorites': favorites.count(),
+        'total_favorites': len(favorite_books),
     }
     
     return render(request, 'biblio/favorites/favorites_list.html', context)
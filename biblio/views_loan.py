@@ -5,6 +5,7 @@ from django.utils import timezone
 from .models import Loan, Book
 from .forms_loan import LoanForm
 from .decorators import admin_required
+from .roles import get_user_role
 
 @login_required
 def my_loans(request):
@@ -19,7 +20,7 @@ def loan_list(request):
     """
     Vue pour afficher tous les prêts (admin seulement)
     """
-    loans = Loan.objects.all().order_by('-request_date')
+    loans = Loan.objects.select_related('book', 'user').order_by('-request_date')
     return render(request, 'biblio/loans/loan_list.html', {'loans': loans})
 
 @login_required
@@ -43,7 +44,7 @@ def create_loan(request):
             
             messages.success(request, 'Le prêt a été créé avec succès.')
             # Rediriger vers la liste appropriée selon le rôle
-            if hasattr(request.user, 'profile') and request.user.profile.is_admin:
+            if get_user_role(request).is_admin:
                 return redirect('loan_list')
             else:
                 return redirect('my_loans')
@@ -73,8 +74,8 @@ def return_loan(request, loan_id):
     loan = get_object_or_404(Loan, pk=loan_id)
     
     # Vérifier que l'utilisateur a le droit de retourner ce livre
-    is_admin = hasattr(request.user, 'profile') and request.user.profile.is_admin
-    is_owner = loan.user == request.user
+    is_admin = get_user_role(request).is_admin
+    is_owner = loan.user_id == request.user.pk
     
     if not (is_admin or is_owner):
         messages.error(request, "Vous n'avez pas la permission de retourner ce livre.")
@@ -0,0 +1,142 @@
+import json
+
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .decorators import ajax_admin_required
+from .models import Book, UploadSession
+from . import uploads
+
+
+def _session_data(session):
+    return {
+        'upload_id': str(session.upload_id),
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'offset': session.received_size,
+        'status': session.status,
+        'book_id': session.book_id,
+        'max_chunk_size': uploads.get_upload_settings()['MAX_CHUNK_SIZE'],
+    }
+
+
+def _error(error, session=None):
+    data = {'error': str(error)}
+    if session is not None:
+        # Position à partir de laquelle le client doit reprendre
+        data['offset'] = session.received_size
+    return JsonResponse(data, status=error.status)
+
+
+def _read_json(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise uploads.UploadError('JSON invalide.')
+
+
+@csrf_exempt
+@ajax_admin_required
+@require_http_methods(["POST"])
+def api_upload_start(request):
+    """
+    Démarre un envoi par morceaux.
+
+    Corps JSON : filename, size, book_id (facultatif), sha256 (facultatif)
+    """
+    try:
+        data = _read_json(request)
+        book = None
+        if data.get('book_id'):
+            book = get_object_or_404(Book, pk=data['book_id'])
+        try:
+            total_size = int(data.get('size'))
+        except (TypeError, ValueError):
+            raise uploads.UploadError('Taille manquante.')
+        session = uploads.start_upload(
+            request.user, data.get('filename'), total_size,
+            book=book, expected_sha256=data.get('sha256', '')
+        )
+    except uploads.UploadError as error:
+        return _error(error)
+    return JsonResponse(_session_data(session), status=201)
+
+
+@csrf_exempt
+@ajax_admin_required
+@require_http_methods(["GET", "PUT", "DELETE"])
+def api_upload_session(request, upload_id):
+    """
+    GET : état de l'envoi (position à laquelle reprendre)
+    PUT : ajoute un morceau (?offset=N, en-tête X-Chunk-SHA256, corps brut)
+    DELETE : abandonne l'envoi
+    """
+    if request.method == 'GET':
+        session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+        return JsonResponse(_session_data(session))
+
+    with transaction.atomic():
+        # Verrou : deux morceaux du même envoi ne s'écrivent jamais en même temps
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(), pk=upload_id, user=request.user
+        )
+
+        if request.method == 'DELETE':
+            try:
+                uploads.abort_upload(session)
+            except uploads.UploadError as error:
+                return _error(error, session)
+            return JsonResponse(_session_data(session))
+
+        try:
+            offset = int(request.GET.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return _error(uploads.UploadError('Paramètre offset invalide.'), session)
+
+        try:
+            # Lecture directe du flux : le morceau n'est jamais gardé en mémoire
+            uploads.append_chunk(
+                session, offset, length, request, request.headers.get('X-Chunk-SHA256', '')
+            )
+        except uploads.UploadError as error:
+            return _error(error, session)
+
+    return JsonResponse(_session_data(session))
+
+
+@csrf_exempt
+@ajax_admin_required
+@require_http_methods(["POST"])
+def api_upload_complete(request, upload_id):
+    """
+    Termine l'envoi et rattache le fichier au livre.
+
+    Corps JSON : book_id (facultatif si donné au démarrage)
+    """
+    # Empreinte du fichier entier calculée avant le verrou : la lecture peut
+    # durer pour un gros livre
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        sha256 = uploads.hash_upload(session)
+    except uploads.UploadError as error:
+        return _error(error, session)
+
+    with transaction.atomic():
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(), pk=upload_id, user=request.user
+        )
+        try:
+            data = _read_json(request)
+            book_id = data.get('book_id') or session.book_id
+            if not book_id:
+                raise uploads.UploadError('Livre manquant (book_id).')
+            book = get_object_or_404(Book, pk=book_id)
+            uploads.finish_upload(session, book, sha256)
+        except uploads.UploadError as error:
+            return _error(error, session)
+
+    return JsonResponse({**_session_data(session), 'book': book.to_dict()})
@@ -0,0 +1,22 @@
+"""
+Options de ligne de commande des benchmarks (benchmarks/conftest.py).
+
+pytest n'enregistre les options que des conftest.py chargés au démarrage :
+déclarées ici, à la racine, elles existent quel que soit le chemin lancé.
+"""
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks biblio')
+    group.addoption('--bench-rounds', type=int, default=15,
+                    help='Appels à chaud par vue (défaut : 15)')
+    group.addoption('--bench-scale', type=float, default=1.0,
+                    help='Facteur appliqué au jeu de données ; hors 1, les budgets ne sont pas vérifiés')
+    group.addoption('--bench-tolerance', type=float, default=1.0,
+                    help='Facteur appliqué aux budgets de temps (machine plus lente)')
+    group.addoption('--bench-report', default=None,
+                    help='Rapport JSON à écrire (défaut : benchmarks/report.json)')
+    group.addoption('--bench-compare', default=None,
+                    help='Rapport JSON précédent, comparé dans le résumé')
+    group.addoption('--bench-update-budgets', action='store_true',
+                    help='Réécrit budgets.json d\'après les mesures, sans échec')
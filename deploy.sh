@@ -114,6 +114,8 @@ ENV_FILE
         echo ""
         echo "7. Redémarrage de Gunicorn..."
         systemctl restart gunicorn-$PROJECT_NAME
+        systemctl restart ingestion-$PROJECT_NAME 2>/dev/null || true
+        systemctl restart content-index-$PROJECT_NAME 2>/dev/null || true
         echo "✓ Service redémarré"
         
         echo ""
@@ -154,6 +156,13 @@ else
         build-essential libmariadb-dev pkg-config git
 fi
 
+# Cache partagé des sessions (voir CACHES['sessions'] dans settings_prod.py)
+if ! dpkg -l memcached 2>/dev/null | grep -q "^ii"; then
+    apt install -y memcached
+fi
+systemctl enable --now memcached
+echo "✓ Memcached actif"
+
 echo ""
 echo "2. Création du répertoire du projet..."
 mkdir -p $PROJECT_DIR
@@ -223,130 +232,26 @@ ENV_FILE
 echo "✓ Fichier .env créé"
 
 echo ""
-echo "8. Configuration des paramètres de production..."
-mkdir -p $PROJECT_DIR/mef_biblio_web
-cat > $PROJECT_DIR/mef_biblio_web/settings_prod.py <<'SETTINGS'
-import os
-from pathlib import Path
-from decouple import config
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-SECRET_KEY = config('SECRET_KEY')
-DEBUG = config('DEBUG', default=False, cast=bool)
-ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='').split(',')
-
-LOGIN_REDIRECT_URL = '/'
-
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'crispy_forms',
-    'crispy_bootstrap4',
-    'django_cleanup.apps.CleanupConfig',
-    'biblio',
-    'corsheaders',
-]
-
-CRISPY_TEMPLATE_PACK = 'bootstrap4'
-
-MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'mef_biblio_web.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-                'biblio.context_processors.global_stats',
-            ],
-        },
-    },
-]
-
-WSGI_APPLICATION = 'mef_biblio_web.wsgi.application'
-
-DATABASES = {
-    'default': {
-        'ENGINE': config('DB_ENGINE'),
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST'),
-        'PORT': config('DB_PORT'),
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-            'charset': 'utf8mb4',
-        }
-    }
-}
-
-AUTH_PASSWORD_VALIDATORS = [
-    {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
-]
-
-LANGUAGE_CODE = 'fr-fr'
-TIME_ZONE = 'America/Port-au-Prince'
-USE_I18N = True
-USE_TZ = True
-
-STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, 'static'),
-]
-
-MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-# IMPORTANT: Pour Gunicorn seul, désactiver la compression WhiteNoise
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
-
-# CORS
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:$PORT",
-    "http://127.0.0.1:$PORT",
-    "http://$SERVER_IP:$PORT",
-    "http://biblio.mef.local:$PORT",
-]
-SETTINGS
-echo "✓ Fichier settings_prod.py créé"
+echo "8. Vérification des paramètres de production..."
+# settings_prod.py est versionné et lit ses secrets dans .env : il n'est pas
+# régénéré ici (middlewares, caches partagés entre workers, réglages BIBLIO_*)
+if [ -f "$PROJECT_DIR/mef_biblio_web/settings_prod.py" ]; then
+    echo "✓ settings_prod.py du dépôt utilisé"
+else
+    echo "❌ Erreur: mef_biblio_web/settings_prod.py introuvable dans le dépôt"
+    exit 1
+fi
 
 echo ""
 echo "9. Mise à jour de manage.py pour utiliser settings_prod..."
 if [ -f "$PROJECT_DIR/manage.py" ]; then
-    sed -i "s/mef_biblio_web.settings/mef_biblio_web.settings_prod/g" $PROJECT_DIR/manage.py
+    sed -i "s/'mef_biblio_web\.settings'/'mef_biblio_web.settings_prod'/g" $PROJECT_DIR/manage.py
     echo "✓ manage.py mis à jour"
 fi
 
 
 if [ -f "$PROJECT_DIR/mef_biblio_web/wsgi.py" ]; then
-    sed -i "s/mef_biblio_web.settings/mef_biblio_web.settings_prod/g" $PROJECT_DIR/mef_biblio_web/wsgi.py
+    sed -i "s/'mef_biblio_web\.settings'/'mef_biblio_web.settings_prod'/g" $PROJECT_DIR/mef_biblio_web/wsgi.py
     echo "✓ wsgi.py mis à jour pour utiliser settings_prod"
 fi
 
@@ -370,7 +275,8 @@ echo ""
 echo "13. Configuration des permissions..."
 chown -R $APP_USER:$APP_USER $PROJECT_DIR
 chmod -R 755 $PROJECT_DIR
-mkdir -p $PROJECT_DIR/media $PROJECT_DIR/staticfiles
+mkdir -p $PROJECT_DIR/media $PROJECT_DIR/staticfiles $PROJECT_DIR/cache $PROJECT_DIR/export_cache
+chown -R $APP_USER:$APP_USER $PROJECT_DIR/media $PROJECT_DIR/cache $PROJECT_DIR/export_cache
 chmod -R 775 $PROJECT_DIR/media
 echo "✓ Permissions configurées"
 
@@ -399,11 +305,85 @@ WantedBy=multi-user.target
 GUNICORN_SERVICE
 echo "✓ Service Gunicorn configuré"
 
+# Worker d'analyse des fichiers numériques (file IngestionJob)
+cat > /etc/systemd/system/ingestion-$PROJECT_NAME.service <<INGESTION_SERVICE
+[Unit]
+Description=Ingestion worker for $PROJECT_NAME
+After=network.target
+
+[Service]
+User=$APP_USER
+Group=$APP_USER
+WorkingDirectory=$PROJECT_DIR
+Environment="PATH=$VENV_DIR/bin"
+ExecStart=$VENV_DIR/bin/python manage.py process_ingestion_jobs --interval 5
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=multi-user.target
+INGESTION_SERVICE
+echo "✓ Service d'ingestion configuré"
+
+# Indexation plein texte du contenu des livres (toutes les 5 minutes)
+cat > /etc/systemd/system/content-index-$PROJECT_NAME.service <<CONTENT_INDEX_SERVICE
+[Unit]
+Description=Full-text content indexer for $PROJECT_NAME
+After=network.target
+
+[Service]
+User=$APP_USER
+Group=$APP_USER
+WorkingDirectory=$PROJECT_DIR
+Environment="PATH=$VENV_DIR/bin"
+ExecStart=$VENV_DIR/bin/python manage.py index_book_contents --workers 2 --interval 300
+Restart=always
+RestartSec=30
+
+[Install]
+WantedBy=multi-user.target
+CONTENT_INDEX_SERVICE
+echo "✓ Service d'indexation plein texte configuré"
+
+# Purge quotidienne des sessions expirées (par lots, sans verrou de table)
+cat > /etc/systemd/system/clear-sessions-$PROJECT_NAME.service <<CLEAR_SESSIONS_SERVICE
+[Unit]
+Description=Expired sessions cleanup for $PROJECT_NAME
+After=network.target
+
+[Service]
+Type=oneshot
+User=$APP_USER
+Group=$APP_USER
+WorkingDirectory=$PROJECT_DIR
+Environment="PATH=$VENV_DIR/bin"
+ExecStart=$VENV_DIR/bin/python manage.py clear_expired_sessions --batch-size 1000
+CLEAR_SESSIONS_SERVICE
+
+cat > /etc/systemd/system/clear-sessions-$PROJECT_NAME.timer <<CLEAR_SESSIONS_TIMER
+[Unit]
+Description=Daily expired sessions cleanup for $PROJECT_NAME
+
+[Timer]
+OnCalendar=*-*-* 03:30:00
+RandomizedDelaySec=15min
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+CLEAR_SESSIONS_TIMER
+echo "✓ Purge des sessions expirées planifiée"
+
 echo ""
 echo "15. Démarrage de Gunicorn..."
 systemctl daemon-reload
 systemctl start gunicorn-$PROJECT_NAME
 systemctl enable gunicorn-$PROJECT_NAME
+systemctl start ingestion-$PROJECT_NAME
+systemctl enable ingestion-$PROJECT_NAME
+systemctl start content-index-$PROJECT_NAME
+systemctl enable content-index-$PROJECT_NAME
+systemctl enable --now clear-sessions-$PROJECT_NAME.timer
 echo "✓ Gunicorn démarré et activé"
 
 echo "16. Configuration DNS local (optionnel)..."
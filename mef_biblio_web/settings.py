@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'biblio.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -59,6 +60,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'biblio.middleware.UserRoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -103,6 +105,10 @@ DATABASES = {
 }
 
 
+# Sessions lues dans le cache (voir settings_prod.py)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -154,4 +160,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # CORS settings
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Cache des résultats de recherche du catalogue (biblio/search_cache.py)
+BIBLIO_SEARCH_CACHE = {
+    'MAX_ENTRIES': 256,
+    'MAX_IDS': 10000,
+    'MAX_TOTAL_IDS': 200000,
+}
+
+# Au-delà de ce nombre de livres, le total d'une liste sans filtre est estimé
+# d'après les statistiques de la table (None pour toujours compter)
+BIBLIO_APPROXIMATE_COUNT_THRESHOLD = 100000
+
+# Cache disque des fichiers d'export (biblio/export_cache.py)
+BIBLIO_EXPORT_CACHE = {
+    'DIR': os.path.join(BASE_DIR, 'export_cache'),
+    'MAX_SIZE': 200 * 1024 * 1024,
+    'MAX_FILES': 100,
+}
+
+# Envoi des fichiers numériques par morceaux (biblio/uploads.py)
+BIBLIO_UPLOADS = {
+    'MAX_SIZE': 1024 * 1024 * 1024,
+    'MAX_CHUNK_SIZE': 8 * 1024 * 1024,
+    'SESSION_TTL_HOURS': 24,
+}
+
+# Liens signés vers les fichiers numériques (biblio/signed_media.py)
+BIBLIO_SIGNED_MEDIA = {
+    'URL_PREFIX': '/files/',
+    'TTL_SECONDS': 3600,
+    'EXPIRY_ROUNDING': 300,
+}
+
+# Import en masse des usagers (biblio/patron_import.py)
+BIBLIO_PATRON_IMPORT = {
+    'BATCH_SIZE': 500,
+    'WORKERS': None,
+    'HASH_ITERATIONS': None,
+    'WEB_MAX_PASSWORDS': 200,
+}
+
+# Import en masse du catalogue (biblio/catalog_import.py)
+BIBLIO_CATALOG_IMPORT = {
+    'BATCH_SIZE': 1000,
+}
+
+# Profilage des requêtes (biblio/profiling.py) : en-tête Server-Timing et
+# journal biblio.profiling. Taux par préfixe de chemin, ex. {'/api/': 0.05}
+BIBLIO_PROFILING = {
+    'ENABLED': False,
+    'DEFAULT_SAMPLE_RATE': 1.0,
+    'SAMPLE_RATES': {},
+}
+
+# Lignes JSON du profilage sur la sortie d'erreur
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'biblio.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
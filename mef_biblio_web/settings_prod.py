@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'biblio.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -34,6 +35,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'biblio.middleware.UserRoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +100,97 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
+# Cache partagé entre les workers Gunicorn : la génération du catalogue
+# doit être la même pour tous les processus
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    # Sessions à part, en mémoire partagée (Memcached installé par deploy.sh) :
+    # une lecture de session ne parcourt pas de dossier comme FileBasedCache
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': config('SESSION_CACHE_LOCATION', default='127.0.0.1:11211'),
+        'KEY_PREFIX': 'biblio_sessions',
+        'TIMEOUT': 1209600,
+    },
+}
+
+# Sessions lues dans le cache, écrites dans le cache et la base (cached_db).
+# Pour de petites sessions sans état serveur :
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies dans .env
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Cache des résultats de recherche du catalogue (biblio/search_cache.py)
+BIBLIO_SEARCH_CACHE = {
+    'MAX_ENTRIES': 256,
+    'MAX_IDS': 10000,
+    'MAX_TOTAL_IDS': 200000,
+}
+
+# Au-delà de ce nombre de livres, le total d'une liste sans filtre est estimé
+# d'après les statistiques de la table (None pour toujours compter)
+BIBLIO_APPROXIMATE_COUNT_THRESHOLD = 100000
+
+# Cache disque des fichiers d'export (biblio/export_cache.py)
+BIBLIO_EXPORT_CACHE = {
+    'DIR': os.path.join(BASE_DIR, 'export_cache'),
+    'MAX_SIZE': 200 * 1024 * 1024,
+    'MAX_FILES': 100,
+}
+
+# Envoi des fichiers numériques par morceaux (biblio/uploads.py)
+BIBLIO_UPLOADS = {
+    'MAX_SIZE': 1024 * 1024 * 1024,
+    'MAX_CHUNK_SIZE': 8 * 1024 * 1024,
+    'SESSION_TTL_HOURS': 24,
+}
+
+# Liens signés vers les fichiers numériques (biblio/signed_media.py)
+BIBLIO_SIGNED_MEDIA = {
+    'URL_PREFIX': '/files/',
+    'TTL_SECONDS': 3600,
+    'EXPIRY_ROUNDING': 300,
+}
+
+# Import en masse des usagers (biblio/patron_import.py)
+BIBLIO_PATRON_IMPORT = {
+    'BATCH_SIZE': 500,
+    'WORKERS': None,
+    'HASH_ITERATIONS': None,
+    'WEB_MAX_PASSWORDS': 200,
+}
+
+# Import en masse du catalogue (biblio/catalog_import.py)
+BIBLIO_CATALOG_IMPORT = {
+    'BATCH_SIZE': 1000,
+}
+
+# Profilage des requêtes (biblio/profiling.py) : BIBLIO_PROFILING=True dans
+# .env pour l'activer. Taux d'échantillonnage par préfixe de chemin.
+BIBLIO_PROFILING = {
+    'ENABLED': config('BIBLIO_PROFILING', default=False, cast=bool),
+    'DEFAULT_SAMPLE_RATE': 0.01,
+    'SAMPLE_RATES': {
+        '/static/': 0.0,
+        '/books/export/': 0.1,
+    },
+}
+
+# Lignes JSON du profilage sur la sortie d'erreur
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'biblio.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
     "http://127.0.0.1:8000",
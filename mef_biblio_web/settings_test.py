@@ -0,0 +1,15 @@
+"""
+Réglages des tests lancés par pytest (voir pytest.ini) : ceux du
+développement, avec SQLite à la place de MySQL pour n'avoir besoin
+d'aucun serveur. La base, comme la base de test créée par pytest-django,
+est en mémoire : rien n'est écrit dans le dépôt.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
+from biblio.signed_media import get_signed_media_settings, signed_media_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,6 +12,9 @@ urlpatterns = [
     # URLs d'authentification
     path('accounts/login/', auth_views.LoginView.as_view(template_name='biblio/auth/login.html'), name='login'),
     path('accounts/logout/', auth_views.LogoutView.as_view(next_page='/'), name='logout'),
+
+    # Liens signés hors de wsgi.py (runserver, asgi.py) : servis seulement si DEBUG
+    path(f"{get_signed_media_settings()['URL_PREFIX'].strip('/')}/<path:name>", signed_media_view, name='signed_media'),
 ]
 
 
@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mef_biblio_web.settings_prod')
 
 application = get_wsgi_application()
+
+# Liens signés vers les fichiers numériques : servis avant Django, sans base
+# de données ni session (voir biblio/signed_media.py). Ailleurs (runserver,
+# asgi.py), la vue signed_media_view les sert quand DEBUG est actif.
+from django.conf import settings  # noqa: E402
+from biblio.signed_media import SignedMediaApplication, get_signed_media_settings  # noqa: E402
+from biblio.storage import get_book_storage  # noqa: E402
+
+application = SignedMediaApplication(
+    application,
+    get_book_storage().location,
+    settings.SECRET_KEY,
+    get_signed_media_settings()['URL_PREFIX'],
+)